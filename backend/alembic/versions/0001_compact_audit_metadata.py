@@ -0,0 +1,177 @@
+"""Compact audit metadata on registrations
+
+Moves `udyam_registrations.user_agent` (raw Text) into the deduplicated
+`user_agents` table, referenced by `user_agent_id`, and stores `ip_address`
+as INET on Postgres / packed bytes elsewhere instead of a 45-char string.
+
+Existing rows are backfilled in batches of BATCH_SIZE ids outside the
+migration transaction (autocommit), so the table is never locked for the
+whole backfill and an interrupted upgrade can simply be run again. Databases created by
+`create_all` after this change already have the new layout and are skipped.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models import REGISTRATION_SEARCH_SQLITE_DDL, IPAddress
+from app.user_agents import fingerprint
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+user_agents = sa.table(
+    "user_agents",
+    sa.column("id", sa.Integer),
+    sa.column("digest", sa.String),
+    sa.column("user_agent", sa.Text),
+)
+
+
+def _registrations(*columns):
+    return sa.table("udyam_registrations", sa.column("id", sa.Integer), *columns)
+
+
+def _columns(bind) -> set:
+    return {c["name"] for c in sa.inspect(bind).get_columns("udyam_registrations")}
+
+
+def _batches(bind, registrations, *columns):
+    """Rows of `registrations` in id order, BATCH_SIZE at a time"""
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(registrations.c.id, *columns).where(
+                registrations.c.id > last_id
+            ).order_by(registrations.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _user_agent_ids(bind, values: dict) -> dict:
+    """digest -> user_agents.id for `values` (digest -> user agent), inserting missing ones"""
+    existing = dict(bind.execute(
+        sa.select(user_agents.c.digest, user_agents.c.id).where(user_agents.c.digest.in_(list(values)))
+    ).all())
+    missing = [{"digest": d, "user_agent": v} for d, v in values.items() if d not in existing]
+    if missing:
+        bind.execute(user_agents.insert(), missing)
+        existing.update(bind.execute(
+            sa.select(user_agents.c.digest, user_agents.c.id).where(
+                user_agents.c.digest.in_([row["digest"] for row in missing])
+            )
+        ).all())
+    return existing
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if "user_agents" not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            "user_agents",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("digest", sa.String(64), nullable=False, unique=True),
+            sa.Column("user_agent", sa.Text(), nullable=False),
+        )
+
+    columns = _columns(bind)
+    if "user_agent" not in columns:
+        return
+    if "user_agent_id" not in columns:
+        op.add_column("udyam_registrations", sa.Column("user_agent_id", sa.Integer(), nullable=True))
+        # SQLite cannot add a constraint to an existing table (and does not enforce it by default)
+        if bind.dialect.name != "sqlite":
+            op.create_foreign_key(
+                "fk_udyam_registrations_user_agent_id", "udyam_registrations",
+                "user_agents", ["user_agent_id"], ["id"]
+            )
+    if "ip_address_new" not in columns:
+        op.add_column("udyam_registrations", sa.Column("ip_address_new", IPAddress(), nullable=True))
+
+    registrations = _registrations(
+        sa.column("ip_address", sa.String), sa.column("user_agent", sa.Text),
+        sa.column("user_agent_id", sa.Integer), sa.column("ip_address_new", IPAddress()),
+    )
+    update = registrations.update().where(registrations.c.id == sa.bindparam("row_id")).values(
+        user_agent_id=sa.bindparam("new_user_agent_id"),
+        ip_address_new=sa.bindparam("new_ip_address", type_=IPAddress()),
+    )
+    with op.get_context().autocommit_block():
+        for rows in _batches(bind, registrations, registrations.c.ip_address, registrations.c.user_agent):
+            agents = {row.id: fingerprint(row.user_agent) for row in rows if row.user_agent}
+            ids = _user_agent_ids(bind, {digest: value for value, digest in agents.values()})
+            bind.execute(update, [
+                {
+                    "row_id": row.id,
+                    "new_user_agent_id": ids[agents[row.id][1]] if row.id in agents else None,
+                    "new_ip_address": row.ip_address,
+                }
+                for row in rows
+            ])
+
+    op.drop_column("udyam_registrations", "user_agent")
+    op.drop_column("udyam_registrations", "ip_address")
+    op.alter_column("udyam_registrations", "ip_address_new", new_column_name="ip_address")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    columns = _columns(bind)
+    if "user_agent" not in columns:
+        op.add_column("udyam_registrations", sa.Column("user_agent", sa.Text(), nullable=True))
+    if "ip_address_text" not in columns:
+        op.add_column("udyam_registrations", sa.Column("ip_address_text", sa.String(45), nullable=True))
+
+    registrations = _registrations(
+        sa.column("ip_address", IPAddress()), sa.column("user_agent_id", sa.Integer),
+        sa.column("user_agent", sa.Text), sa.column("ip_address_text", sa.String),
+    )
+    update = registrations.update().where(registrations.c.id == sa.bindparam("row_id")).values(
+        user_agent=sa.bindparam("old_user_agent"),
+        ip_address_text=sa.bindparam("old_ip_address"),
+    )
+    with op.get_context().autocommit_block():
+        for rows in _batches(bind, registrations, registrations.c.ip_address, registrations.c.user_agent_id):
+            agent_ids = {row.user_agent_id for row in rows if row.user_agent_id is not None}
+            agents = dict(bind.execute(
+                sa.select(user_agents.c.id, user_agents.c.user_agent).where(user_agents.c.id.in_(agent_ids))
+            ).all()) if agent_ids else {}
+            bind.execute(update, [
+                {
+                    "row_id": row.id,
+                    "old_user_agent": agents.get(row.user_agent_id),
+                    "old_ip_address": row.ip_address,
+                }
+                for row in rows
+            ])
+
+    if bind.dialect.name != "sqlite":
+        op.drop_constraint("fk_udyam_registrations_user_agent_id", "udyam_registrations", type_="foreignkey")
+        op.drop_column("udyam_registrations", "user_agent_id")
+    elif sa.inspect(bind).get_foreign_keys("udyam_registrations"):
+        # Tables made by create_all declare the foreign key inline, which SQLite can
+        # only drop by rebuilding the table; that also drops the search triggers
+        searchable = "registration_search" in sa.inspect(bind).get_table_names()
+        with op.batch_alter_table("udyam_registrations", recreate="always") as batch:
+            batch.drop_column("user_agent_id")
+        if searchable:
+            for statement in REGISTRATION_SEARCH_SQLITE_DDL:
+                op.execute(statement)
+    else:
+        op.drop_column("udyam_registrations", "user_agent_id")
+    op.drop_column("udyam_registrations", "ip_address")
+    op.alter_column("udyam_registrations", "ip_address_text", new_column_name="ip_address")
+    op.drop_table("user_agents")
@@ -0,0 +1,44 @@
+"""Index the columns analytics snapshot windows filter on
+
+`app.snapshots` reads registrations by `submitted_at` / `updated_at` and
+validation logs by `validated_at`; without these indexes every run would
+scan both tables.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ("ix_udyam_registrations_submitted_at", "udyam_registrations", "submitted_at"),
+    ("ix_udyam_registrations_updated_at", "udyam_registrations", "updated_at"),
+    ("ix_validation_logs_validated_at", "validation_logs", "validated_at"),
+)
+
+
+def _existing(table: str) -> set:
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    for name, table, column in INDEXES:
+        # Tables created by create_all already have them
+        if name not in _existing(table):
+            op.create_index(name, table, [column])
+
+
+def downgrade() -> None:
+    for name, table, column in INDEXES:
+        if name in _existing(table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,103 @@
+"""Registration name search column and index
+
+Adds `udyam_registrations.search_names` (normalized entrepreneur, PAN and
+business names, see `app.search`) with its index: the `pg_trgm` GIN index
+on Postgres, the `registration_search` FTS5 trigram table and its sync
+triggers on SQLite. Existing rows are backfilled in batches of BATCH_SIZE
+ids outside the migration transaction, and the Postgres index is built
+concurrently, so neither locks the table for long. Databases created by
+`create_all` already have the column and index; only missing names are
+filled in.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models import REGISTRATION_SEARCH_SQLITE_DDL
+from app.search import search_names_for
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+TRGM_INDEX = "ix_udyam_registrations_search_names_trgm"
+FTS_TABLE = "registration_search"
+FTS_TRIGGERS = ("registration_search_ai", "registration_search_ad", "registration_search_au")
+
+registrations = sa.table(
+    "udyam_registrations",
+    sa.column("id", sa.Integer),
+    sa.column("entrepreneur_name", sa.String),
+    sa.column("pan_name", sa.String),
+    sa.column("business_name", sa.String),
+    sa.column("search_names", sa.Text),
+)
+
+
+def _backfill(bind):
+    """Fill search_names where it is NULL, BATCH_SIZE rows at a time in id order"""
+    r = registrations.c
+    update = registrations.update().where(r.id == sa.bindparam("row_id")).values(
+        search_names=sa.bindparam("names")
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(r.id, r.entrepreneur_name, r.pan_name, r.business_name).where(
+                r.id > last_id, r.search_names.is_(None)
+            ).order_by(r.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        # Rows without any name stay NULL; the id bound moves past them
+        values = [{"row_id": row.id, "names": search_names_for(row)} for row in rows]
+        values = [value for value in values if value["names"] is not None]
+        if values:
+            bind.execute(update, values)
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {c["name"] for c in inspector.get_columns("udyam_registrations")}
+    if "search_names" not in columns:
+        op.add_column("udyam_registrations", sa.Column("search_names", sa.Text(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        _backfill(bind)
+        if bind.dialect.name == "postgresql":
+            op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            if TRGM_INDEX not in {i["name"] for i in inspector.get_indexes("udyam_registrations")}:
+                op.create_index(
+                    TRGM_INDEX, "udyam_registrations", ["search_names"],
+                    postgresql_using="gin", postgresql_ops={"search_names": "gin_trgm_ops"},
+                    postgresql_concurrently=True
+                )
+
+    if bind.dialect.name == "sqlite" and FTS_TABLE not in sa.inspect(bind).get_table_names():
+        # Created after the backfill: the triggers keep it in sync from here on,
+        # and the existing rows are indexed in one pass
+        for statement in REGISTRATION_SEARCH_SQLITE_DDL:
+            op.execute(statement)
+        op.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for trigger in FTS_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif bind.dialect.name == "postgresql":
+        op.execute(f"DROP INDEX IF EXISTS {TRGM_INDEX}")
+    op.drop_column("udyam_registrations", "search_names")
@@ -0,0 +1,76 @@
+"""Never reuse outbox event ids on SQLite
+
+An SQLite INTEGER PRIMARY KEY without AUTOINCREMENT hands out max(id) + 1,
+so once purging empties `outbox_events` ids restart at 1 and change-feed
+resume tokens past them never see new events. The table is rebuilt with
+AUTOINCREMENT; copying the rows seeds `sqlite_sequence` with the highest
+id. Postgres sequences never go back, so nothing changes there.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = "outbox_events"
+OLD_TABLE = "outbox_events_old"
+INDEXES = (
+    ("ix_outbox_events_registration_id", "registration_id"),
+    ("ix_outbox_events_created_at", "created_at"),
+)
+
+
+def _table_sql(bind) -> str:
+    return bind.execute(
+        sa.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": TABLE}
+    ).scalar() or ""
+
+
+def _rebuild(autoincrement: bool):
+    op.execute(f"ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}")
+    for name, _ in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.create_table(
+        TABLE,
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("event_type", sa.String(50), nullable=False),
+        sa.Column("registration_id", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sqlite_autoincrement=autoincrement
+    )
+    for name, column in INDEXES:
+        op.create_index(name, TABLE, [column])
+    op.execute(
+        f"INSERT INTO {TABLE} (id, event_type, registration_id, payload, created_at) "
+        f"SELECT id, event_type, registration_id, payload, created_at FROM {OLD_TABLE}"
+    )
+    op.drop_table(OLD_TABLE)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # Tables created by create_all already use AUTOINCREMENT
+    if bind.dialect.name != "sqlite" or TABLE not in sa.inspect(bind).get_table_names():
+        return
+    if "AUTOINCREMENT" not in _table_sql(bind).upper():
+        _rebuild(autoincrement=True)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite" or TABLE not in sa.inspect(bind).get_table_names():
+        return
+    if "AUTOINCREMENT" in _table_sql(bind).upper():
+        _rebuild(autoincrement=False)
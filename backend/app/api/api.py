@@ -1,7 +1,12 @@
 from fastapi import APIRouter
-from app.api.endpoints import registration
+from app.api.endpoints import events, profiles, registration, schema, search, stats
 
 api_router = APIRouter()
 
 # Include all endpoint routers
-api_router.include_router(registration.router, prefix="/registration", tags=["registration"]) 
\ No newline at end of file
+api_router.include_router(registration.router, prefix="/registration", tags=["registration"])
+api_router.include_router(schema.router, prefix="/schema", tags=["schema"])
+api_router.include_router(stats.router, prefix="/stats", tags=["stats"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(profiles.router, prefix="/profiles", tags=["profiles"])
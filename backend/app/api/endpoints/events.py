@@ -0,0 +1,67 @@
+import json
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from app.config import settings
+from app.outbox import FeedReader, decode_token, event_message, notifier
+from app.sharding import ShardRouter, get_shard_router
+
+router = APIRouter()
+
+# Comment line sent on idle streams so proxies keep the connection open
+HEARTBEAT_SECONDS = 15
+
+
+async def _event_stream(request: Request, reader: FeedReader):
+    # Tell EventSource clients how long to wait before reconnecting
+    yield "retry: 1000\n\n"
+    last_sent = time.monotonic()
+    while not await request.is_disconnected():
+        generation = notifier.generation
+        events = await run_in_threadpool(reader.read)
+        for shard, row, token in events:
+            message = event_message(reader.shards, shard, row)
+            yield f"id: {token}\nevent: {row.event_type}\ndata: {json.dumps(message)}\n\n"
+        if events:
+            last_sent = time.monotonic()
+            continue
+
+        if time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        # Woken at once by commits in this worker; other workers' events
+        # are picked up on the next poll
+        await notifier.wait(generation, settings.OUTBOX_POLL_SECONDS)
+
+
+@router.get("/registrations")
+async def registration_events(
+    request: Request,
+    after: Optional[str] = Query(None, description="Resume token (the id of the last event received)"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    shards: ShardRouter = Depends(get_shard_router)
+):
+    """
+    Server-Sent Events stream of registration changes.
+
+    Events (`registration.created`, `registration.aadhaar_verified`,
+    `registration.verified`) come from the outbox written with each change,
+    in commit order per registration. Each event's `id` is a resume token:
+    EventSource clients resume automatically via `Last-Event-ID`, others can
+    pass it as `after`. Without a token the stream starts at the oldest
+    retained event.
+    """
+    token = last_event_id or after
+    try:
+        positions = decode_token(token, len(shards.shards)) if token else [0] * len(shards.shards)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid resume token")
+
+    reader = FeedReader(shards, positions, settings.OUTBOX_GAP_TIMEOUT_SECONDS)
+    return StreamingResponse(
+        _event_stream(request, reader),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
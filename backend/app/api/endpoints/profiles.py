@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+from typing import Optional
+from app.profiling import ADMIN_HEADER, is_admin_token, profile_store, profiling_enabled
+
+router = APIRouter()
+
+
+def require_profiling_admin(admin_token: Optional[str] = Header(None, alias=ADMIN_HEADER)):
+    # Hidden entirely while profiling is not configured
+    if not profiling_enabled():
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin_token(admin_token):
+        raise HTTPException(status_code=403, detail="Profiling admin token required")
+
+
+@router.get("", dependencies=[Depends(require_profiling_admin)])
+async def list_profiles():
+    """
+    Stored request profiles, newest first
+
+    `cpu_profile` says how much of the request cProfile covered: it hooks the
+    whole event loop, so it only runs while the request is alone ("full"),
+    stops when another request arrives ("partial") and is "skipped" if others
+    were already in flight. The SQL trace is always complete.
+    """
+    profiles = []
+    for profile_id in profile_store.ids():
+        artifact = profile_store.load(profile_id)
+        if artifact is None:
+            continue
+        artifact.pop("sql", None)
+        artifact.pop("summary", None)
+        profiles.append(artifact)
+    return {"profiles": profiles}
+
+
+@router.get("/{profile_id}", dependencies=[Depends(require_profiling_admin)])
+async def get_profile(profile_id: str):
+    """
+    Request metadata, ordered SQL statements with timings and the top of the profile
+    """
+    artifact = profile_store.load(profile_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return artifact
+
+
+@router.get("/{profile_id}/pstats", dependencies=[Depends(require_profiling_admin)])
+async def download_profile_stats(profile_id: str):
+    """
+    Raw cProfile data (open with `python -m pstats` or snakeviz)
+    """
+    path = profile_store.path(profile_id, ".pstats")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.pstats")
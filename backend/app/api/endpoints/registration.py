@@ -1,16 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, Iterator, List, Optional
+from contextlib import ExitStack
+from app.sharding import ShardRouter, get_shard_router
+from app.replicas import pin_reads_to_primary, reads_need_primary
 from app.models import UdyamRegistration, RegistrationStatus
 from app.schemas import (
     AadhaarVerificationRequest, AadhaarVerificationResponse,
     OTPValidationRequest, OTPValidationResponse,
     PANValidationRequest, PANValidationResponse,
-    RegistrationResponse, ErrorResponse, SuccessResponse
+    RegistrationResponse, ErrorResponse, SuccessResponse, BatchLookupRequest
 )
 from app.validators import validator
+from app.step_tokens import STATE_COLUMNS, RegistrationState, StepTokenError, step_token_verifier
+from app.idempotency import idempotent, IDEMPOTENCY_HEADER
+from app.registration_numbers import registration_numbers
+from app.user_agents import user_agents
+from app import outbox, search, stats, step_tokens
 from datetime import datetime
+from types import SimpleNamespace
+import json
 
 router = APIRouter()
 
@@ -18,11 +27,21 @@ router = APIRouter()
 async def verify_aadhaar(
     request_data: AadhaarVerificationRequest,
     request: Request,
-    db: Session = Depends(get_db)
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    shards: ShardRouter = Depends(get_shard_router)
 ):
     """
     Step 1: Verify Aadhaar number and entrepreneur name
     """
+    with idempotent("aadhaar-verification", idempotency_key, request_data) as guard:
+        if guard.replay is not None:
+            return guard.replay
+        result = _verify_aadhaar(request_data, request, shards, guard)
+    pin_reads_to_primary(response)
+    return result
+
+def _verify_aadhaar(request_data, request, shards, guard):
     try:
         # Validate Aadhaar number
         aadhaar_validation = validator.validate_aadhaar(request_data.aadhaar_number)
@@ -34,90 +53,160 @@ async def verify_aadhaar(
         if not name_validation.is_valid:
             raise HTTPException(status_code=400, detail=name_validation.message)
         
-        # Check for duplicate Aadhaar
-        if validator.check_duplicate_aadhaar(db, request_data.aadhaar_number):
-            raise HTTPException(status_code=409, detail="Aadhaar number already registered")
-        
-        # Create registration record
-        registration = UdyamRegistration(
-            aadhaar_number=request_data.aadhaar_number,
-            entrepreneur_name=request_data.entrepreneur_name,
-            consent_given=request_data.consent_given,
-            ip_address=request.client.host,
-            user_agent=request.headers.get("user-agent"),
-            status=RegistrationStatus.PENDING
-        )
-        
-        db.add(registration)
-        db.commit()
-        db.refresh(registration)
-        
-        # Log validation
-        validator.log_validation(db, registration.id, "aadhaar_number", "aadhaar", True)
-        validator.log_validation(db, registration.id, "entrepreneur_name", "name", True)
-        
-        # Generate and store OTP
-        otp_code = validator.create_otp_record(db, request_data.aadhaar_number)
-        
-        # In a real application, you would send OTP via SMS/email here
-        # For demo purposes, we'll return the OTP in response
-        print(f"OTP for {request_data.aadhaar_number}: {otp_code}")
-        
-        return AadhaarVerificationResponse(
-            success=True,
-            message="Aadhaar verification successful. OTP sent to registered mobile number.",
-            registration_id=registration.id,
-            otp_sent=True
-        )
+        # Registration, OTP and validation logs for one Aadhaar live on one shard
+        shard = shards.shard_for_aadhaar(request_data.aadhaar_number)
+        with shards.session(shard) as db:
+            # Check for duplicate Aadhaar
+            if validator.check_duplicate_aadhaar(db, request_data.aadhaar_number):
+                raise HTTPException(status_code=409, detail="Aadhaar number already registered")
+            
+            # Create registration record
+            registration = UdyamRegistration(
+                aadhaar_number=request_data.aadhaar_number,
+                entrepreneur_name=request_data.entrepreneur_name,
+                consent_given=request_data.consent_given,
+                ip_address=request.client.host,
+                user_agent_id=user_agents.intern(db, request.headers.get("user-agent")),
+                status=RegistrationStatus.PENDING
+            )
+            
+            # Count it and publish it in the same transaction; the refresh loads submitted_at
+            db.add(registration)
+            db.flush()
+            db.refresh(registration)
+            stats.record_created(db, registration)
+            outbox.record(db, outbox.REGISTRATION_CREATED, registration)
+            db.commit()
+            
+            # Log validation
+            validator.log_validation(db, registration.id, "aadhaar_number", "aadhaar", True)
+            validator.log_validation(db, registration.id, "entrepreneur_name", "name", True)
+            
+            # Generate and store OTP
+            otp_code = validator.create_otp_record(db, request_data.aadhaar_number)
+            
+            # In a real application, you would send OTP via SMS/email here
+            # For demo purposes, we'll return the OTP in response
+            print(f"OTP for {request_data.aadhaar_number}: {otp_code}")
+            
+            return guard.save(AadhaarVerificationResponse(
+                success=True,
+                message="Aadhaar verification successful. OTP sent to registered mobile number.",
+                registration_id=shards.encode_id(shard, registration.id),
+                otp_sent=True,
+                step_token=step_tokens.issue(
+                    shards.encode_id(shard, registration.id), RegistrationState.of(registration)
+                )
+            ))
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+def _read_state(db, local_id) -> Optional[RegistrationState]:
+    row = db.query(*STATE_COLUMNS).filter(UdyamRegistration.id == local_id).first()
+    return RegistrationState.of(row) if row else None
+
+def _verified_state(request_data) -> Optional[RegistrationState]:
+    """State asserted by the request's step token, or None when it has none"""
+    if request_data.step_token is None:
+        return None
+    try:
+        return step_token_verifier.verify(request_data.step_token, request_data.registration_id)
+    except StepTokenError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+def _update_if_unchanged(db, local_id, state, build, conditions=()) -> RegistrationState:
+    """
+    UPDATE the registration with `build(state)` only while it still has the
+    status and organization type of `state` (so stats buckets stay right).
+
+    A stale state (old step token) gets one re-read and retry; returns the
+    state the update was applied to.
+    """
+    for attempt in range(2):
+        if state is None:
+            raise HTTPException(status_code=404, detail="Registration not found")
+        values = build(state)
+        organization_type = UdyamRegistration.organization_type
+        updated = db.query(UdyamRegistration).filter(
+            UdyamRegistration.id == local_id,
+            UdyamRegistration.status == state.status,
+            organization_type.is_(None) if state.organization_type is None
+            else organization_type == state.organization_type,
+            *conditions
+        ).update(values, synchronize_session=False)
+        if updated:
+            return state
+        state = _read_state(db, local_id)
+    raise HTTPException(status_code=409, detail="Registration was modified concurrently, please retry")
+
+def _stat_key(state: RegistrationState) -> stats.StatKey:
+    return stats.bucket(state.submitted_on, state.status, state.organization_type)
+
 @router.post("/otp-validation", response_model=OTPValidationResponse)
 async def validate_otp(
     request_data: OTPValidationRequest,
-    db: Session = Depends(get_db)
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    shards: ShardRouter = Depends(get_shard_router)
 ):
     """
     Step 2: Validate OTP for Aadhaar verification
     """
+    with idempotent("otp-validation", idempotency_key, request_data) as guard:
+        if guard.replay is not None:
+            return guard.replay
+        result = _validate_otp(request_data, shards, guard)
+    pin_reads_to_primary(response)
+    return result
+
+def _validate_otp(request_data, shards, guard):
     try:
-        # Get registration record
-        registration = db.query(UdyamRegistration).filter(
-            UdyamRegistration.id == request_data.registration_id
-        ).first()
-        
-        if not registration:
-            raise HTTPException(status_code=404, detail="Registration not found")
-        
-        # Validate OTP format
+        # Validate OTP format before touching the database
         otp_validation = validator.validate_otp(request_data.otp_code)
         if not otp_validation.is_valid:
             raise HTTPException(status_code=400, detail=otp_validation.message)
         
-        # Validate OTP against database
-        is_valid, message = validator.validate_otp_with_database(
-            db, registration.aadhaar_number, request_data.otp_code
-        )
-        
-        if not is_valid:
-            raise HTTPException(status_code=400, detail=message)
-        
-        # Update registration
-        registration.otp_verified = True
-        registration.aadhaar_verified = True
-        db.commit()
-        
-        # Log validation
-        validator.log_validation(db, registration.id, "otp_code", "otp", True)
+        shard, local_id = shards.locate(request_data.registration_id)
+        if shard is None:
+            raise HTTPException(status_code=404, detail="Registration not found")
+        state = _verified_state(request_data)
         
-        return OTPValidationResponse(
-            success=True,
-            message="OTP validated successfully. Aadhaar verification completed.",
-            aadhaar_verified=True
-        )
+        with shards.session(shard) as db:
+            # Without a step token, read just the columns this step needs
+            if state is None:
+                state = _read_state(db, local_id)
+                if state is None:
+                    raise HTTPException(status_code=404, detail="Registration not found")
+            
+            # Validate OTP against database; it is marked used in this transaction
+            is_valid, message = validator.validate_otp_with_database(
+                db, state.aadhaar_number, request_data.otp_code
+            )
+            
+            if not is_valid:
+                raise HTTPException(status_code=400, detail=message)
+            
+            # Update registration
+            state = _update_if_unchanged(db, local_id, state, lambda state: {
+                UdyamRegistration.otp_verified: True,
+                UdyamRegistration.aadhaar_verified: True
+            })
+            state = state._replace(aadhaar_verified=True)
+            outbox.record(db, outbox.REGISTRATION_AADHAAR_VERIFIED, state, local_id)
+            db.commit()
+            
+            # Log validation
+            validator.log_validation(db, local_id, "otp_code", "otp", True)
+            
+            return guard.save(OTPValidationResponse(
+                success=True,
+                message="OTP validated successfully. Aadhaar verification completed.",
+                aadhaar_verified=True,
+                step_token=step_tokens.issue(request_data.registration_id, state)
+            ))
         
     except HTTPException:
         raise
@@ -127,94 +216,275 @@ async def validate_otp(
 @router.post("/pan-validation", response_model=PANValidationResponse)
 async def validate_pan(
     request_data: PANValidationRequest,
-    db: Session = Depends(get_db)
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    shards: ShardRouter = Depends(get_shard_router)
 ):
     """
     Step 3: Validate PAN details
     """
+    with idempotent("pan-validation", idempotency_key, request_data) as guard:
+        if guard.replay is not None:
+            return guard.replay
+        result = _validate_pan(request_data, shards, guard)
+    pin_reads_to_primary(response)
+    return result
+
+def _validate_pan(request_data, shards, guard):
     try:
-        # Get registration record
-        registration = db.query(UdyamRegistration).filter(
-            UdyamRegistration.id == request_data.registration_id
-        ).first()
-        
-        if not registration:
-            raise HTTPException(status_code=404, detail="Registration not found")
-        
-        if not registration.aadhaar_verified:
-            raise HTTPException(status_code=400, detail="Aadhaar must be verified before PAN validation")
-        
-        # Validate PAN number
+        # Validate PAN number, holder type and name before touching the database
         pan_validation = validator.validate_pan(request_data.pan_number)
         if not pan_validation.is_valid:
             raise HTTPException(status_code=400, detail=pan_validation.message)
         
+        organization_validation = validator.validate_pan_for_organization(
+            request_data.pan_number, request_data.organization_type
+        )
+        if not organization_validation.is_valid:
+            raise HTTPException(status_code=400, detail=organization_validation.message)
+        
         # Validate PAN name
         name_validation = validator.validate_entrepreneur_name(request_data.pan_name)
         if not name_validation.is_valid:
             raise HTTPException(status_code=400, detail=name_validation.message)
         
-        # Check for duplicate PAN
-        if validator.check_duplicate_pan(db, request_data.pan_number, registration.id):
-            raise HTTPException(status_code=409, detail="PAN number already registered")
-        
-        # Update registration
-        registration.pan_number = request_data.pan_number.upper()
-        registration.pan_name = request_data.pan_name
-        registration.date_of_incorporation = request_data.date_of_incorporation
-        registration.organization_type = request_data.organization_type
-        registration.pan_verified = True
-        registration.status = RegistrationStatus.VERIFIED
-        
-        # Generate registration number
-        registration.registration_number = f"UDYAM-{registration.id:06d}-{datetime.now().year}"
-        
-        db.commit()
-        
-        # Log validation
-        validator.log_validation(db, registration.id, "pan_number", "pan", True)
-        validator.log_validation(db, registration.id, "pan_name", "name", True)
+        shard, local_id = shards.locate(request_data.registration_id)
+        if shard is None:
+            raise HTTPException(status_code=404, detail="Registration not found")
+        state = _verified_state(request_data)
         
-        return PANValidationResponse(
-            success=True,
-            message="PAN validation successful. Registration completed.",
-            pan_verified=True,
-            registration_number=registration.registration_number
-        )
+        with shards.session(shard) as db:
+            # Without a step token, read just the columns this step needs
+            if state is None:
+                state = _read_state(db, local_id)
+                if state is None:
+                    raise HTTPException(status_code=404, detail="Registration not found")
+            
+            if not state.aadhaar_verified:
+                raise HTTPException(status_code=400, detail="Aadhaar must be verified before PAN validation")
+            
+            # Check for duplicate PAN; PANs are not shard-keyed, so ask every shard
+            if shards.any_shard(lambda shard_db, other: validator.check_duplicate_pan(
+                shard_db, request_data.pan_number, local_id if other is shard else None
+            )):
+                raise HTTPException(status_code=409, detail="PAN number already registered")
+            
+            # A registration keeps its number when PAN is submitted again; new
+            # numbers come from this worker's reserved block
+            allocated = None
+            
+            def pan_values(state):
+                nonlocal allocated
+                if not state.aadhaar_verified:
+                    raise HTTPException(status_code=400, detail="Aadhaar must be verified before PAN validation")
+                if state.registration_number is None and allocated is None:
+                    allocated = registration_numbers.allocate()
+                # Bulk UPDATEs skip the ORM listener that maintains search_names
+                names = SimpleNamespace(
+                    entrepreneur_name=state.entrepreneur_name,
+                    pan_name=request_data.pan_name,
+                    business_name=state.business_name
+                )
+                return {
+                    UdyamRegistration.pan_number: request_data.pan_number.upper(),
+                    UdyamRegistration.pan_name: request_data.pan_name,
+                    UdyamRegistration.date_of_incorporation: request_data.date_of_incorporation,
+                    UdyamRegistration.organization_type: request_data.organization_type,
+                    UdyamRegistration.pan_verified: True,
+                    UdyamRegistration.status: RegistrationStatus.VERIFIED,
+                    UdyamRegistration.registration_number: state.registration_number or allocated,
+                    UdyamRegistration.search_names: search.search_names_for(names)
+                }
+            
+            try:
+                # Update registration
+                before = _update_if_unchanged(db, local_id, state, pan_values,
+                                              (UdyamRegistration.aadhaar_verified.is_(True),))
+                registration_number = before.registration_number or allocated
+                state = before._replace(
+                    status=RegistrationStatus.VERIFIED,
+                    organization_type=request_data.organization_type,
+                    registration_number=registration_number,
+                    pan_verified=True
+                )
+                stats.record_move(db, _stat_key(before), _stat_key(state))
+                outbox.record(db, outbox.REGISTRATION_VERIFIED, state, local_id)
+                db.commit()
+            except Exception:
+                db.rollback()
+                if allocated is not None:
+                    registration_numbers.release(allocated)
+                raise
+            # Allocated before a retry found the registration already numbered
+            if allocated is not None and allocated != registration_number:
+                registration_numbers.release(allocated)
+            
+            # Log validation
+            validator.log_validation(db, local_id, "pan_number", "pan", True)
+            validator.log_validation(db, local_id, "pan_name", "name", True)
+            
+            return guard.save(PANValidationResponse(
+                success=True,
+                message="PAN validation successful. Registration completed.",
+                pan_verified=True,
+                registration_number=registration_number,
+                step_token=step_tokens.issue(request_data.registration_id, state)
+            ))
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+def _registration_response(shards, shard, registration) -> RegistrationResponse:
+    """Registration as returned to clients, with its shard-encoded id"""
+    response = RegistrationResponse.model_validate(registration)
+    response.id = shards.encode_id(shard, registration.id)
+    return response
+
 @router.get("/registration/{registration_id}", response_model=RegistrationResponse)
 async def get_registration(
     registration_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    shards: ShardRouter = Depends(get_shard_router)
 ):
     """
-    Get registration details by ID
+    Get registration details by ID (from a replica unless this client just wrote)
     """
-    registration = db.query(UdyamRegistration).filter(
-        UdyamRegistration.id == registration_id
-    ).first()
-    
-    if not registration:
+    shard, local_id = shards.locate(registration_id)
+    if shard is None:
         raise HTTPException(status_code=404, detail="Registration not found")
     
-    return registration
+    with shards.session(shard, read_only=not reads_need_primary(request)) as db:
+        registration = db.query(UdyamRegistration).filter(
+            UdyamRegistration.id == local_id
+        ).first()
+        
+        if not registration:
+            raise HTTPException(status_code=404, detail="Registration not found")
+        
+        return _registration_response(shards, shard, registration)
 
 @router.get("/registrations", response_model=List[RegistrationResponse])
 async def get_registrations(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    shards: ShardRouter = Depends(get_shard_router)
+):
+    """
+    Get all registrations with pagination (from replicas unless this client just wrote)
+    """
+    read_only = not reads_need_primary(request)
+    if not shards.sharded:
+        shard = shards.shards[0]
+        with shards.session(shard, read_only) as db:
+            registrations = db.query(UdyamRegistration).offset(skip).limit(limit).all()
+            return [_registration_response(shards, shard, r) for r in registrations]
+    
+    # Each shard returns its first skip + limit rows in submission order;
+    # merging those gives the global page
+    rows = shards.merged(
+        lambda db, shard: db.query(UdyamRegistration).order_by(
+            UdyamRegistration.submitted_at, UdyamRegistration.id
+        ).limit(skip + limit).all(),
+        key=lambda shard, r: (r.submitted_at, shards.encode_id(shard, r.id)),
+        skip=skip,
+        limit=limit,
+        read_only=read_only
+    )
+    return [_registration_response(shards, shard, r) for shard, r in rows]
+
+# Keys resolved per IN query by the batch lookup
+BATCH_LOOKUP_CHUNK_SIZE = 500
+
+# Columns returned by the batch lookup; full rows are never loaded
+BATCH_LOOKUP_COLUMNS = (
+    UdyamRegistration.id,
+    UdyamRegistration.registration_number,
+    UdyamRegistration.status,
+    UdyamRegistration.aadhaar_verified,
+    UdyamRegistration.otp_verified,
+    UdyamRegistration.pan_verified,
+    UdyamRegistration.submitted_at,
+    UdyamRegistration.updated_at
+)
+
+def _lookup_record(shards, shard, row) -> dict:
+    return {
+        "found": True,
+        "id": shards.encode_id(shard, row.id),
+        "registration_number": row.registration_number,
+        "status": row.status.value if row.status else None,
+        "aadhaar_verified": row.aadhaar_verified,
+        "otp_verified": row.otp_verified,
+        "pan_verified": row.pan_verified,
+        "submitted_at": row.submitted_at.isoformat() if row.submitted_at else None,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None
+    }
+
+def _chunks(keys: list) -> Iterator[list]:
+    for start in range(0, len(keys), BATCH_LOOKUP_CHUNK_SIZE):
+        yield keys[start:start + BATCH_LOOKUP_CHUNK_SIZE]
+
+def _batch_lookup_lines(request_data: BatchLookupRequest, shards: ShardRouter, read_only: bool) -> Iterator[str]:
+    with ExitStack() as stack:
+        sessions = {}
+
+        def session_for(shard):
+            if shard.index not in sessions:
+                sessions[shard.index] = stack.enter_context(shards.session(shard, read_only))
+            return sessions[shard.index]
+
+        # Ids carry their shard, so each chunk costs one query per shard it touches
+        for chunk in _chunks(list(dict.fromkeys(request_data.ids))):
+            local_ids: Dict[int, list] = {}
+            for registration_id in chunk:
+                shard, local_id = shards.locate(registration_id)
+                if shard is not None:
+                    local_ids.setdefault(shard.index, []).append(local_id)
+            found = {}
+            for index, ids in local_ids.items():
+                shard = shards.shards[index]
+                for row in session_for(shard).query(*BATCH_LOOKUP_COLUMNS).filter(
+                    UdyamRegistration.id.in_(ids)
+                ):
+                    found[shards.encode_id(shard, row.id)] = _lookup_record(shards, shard, row)
+            for registration_id in chunk:
+                record = found.get(registration_id, {"id": registration_id, "found": False})
+                yield json.dumps(record) + "\n"
+
+        # Registration numbers are not shard-keyed; shards are asked until all are found
+        for chunk in _chunks(list(dict.fromkeys(request_data.registration_numbers))):
+            found = {}
+            for shard in shards.shards:
+                missing = [number for number in chunk if number not in found]
+                if not missing:
+                    break
+                for row in session_for(shard).query(*BATCH_LOOKUP_COLUMNS).filter(
+                    UdyamRegistration.registration_number.in_(missing)
+                ):
+                    found[row.registration_number] = _lookup_record(shards, shard, row)
+            for number in chunk:
+                record = found.get(number, {"registration_number": number, "found": False})
+                yield json.dumps(record) + "\n"
+
+@router.post("/batch-lookup")
+async def batch_lookup(
+    request_data: BatchLookupRequest,
+    request: Request,
+    shards: ShardRouter = Depends(get_shard_router)
 ):
     """
-    Get all registrations with pagination
+    Look up many registrations by ID and/or registration number.
+
+    Streams newline-delimited JSON, one line per distinct key in request
+    order (ids first), with `"found": false` for unknown keys.
     """
-    registrations = db.query(UdyamRegistration).offset(skip).limit(limit).all()
-    return registrations
+    return StreamingResponse(
+        _batch_lookup_lines(request_data, shards, not reads_need_primary(request)),
+        media_type="application/x-ndjson"
+    )
 
 @router.get("/health", response_model=SuccessResponse)
 async def health_check():
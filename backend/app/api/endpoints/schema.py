@@ -0,0 +1,65 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from typing import Optional
+from app.form_schema import plan_holder
+
+router = APIRouter()
+
+# Preferred content coding first
+ENCODING_PREFERENCE = ("br", "gzip")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "").lower() in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()
+                  for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+@router.get("/form")
+async def get_form_schema(request: Request, v: Optional[str] = None):
+    """
+    Current scraped form schema, pre-serialized and pre-compressed.
+
+    Request `?v=<version>` (see the X-Schema-Version header) to get a
+    response that can be cached forever; the unversioned URL is revalidated
+    with If-None-Match and answered with 304 while the schema is unchanged.
+    """
+    artifact = plan_holder.current.artifact
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Form schema not available")
+
+    accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    encoding = next(
+        (e for e in ENCODING_PREFERENCE if e in accepted and e in artifact.bodies),
+        "identity"
+    )
+
+    headers = {
+        "ETag": artifact.etags[encoding],
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if v == artifact.version else REVALIDATE_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+        "X-Schema-Version": artifact.version
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    # Only the ETag of the representation this request would get counts: a
+    # cached gzip body is no use to a client now asking for identity
+    if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=artifact.bodies[encoding], media_type="application/json", headers=headers)
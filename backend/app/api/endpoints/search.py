@@ -0,0 +1,69 @@
+import heapq
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from app.models import UdyamRegistration
+from app.schemas import RegistrationSearchHit, RegistrationSearchResponse
+from app.search import MIN_QUERY_LENGTH, decode_cursor, encode_cursor, normalize_name, search
+from app.sharding import ShardRouter, get_shard_router
+
+router = APIRouter()
+
+
+@router.get("/registrations", response_model=RegistrationSearchResponse)
+async def search_registrations(
+    q: str = Query(..., max_length=255, description="Entrepreneur, PAN or business name"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    shards: ShardRouter = Depends(get_shard_router)
+):
+    """
+    Search registrations by name.
+
+    Matches word prefixes and misspellings, ignoring case, extra whitespace
+    and dots. Results are ordered by relevance; pass `next_cursor` back as
+    `cursor` for the next page.
+    """
+    query = normalize_name(q)
+    if len(query) < MIN_QUERY_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Search query must have at least {MIN_QUERY_LENGTH} characters"
+        )
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Every shard returns its best `limit` hits after the cursor; the global
+    # page is the best `limit` of those by (score desc, client-facing id)
+    hits = []
+    for shard in shards.shards:
+        shard_after = None
+        if after is not None:
+            shard_after = (after[0], shards.local_id_after(shard, after[1]))
+        with shards.session(shard, read_only=True) as db:
+            shard_hits = search(db, query, limit, shard_after)
+            rows = {}
+            if shard_hits:
+                rows = {r.id: r for r in db.query(
+                    UdyamRegistration.id, UdyamRegistration.entrepreneur_name,
+                    UdyamRegistration.pan_name, UdyamRegistration.business_name,
+                    UdyamRegistration.registration_number, UdyamRegistration.status
+                ).filter(UdyamRegistration.id.in_([local_id for local_id, _ in shard_hits]))}
+        for local_id, score in shard_hits:
+            row = rows[local_id]
+            hits.append(RegistrationSearchHit(
+                id=shards.encode_id(shard, local_id),
+                entrepreneur_name=row.entrepreneur_name,
+                pan_name=row.pan_name,
+                business_name=row.business_name,
+                registration_number=row.registration_number,
+                status=row.status,
+                score=score
+            ))
+
+    items = heapq.nsmallest(limit, hits, key=lambda hit: (-hit.score, hit.id))
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = encode_cursor(items[-1].score, items[-1].id)
+    return RegistrationSearchResponse(items=items, next_cursor=next_cursor)
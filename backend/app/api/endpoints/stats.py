@@ -0,0 +1,45 @@
+from collections import Counter
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from app.sharding import ShardRouter, get_shard_router
+from app.stats import last_reconciled_at, summarize
+
+router = APIRouter()
+
+
+@router.get("/registrations")
+async def get_registration_stats(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    shards: ShardRouter = Depends(get_shard_router)
+):
+    """
+    Registration counts by status, organization type and submission day.
+
+    Served from the incrementally maintained registration_stats table, so the
+    cost does not grow with the number of registrations.
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+
+    total = 0
+    by_status, by_organization_type, by_day = Counter(), Counter(), Counter()
+    reconciled_at = []
+    for shard in shards.shards:
+        with shards.session(shard, read_only=True) as db:
+            summary = summarize(db, date_from, date_to)
+            reconciled_at.append(last_reconciled_at(db))
+        total += summary["total"]
+        by_status.update(summary["by_status"])
+        by_organization_type.update(summary["by_organization_type"])
+        by_day.update(summary["by_day"])
+
+    return {
+        "total": total,
+        "by_status": dict(by_status),
+        "by_organization_type": dict(by_organization_type),
+        "by_day": dict(sorted(by_day.items())),
+        # The stalest shard; None until every shard has been reconciled once
+        "reconciled_at": None if None in reconciled_at else min(reconciled_at)
+    }
@@ -1,13 +1,44 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
+def engine_options(url: str, pool_size: int, max_overflow: int,
+                   pool_timeout: float, connect_timeout: int) -> dict:
+    """Pool and connect-timeout options for `create_engine`, per database backend"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    options = {"pool_pre_ping": True}
+
+    if backend == "postgresql":
+        options["connect_args"] = {"connect_timeout": connect_timeout}
+    elif backend == "sqlite":
+        options["connect_args"] = {"timeout": connect_timeout}
+        # In-memory databases use a per-thread pool without queue settings
+        if parsed.database in (None, "", ":memory:"):
+            return options
+
+    options.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout)
+    return options
+
+def primary_engine_options(url: str) -> dict:
+    return engine_options(
+        url, settings.DATABASE_POOL_SIZE, settings.DATABASE_MAX_OVERFLOW,
+        settings.DATABASE_POOL_TIMEOUT, settings.DATABASE_CONNECT_TIMEOUT
+    )
+
+def replica_engine_options(url: str) -> dict:
+    return engine_options(
+        url, settings.REPLICA_POOL_SIZE, settings.REPLICA_MAX_OVERFLOW,
+        settings.REPLICA_POOL_TIMEOUT, settings.REPLICA_CONNECT_TIMEOUT
+    )
+
 # Create SQLAlchemy engine
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=settings.DEBUG
+    echo=settings.DEBUG,
+    **primary_engine_options(settings.DATABASE_URL)
 )
 
 # Create SessionLocal class
@@ -22,4 +53,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
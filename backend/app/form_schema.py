@@ -0,0 +1,293 @@
+"""
+Validation plans compiled from the scraped Udyam form schema.
+
+`scraper.py` writes `udyam_form_schema.json` with field patterns and
+maxlengths. This module compiles that file into a `ValidationPlan` (compiled
+regex, length bounds and required flags per field) and keeps it current:
+a watcher thread reloads the plan when the file changes and swaps it in with
+a single reference assignment, so readers never take a lock.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, NamedTuple, Optional, Pattern
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Built-in rules, used for any field the scraped schema does not describe
+DEFAULT_RULES: Dict[str, Dict[str, Any]] = {
+    "aadhaar": {
+        "pattern": r"^\d{12}$",
+        "description": "12-digit Aadhaar number",
+        "max_length": 12,
+        "required": True
+    },
+    "pan": {
+        "pattern": r"^[A-Za-z]{5}[0-9]{4}[A-Za-z]{1}$",
+        "description": "PAN format: ABCDE1234F",
+        "max_length": 10,
+        "required": True
+    },
+    "otp": {
+        "pattern": r"^\d{6}$",
+        "description": "6-digit OTP",
+        "max_length": 6,
+        "required": True
+    },
+    "gstin": {
+        "pattern": r"^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z]{1}[1-9A-Z]{1}Z[0-9A-Z]{1}$",
+        "description": "GSTIN format: 27AAPFU0939F1ZV",
+        "max_length": 15,
+        "required": False
+    }
+}
+
+# Values every rule for the field has to accept; a scraped pattern or
+# maxlength that rejects any of them (a literal placeholder, a site-side
+# typo) is ignored
+VALID_SAMPLES: Dict[str, tuple] = {
+    "aadhaar": ("234567890124", "999941057058"),
+    "pan": ("ABCPE1234F", "AAACZ9999Z"),
+    "otp": ("123456", "000000"),
+    "gstin": ("27AAPFU0939F1ZV", "22ABCPE1234F1ZL"),
+}
+
+
+def _field_id_rule(names: str) -> Pattern:
+    # The whole id (or its last ASP.NET segment), e.g. "txtPan", "ctl00_..._txtadharno"
+    return re.compile(rf"(?:^|_)(?:txt)?(?:{names})(?:no|num|number)?\d*$", re.I)
+
+
+# Scraped input ids are mapped onto rule names by these patterns
+FIELD_ID_RULES = (
+    (_field_id_rule("aadhaar|aadhar|adhar"), "aadhaar"),
+    (_field_id_rule("gstin"), "gstin"),
+    (_field_id_rule("pan"), "pan"),
+    (_field_id_rule("otp"), "otp"),
+)
+
+
+class FieldRule(NamedTuple):
+    """Compiled validation rule for one form field"""
+    name: str
+    pattern: Pattern
+    max_length: int
+    required: bool
+    description: str
+
+    def matches(self, value: str) -> bool:
+        return len(value) <= self.max_length and self.pattern.match(value) is not None
+
+
+class SchemaArtifact:
+    """Schema pre-serialized and pre-compressed once per version, for serving"""
+
+    __slots__ = ("version", "bodies", "etags")
+
+    def __init__(self, schema: dict, version: str):
+        identity = json.dumps(schema, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.version = version
+        self.bodies = {
+            "identity": identity,
+            "gzip": gzip.compress(identity, compresslevel=9, mtime=0)
+        }
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(identity, quality=11)
+        # Strong ETags differ per content coding, as each is a distinct representation
+        self.etags = {
+            encoding: f'"{version}"' if encoding == "identity" else f'"{version}-{encoding}"'
+            for encoding in self.bodies
+        }
+
+
+class ValidationPlan:
+    """Immutable set of compiled field rules built from one schema version"""
+
+    __slots__ = ("rules", "version", "schema", "artifact")
+
+    def __init__(self, rules: Dict[str, FieldRule], version: str, schema: Optional[dict]):
+        self.rules = rules
+        self.version = version
+        self.schema = schema
+        self.artifact = SchemaArtifact(schema, version) if schema is not None else None
+
+    def __getitem__(self, name: str) -> FieldRule:
+        return self.rules[name]
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Rules in the plain-dict shape of UdyamValidator.validation_rules"""
+        return {
+            name: {
+                "pattern": rule.pattern.pattern,
+                "description": rule.description,
+                "max_length": rule.max_length,
+                "required": rule.required
+            }
+            for name, rule in self.rules.items()
+        }
+
+
+def _anchored(pattern: str) -> Pattern:
+    # Scraped HTML patterns are implicitly anchored; the built-in ones already are
+    if not pattern.startswith("^"):
+        pattern = f"^(?:{pattern})$"
+    return re.compile(pattern)
+
+
+def _accepted_pattern(name: str, pattern: Optional[str]) -> Optional[str]:
+    """`pattern` if it compiles and accepts the field's valid samples, else None"""
+    if not pattern:
+        return None
+    try:
+        compiled = _anchored(pattern)
+    except re.error:
+        logger.warning("Ignoring invalid scraped pattern for %s: %r", name, pattern)
+        return None
+    if not all(compiled.match(sample) for sample in VALID_SAMPLES.get(name, ())):
+        logger.warning("Ignoring scraped pattern for %s that rejects valid values: %r", name, pattern)
+        return None
+    return pattern
+
+
+def _rule_name_for_field(field_id: str) -> Optional[str]:
+    for regex, name in FIELD_ID_RULES:
+        if regex.search(field_id):
+            return name
+    return None
+
+
+def compile_plan(schema: Optional[dict], version: str = "default") -> ValidationPlan:
+    """Compile a scraped schema (or None for the defaults) into a plan"""
+    merged = {name: dict(rule) for name, rule in DEFAULT_RULES.items()}
+
+    if schema:
+        for name, rule in (schema.get("validation_rules") or {}).items():
+            if name not in merged:
+                continue
+            pattern = _accepted_pattern(name, rule.get("pattern"))
+            if pattern:
+                merged[name]["pattern"] = pattern
+                merged[name]["description"] = rule.get("description") or merged[name]["description"]
+            if isinstance(rule.get("required"), bool):
+                merged[name]["required"] = rule["required"]
+
+        for step in ("step1", "step2"):
+            for field in schema.get(step) or []:
+                name = _rule_name_for_field(field.get("id") or field.get("name") or "")
+                if name is None:
+                    continue
+                pattern = _accepted_pattern(name, field.get("pattern"))
+                if pattern:
+                    merged[name]["pattern"] = pattern
+                maxlength = str(field.get("maxlength") or "")
+                if maxlength.isdigit() and all(
+                    len(sample) <= int(maxlength) for sample in VALID_SAMPLES.get(name, ())
+                ):
+                    merged[name]["max_length"] = int(maxlength)
+                # The scraper records `required` for every input, present or not
+                if isinstance(field.get("required"), bool):
+                    merged[name]["required"] = field["required"]
+
+    rules = {
+        name: FieldRule(
+            name, _anchored(rule["pattern"]), rule["max_length"], rule["required"], rule["description"]
+        )
+        for name, rule in merged.items()
+    }
+    return ValidationPlan(rules, version, schema)
+
+
+class ValidationPlanHolder:
+    """
+    Owns the current ValidationPlan and reloads it when the schema changes.
+
+    Readers use `holder.current`; reloads build a complete new plan and
+    replace the reference in one assignment.
+    """
+
+    def __init__(self, path: str, poll_interval: float):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.current = compile_plan(None)
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def reload_if_changed(self) -> bool:
+        """Recompile the plan if the schema file changed; return True on swap"""
+        with self._reload_lock:
+            signature = self._file_signature()
+            if signature == self._signature:
+                return False
+            if signature is None:
+                self.current = compile_plan(None)
+                self._signature = None
+                return True
+            try:
+                with open(self.path, "rb") as f:
+                    raw = f.read()
+                schema = json.loads(raw)
+            except (OSError, ValueError) as e:
+                # Keep serving the previous plan; a half-written file is
+                # picked up again once its next write changes the signature
+                logger.warning("Could not load form schema %s: %s", self.path, e)
+                self._signature = signature
+                return False
+            version = hashlib.sha256(raw).hexdigest()[:16]
+            if version != self.current.version:
+                self.current = compile_plan(schema, version)
+            self._signature = signature
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload_if_changed()
+            except Exception:
+                logger.exception("Form schema reload failed")
+
+    def start(self):
+        """Load the schema now and keep watching it in a daemon thread"""
+        if not os.path.exists(self.path):
+            logger.warning(
+                "Form schema %s not found; using the built-in rules until it is written", self.path
+            )
+        self.reload_if_changed()
+        if self._thread is None and self.poll_interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._watch, name="form-schema-watcher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+# Global plan holder
+plan_holder = ValidationPlanHolder(
+    settings.FORM_SCHEMA_PATH, settings.FORM_SCHEMA_RELOAD_SECONDS
+)
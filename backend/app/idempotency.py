@@ -0,0 +1,321 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import IdempotencyRecord
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+# Final outcomes of the request body, replayed to retries. Anything else
+# (409 concurrent modification, 401/403 step token failures, 5xx) can go
+# differently next time, so the key is released instead.
+STORED_STATUS_CODES = frozenset({400, 404, 422})
+
+logger = logging.getLogger(__name__)
+
+
+class StoredResponse:
+    """A response (or an in-flight marker) remembered for an idempotency key"""
+
+    __slots__ = ("fingerprint", "status_code", "body", "expires_at")
+
+    def __init__(self, fingerprint: str, expires_at: float,
+                 status_code: Optional[int] = None, body: Optional[str] = None):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.status_code = status_code
+        self.body = body
+
+    @property
+    def completed(self) -> bool:
+        return self.status_code is not None
+
+
+class MemoryIdempotencyStore:
+    """
+    Bounded in-process LRU store with per-entry TTL.
+
+    An in-flight marker only lives for `lease_seconds`; after that the key
+    can be taken over, so a request that never finished does not block its
+    key for the whole TTL.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, lease_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self._entries: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """Reserve a key; return the existing entry if the key is already known"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                return entry
+            self._entries[key] = StoredResponse(fingerprint, now + self.lease_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return None
+
+    def complete(self, key: str, fingerprint: str, status_code: int, body: str):
+        with self._lock:
+            self._entries[key] = StoredResponse(
+                fingerprint, time.monotonic() + self.ttl_seconds, status_code, body
+            )
+            self._entries.move_to_end(key)
+
+    def release(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def purge_expired(self) -> int:
+        """Drop expired entries; called by the purge job"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+
+class SQLIdempotencyStore:
+    """
+    Store shared between workers, backed by the idempotency_keys table.
+
+    In-flight markers expire after `lease_seconds` (a worker that crashed
+    mid-request never completes or releases its key); completed responses
+    are kept for `ttl_seconds`.
+    """
+
+    def __init__(self, ttl_seconds: int, lease_seconds: int, session_factory=SessionLocal):
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.session_factory = session_factory
+
+    def begin(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            record = db.get(IdempotencyRecord, key)
+            if record is not None and record.expires_at > now:
+                return StoredResponse(
+                    record.fingerprint, 0, record.status_code, record.response_body
+                )
+            if record is not None:
+                db.delete(record)
+                db.flush()
+            db.add(IdempotencyRecord(
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=self.lease_seconds)
+            ))
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another worker reserved the key between our read and insert
+                db.rollback()
+                record = db.get(IdempotencyRecord, key)
+                if record is None:
+                    return None
+                return StoredResponse(
+                    record.fingerprint, 0, record.status_code, record.response_body
+                )
+            return None
+        finally:
+            db.close()
+
+    def complete(self, key: str, fingerprint: str, status_code: int, body: str):
+        db = self.session_factory()
+        try:
+            db.query(IdempotencyRecord).filter(
+                IdempotencyRecord.key == key,
+                IdempotencyRecord.fingerprint == fingerprint
+            ).update({
+                IdempotencyRecord.status_code: status_code,
+                IdempotencyRecord.response_body: body,
+                IdempotencyRecord.expires_at: datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+            })
+            db.commit()
+        finally:
+            db.close()
+
+    def release(self, key: str):
+        db = self.session_factory()
+        try:
+            db.query(IdempotencyRecord).filter(IdempotencyRecord.key == key).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def purge_expired(self) -> int:
+        """Delete expired keys and abandoned in-flight markers; called by the purge job"""
+        db = self.session_factory()
+        try:
+            deleted = db.query(IdempotencyRecord).filter(
+                IdempotencyRecord.expires_at <= datetime.utcnow()
+            ).delete()
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+
+def request_fingerprint(payload: Any) -> str:
+    """Stable hash of a request body, used to detect key reuse with other data"""
+    encoded = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class IdempotencyGuard:
+    """Per-request handle returned by `idempotent()`"""
+
+    def __init__(self, store, key: Optional[str], fingerprint: Optional[str]):
+        self.store = store
+        self.key = key
+        self.fingerprint = fingerprint
+        self.replay: Optional[JSONResponse] = None
+        self._saved = False
+
+    def save(self, response):
+        """Remember a successful response and hand it back to the endpoint"""
+        if self.key is not None:
+            body = json.dumps(jsonable_encoder(response))
+            self.store.complete(self.key, self.fingerprint, 200, body)
+            self._saved = True
+        return response
+
+
+def _replay_response(entry: StoredResponse) -> JSONResponse:
+    return JSONResponse(
+        status_code=entry.status_code,
+        content=json.loads(entry.body),
+        headers={REPLAY_HEADER: "true"}
+    )
+
+
+@contextmanager
+def idempotent(scope: str, idempotency_key: Optional[str], payload: Any, store=None):
+    """
+    Make a POST handler safe to retry under an Idempotency-Key header.
+
+    Replays of a completed request get the stored response back without
+    running the handler. Validation failures (STORED_STATUS_CODES) are
+    stored as well, so a retry sees the same outcome; other errors release
+    the key so the client can try again.
+    """
+    store = store or idempotency_store
+    if not idempotency_key:
+        yield IdempotencyGuard(store, None, None)
+        return
+
+    if len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} header is too long")
+
+    key = f"{scope}:{idempotency_key}"
+    fingerprint = request_fingerprint(payload)
+    guard = IdempotencyGuard(store, key, fingerprint)
+
+    existing = store.begin(key, fingerprint)
+    if existing is not None:
+        if existing.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=422,
+                detail=f"{IDEMPOTENCY_HEADER} was already used with a different request payload"
+            )
+        if not existing.completed:
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still being processed"
+            )
+        guard.replay = _replay_response(existing)
+        yield guard
+        return
+
+    try:
+        yield guard
+    except HTTPException as e:
+        if e.status_code in STORED_STATUS_CODES:
+            store.complete(key, fingerprint, e.status_code, json.dumps({"detail": e.detail}))
+        else:
+            store.release(key)
+        raise
+    except BaseException:
+        store.release(key)
+        raise
+    else:
+        if not guard._saved:
+            store.release(key)
+
+
+def create_idempotency_store():
+    """Build the store selected by IDEMPOTENCY_BACKEND"""
+    backend = settings.IDEMPOTENCY_BACKEND.lower()
+    if backend == "memory":
+        return MemoryIdempotencyStore(
+            settings.IDEMPOTENCY_MAX_ENTRIES, settings.IDEMPOTENCY_TTL_SECONDS,
+            settings.IDEMPOTENCY_LEASE_SECONDS
+        )
+    if backend == "sql":
+        return SQLIdempotencyStore(settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_LEASE_SECONDS)
+    raise ValueError(f"Unknown IDEMPOTENCY_BACKEND: {settings.IDEMPOTENCY_BACKEND}")
+
+
+# Global idempotency store
+idempotency_store = create_idempotency_store()
+
+
+class IdempotencyPurgeJob:
+    """Runs `store.purge_expired` every `interval` seconds in a background thread"""
+
+    def __init__(self, interval: float, store):
+        self.interval = interval
+        self.store = store
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> int:
+        deleted = self.store.purge_expired()
+        logger.info("Purged %s expired idempotency keys", deleted)
+        return deleted
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Idempotency key purge failed")
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="idempotency-purge", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+# Global purge job instance
+idempotency_purge_job = IdempotencyPurgeJob(settings.IDEMPOTENCY_PURGE_SECONDS, idempotency_store)
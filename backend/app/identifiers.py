@@ -0,0 +1,207 @@
+"""
+Structural validation for Aadhaar, PAN and GSTIN identifiers.
+
+Every check is table driven and pure Python string work, so malformed input
+is rejected in microseconds, before any database or network call. Checks
+return one of the short result codes below instead of raising, which lets
+callers map them onto pre-built responses.
+"""
+
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional
+
+# Result codes
+OK = "ok"
+REQUIRED = "required"
+INVALID_FORMAT = "invalid_format"
+INVALID_LEADING_DIGIT = "invalid_leading_digit"
+INVALID_CHECKSUM = "invalid_checksum"
+INVALID_ENTITY_TYPE = "invalid_entity_type"
+INVALID_SEQUENCE = "invalid_sequence"
+INVALID_STATE_CODE = "invalid_state_code"
+
+# Verhoeff tables: multiplication in the dihedral group D5, the position
+# permutation and the inverse table.
+_VERHOEFF_D = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+    (1, 2, 3, 4, 0, 6, 7, 8, 9, 5),
+    (2, 3, 4, 0, 1, 7, 8, 9, 5, 6),
+    (3, 4, 0, 1, 2, 8, 9, 5, 6, 7),
+    (4, 0, 1, 2, 3, 9, 5, 6, 7, 8),
+    (5, 9, 8, 7, 6, 0, 4, 3, 2, 1),
+    (6, 5, 9, 8, 7, 1, 0, 4, 3, 2),
+    (7, 6, 5, 9, 8, 2, 1, 0, 4, 3),
+    (8, 7, 6, 5, 9, 3, 2, 1, 0, 4),
+    (9, 8, 7, 6, 5, 4, 3, 2, 1, 0),
+)
+_VERHOEFF_P = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+    (1, 5, 7, 6, 2, 8, 3, 0, 9, 4),
+    (5, 8, 0, 3, 7, 9, 6, 1, 4, 2),
+    (8, 9, 1, 6, 0, 4, 3, 5, 2, 7),
+    (9, 4, 5, 3, 1, 2, 6, 8, 7, 0),
+    (4, 2, 8, 6, 5, 7, 3, 9, 0, 1),
+    (2, 7, 9, 3, 8, 0, 6, 4, 1, 5),
+    (7, 0, 4, 6, 9, 1, 3, 2, 5, 8),
+)
+_VERHOEFF_INV = (0, 4, 3, 2, 1, 5, 6, 7, 8, 9)
+
+# d[c][p[pos % 8][digit]] folded into one lookup keyed by the digit character:
+# _VERHOEFF_STEP[pos % 8][c][char] -> next c
+_VERHOEFF_STEP = tuple(
+    tuple(
+        {str(digit): _VERHOEFF_D[c][_VERHOEFF_P[pos][digit]] for digit in range(10)}
+        for c in range(10)
+    )
+    for pos in range(8)
+)
+
+_DIGITS = frozenset("0123456789")
+_UPPER = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+# GSTIN mod-36 alphabet
+_GSTIN_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_GSTIN_VALUE = {ch: i for i, ch in enumerate(_GSTIN_ALPHABET)}
+_GSTIN_STATE_CODES = frozenset(
+    [f"{code:02d}" for code in range(1, 39)] + ["97", "99"]
+)
+
+# Fourth character of a PAN identifies the holder type
+PAN_ENTITY_TYPES: Dict[str, str] = {
+    "A": "Association of Persons",
+    "B": "Body of Individuals",
+    "C": "Company",
+    "E": "Limited Liability Partnership",
+    "F": "Firm",
+    "G": "Government",
+    "H": "Hindu Undivided Family",
+    "J": "Artificial Juridical Person",
+    "K": "Krish (Trust Krish)",
+    "L": "Local Authority",
+    "P": "Individual",
+    "T": "Trust",
+}
+
+# PAN holder types accepted for each OrganizationType value
+ORGANIZATION_PAN_TYPES: Dict[str, FrozenSet[str]] = {
+    "proprietorship": frozenset("P"),
+    "partnership": frozenset("F"),
+    "private-limited": frozenset("C"),
+    "public-limited": frozenset("C"),
+    "llp": frozenset("FE"),
+    "huf": frozenset("H"),
+    "cooperative": frozenset("AJ"),
+    "trust": frozenset("T"),
+}
+
+
+def verhoeff_checksum(number: str) -> int:
+    """Return the Verhoeff checksum of a digit string (0 means valid)"""
+    c = 0
+    steps = _VERHOEFF_STEP
+    for pos, ch in enumerate(reversed(number)):
+        c = steps[pos & 7][c][ch]
+    return c
+
+
+def verhoeff_check_digit(number: str) -> str:
+    """Return the Verhoeff check digit to append to a digit string"""
+    c = 0
+    steps = _VERHOEFF_STEP
+    for pos, ch in enumerate(reversed(number), start=1):
+        c = steps[pos & 7][c][ch]
+    return str(_VERHOEFF_INV[c])
+
+
+def gstin_check_character(first_14: str) -> str:
+    """Return the mod-36 check character for the first 14 GSTIN characters"""
+    total = 0
+    values = _GSTIN_VALUE
+    for i, ch in enumerate(first_14):
+        product = values[ch] * (2 if i & 1 else 1)
+        total += product // 36 + product % 36
+    return _GSTIN_ALPHABET[(36 - total % 36) % 36]
+
+
+def check_aadhaar(aadhaar_number: str) -> str:
+    """Validate length, digits, leading digit and Verhoeff checksum"""
+    if not aadhaar_number:
+        return REQUIRED
+    if len(aadhaar_number) != 12 or not _DIGITS.issuperset(aadhaar_number):
+        return INVALID_FORMAT
+    if aadhaar_number[0] in "01":
+        return INVALID_LEADING_DIGIT
+    if verhoeff_checksum(aadhaar_number) != 0:
+        return INVALID_CHECKSUM
+    return OK
+
+
+def check_pan(pan_number: str) -> str:
+    """Validate PAN layout, holder type and serial number"""
+    if not pan_number:
+        return REQUIRED
+    pan = pan_number.upper()
+    if (len(pan) != 10
+            or not _UPPER.issuperset(pan[:5])
+            or not _DIGITS.issuperset(pan[5:9])
+            or pan[9] not in _UPPER):
+        return INVALID_FORMAT
+    if pan[3] not in PAN_ENTITY_TYPES:
+        return INVALID_ENTITY_TYPE
+    if pan[5:9] == "0000":
+        return INVALID_SEQUENCE
+    return OK
+
+
+def check_gstin(gstin: str) -> str:
+    """Validate GSTIN layout, state code, embedded PAN and check character"""
+    if not gstin:
+        return REQUIRED
+    value = gstin.upper()
+    if len(value) != 15 or not _GSTIN_VALUE.keys() >= set(value):
+        return INVALID_FORMAT
+    if value[13] != "Z" or value[12] == "0":
+        return INVALID_FORMAT
+    if value[:2] not in _GSTIN_STATE_CODES:
+        return INVALID_STATE_CODE
+    pan_result = check_pan(value[2:12])
+    if pan_result != OK:
+        return pan_result
+    if gstin_check_character(value[:14]) != value[14]:
+        return INVALID_CHECKSUM
+    return OK
+
+
+def pan_matches_organization(pan_number: str, organization_type: Optional[str]) -> bool:
+    """
+    Check the PAN holder type against the declared organization type.
+
+    No organization type means there is nothing to check; a type missing
+    from ORGANIZATION_PAN_TYPES is rejected rather than waved through.
+    """
+    if not organization_type:
+        return True
+    allowed = ORGANIZATION_PAN_TYPES.get(str(getattr(organization_type, "value", organization_type)))
+    if allowed is None:
+        return False
+    return pan_number[3:4].upper() in allowed
+
+
+def gstin_matches_pan(gstin: str, pan_number: str) -> bool:
+    """Check that characters 3-12 of the GSTIN are the given PAN"""
+    return gstin[2:12].upper() == pan_number.upper()
+
+
+CHECKS: Dict[str, Callable[[str], str]] = {
+    "aadhaar": check_aadhaar,
+    "pan": check_pan,
+    "gstin": check_gstin,
+}
+
+
+def check_many(kind: str, values: Iterable[str]) -> List[str]:
+    """Run one identifier check over many values, returning a code per value"""
+    try:
+        check = CHECKS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown identifier kind: {kind}")
+    return [check(value) for value in values]
@@ -1,7 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Enum
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Date, DateTime, Boolean, Text, Enum, DDL, Index,
+    ForeignKey, LargeBinary, event
+)
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
 from app.database import Base
 import enum
+import ipaddress
 
 class OrganizationType(str, enum.Enum):
     PROPRIETORSHIP = "proprietorship"
@@ -19,6 +25,41 @@ class RegistrationStatus(str, enum.Enum):
     REJECTED = "rejected"
     COMPLETED = "completed"
 
+class IPAddress(TypeDecorator):
+    """IP address as INET on Postgres, elsewhere packed into 4 (IPv4) or 16 (IPv6) bytes"""
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.INET())
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            address = ipaddress.ip_address(value)
+        except ValueError:
+            # Peers that are not IP addresses (unix sockets, test clients)
+            return None
+        return str(address) if dialect.name == "postgresql" else address.packed
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return str(ipaddress.ip_address(bytes(value)))
+        return str(value)
+
+class UserAgent(Base):
+    __tablename__ = "user_agents"
+
+    # Distinct User-Agent headers; registrations reference them by id (see app.user_agents)
+    id = Column(Integer, primary_key=True)
+    digest = Column(String(64), nullable=False, unique=True)  # sha256 of user_agent
+    user_agent = Column(Text, nullable=False)
+
 class UdyamRegistration(Base):
     __tablename__ = "udyam_registrations"
 
@@ -46,17 +87,51 @@ class UdyamRegistration(Base):
     # Registration Details
     registration_number = Column(String(50), nullable=True, unique=True, index=True)
     status = Column(Enum(RegistrationStatus), default=RegistrationStatus.PENDING)
-    submitted_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Indexed for the analytics snapshot windows (app.snapshots)
+    submitted_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), index=True)
+    
+    # Normalized entrepreneur, PAN and business names, kept by app.search
+    search_names = Column(Text, nullable=True)
     
     # Audit Fields
-    ip_address = Column(String(45), nullable=True)
-    user_agent = Column(Text, nullable=True)
+    ip_address = Column(IPAddress, nullable=True)
+    user_agent_id = Column(Integer, ForeignKey("user_agents.id"), nullable=True)
     consent_given = Column(Boolean, default=True)
     
+    __table_args__ = (
+        # Trigram index for name search on Postgres; SQLite uses the FTS5 table below
+        Index(
+            "ix_udyam_registrations_search_names_trgm", "search_names",
+            postgresql_using="gin", postgresql_ops={"search_names": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+    
     def __repr__(self):
         return f"<UdyamRegistration(id={self.id}, aadhaar={self.aadhaar_number}, status={self.status})>"
 
+event.listen(
+    UdyamRegistration.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
+# External-content FTS5 index over search_names, kept in sync by triggers
+REGISTRATION_SEARCH_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS registration_search USING fts5("
+    "search_names, content='udyam_registrations', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS registration_search_ai AFTER INSERT ON udyam_registrations BEGIN "
+    "INSERT INTO registration_search(rowid, search_names) VALUES (new.id, new.search_names); END",
+    "CREATE TRIGGER IF NOT EXISTS registration_search_ad AFTER DELETE ON udyam_registrations BEGIN "
+    "INSERT INTO registration_search(registration_search, rowid, search_names) "
+    "VALUES ('delete', old.id, old.search_names); END",
+    "CREATE TRIGGER IF NOT EXISTS registration_search_au AFTER UPDATE OF search_names ON udyam_registrations BEGIN "
+    "INSERT INTO registration_search(registration_search, rowid, search_names) "
+    "VALUES ('delete', old.id, old.search_names); "
+    "INSERT INTO registration_search(rowid, search_names) VALUES (new.id, new.search_names); END",
+)
+for statement in REGISTRATION_SEARCH_SQLITE_DDL:
+    event.listen(UdyamRegistration.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
 class ValidationLog(Base):
     __tablename__ = "validation_logs"
 
@@ -66,7 +141,7 @@ class ValidationLog(Base):
     validation_type = Column(String(50), nullable=False)  # aadhaar, pan, otp, etc.
     is_valid = Column(Boolean, nullable=False)
     error_message = Column(Text, nullable=True)
-    validated_at = Column(DateTime(timezone=True), server_default=func.now())
+    validated_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
 class OTPLog(Base):
     __tablename__ = "otp_logs"
@@ -78,4 +153,63 @@ class OTPLog(Base):
     is_expired = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=False)
-    used_at = Column(DateTime(timezone=True), nullable=True) 
\ No newline at end of file
+    used_at = Column(DateTime(timezone=True), nullable=True) 
+
+class RegistrationSequence(Base):
+    __tablename__ = "registration_sequences"
+
+    # One row per year; workers reserve [next_value, next_value + block) at a time
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    next_value = Column(BigInteger, nullable=False)
+
+class ShardLayout(Base):
+    __tablename__ = "shard_layout"
+
+    # Single row (id 1): the shard count registrations were placed and numbered with
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    shard_count = Column(Integer, nullable=False)
+    recorded_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class IdempotencyRecord(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(320), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)  # NULL while the request is in flight
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class RegistrationStat(Base):
+    __tablename__ = "registration_stats"
+
+    # Registrations per submission day, status and organization type ("" when unset),
+    # kept current by the registration steps and reconciled periodically
+    day = Column(Date, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    organization_type = Column(String(30), primary_key=True, default="")
+    registrations = Column(BigInteger, nullable=False, default=0)
+
+class MaintenanceLease(Base):
+    __tablename__ = "maintenance_leases"
+
+    # One row per background job: the worker currently running it, until when,
+    # and when it last finished; lets one of many workers run the job
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(100), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    last_run_at = Column(DateTime, nullable=True)
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    # SQLite would otherwise reuse ids once purging empties the table, and
+    # resume tokens past them would never see new events
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    # Written in the same transaction as the registration change it describes;
+    # ids give the per-shard delivery order of the change feed
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    event_type = Column(String(50), nullable=False)
+    registration_id = Column(Integer, nullable=False, index=True)  # shard-local id
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
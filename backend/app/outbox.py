@@ -0,0 +1,258 @@
+"""
+Transactional outbox behind the registration change feed.
+
+The registration steps add an `OutboxEvent` in the same transaction as the
+change it describes, so an event exists exactly when its change committed.
+Change-feed streams read each shard's outbox in id order from a resume
+token holding one position per shard. Commits in this process wake the
+streams immediately; events written by other workers are picked up by
+polling the outbox (never the registrations table).
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import OutboxEvent
+from app.sharding import Shard, ShardRouter, shard_router
+
+logger = logging.getLogger(__name__)
+
+REGISTRATION_CREATED = "registration.created"
+REGISTRATION_AADHAAR_VERIFIED = "registration.aadhaar_verified"
+REGISTRATION_VERIFIED = "registration.verified"
+
+_PENDING_KEY = "outbox_pending"
+
+
+def registration_snapshot(registration) -> dict:
+    """Event payload for a registration (or anything with the same attributes, e.g. a step token state)"""
+    return {
+        "status": registration.status.value if registration.status else None,
+        "registration_number": registration.registration_number,
+        "organization_type": registration.organization_type.value if registration.organization_type else None,
+        "aadhaar_verified": bool(registration.aadhaar_verified),
+        "otp_verified": bool(registration.otp_verified),
+        "pan_verified": bool(registration.pan_verified)
+    }
+
+
+def record(db: Session, event_type: str, registration, registration_id: Optional[int] = None):
+    """
+    Add an event for `registration` (already flushed) to the current transaction.
+
+    `registration_id` (shard-local) is required when `registration` is a
+    state snapshot rather than the ORM row.
+    """
+    db.add(OutboxEvent(
+        event_type=event_type,
+        registration_id=registration.id if registration_id is None else registration_id,
+        payload=json.dumps(registration_snapshot(registration))
+    ))
+    db.info[_PENDING_KEY] = True
+
+
+class ChangeNotifier:
+    """Wakes change-feed streams in this process when outbox events commit"""
+
+    def __init__(self):
+        self.generation = 0
+        self._waiters = set()
+        self._lock = threading.Lock()
+
+    def notify(self):
+        with self._lock:
+            self.generation += 1
+            waiters = list(self._waiters)
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+
+    async def wait(self, seen_generation: int, timeout: float):
+        """Return after the next commit, or after `timeout`; at once if one happened since `seen_generation`"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self.generation != seen_generation:
+                return
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+# Global notifier instance
+notifier = ChangeNotifier()
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_committed_events(session):
+    if session.info.pop(_PENDING_KEY, False):
+        notifier.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_events(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def encode_token(positions: List[int]) -> str:
+    return ".".join(str(p) for p in positions)
+
+
+def decode_token(token: str, shard_count: int) -> List[int]:
+    """Per-shard positions from a resume token; raises ValueError if malformed"""
+    positions = [int(p) for p in token.split(".")]
+    if len(positions) > shard_count or any(p < 0 for p in positions):
+        raise ValueError("Invalid resume token")
+    return positions + [0] * (shard_count - len(positions))
+
+
+class FeedReader:
+    """
+    Reads the outbox of every shard from a set of positions.
+
+    Outbox ids can commit out of order (a transaction holding id 7 may
+    commit after one holding id 8), so a reader stops at a gap in the ids
+    instead of skipping past it. A gap that stays open for `gap_timeout`
+    seconds belongs to a rolled-back transaction and is skipped.
+    """
+
+    def __init__(self, shards: ShardRouter, positions: List[int], gap_timeout: float,
+                 batch_size: int = 100):
+        self.shards = shards
+        self.positions = positions
+        self.gap_timeout = gap_timeout
+        self.batch_size = batch_size
+        self._gap_since: Dict[int, float] = {}
+
+    @property
+    def token(self) -> str:
+        return encode_token(self.positions)
+
+    def _read_shard(self, shard: Shard) -> List[OutboxEvent]:
+        position = self.positions[shard.index]
+        with self.shards.session(shard) as db:
+            rows = db.query(OutboxEvent).filter(
+                OutboxEvent.id > position
+            ).order_by(OutboxEvent.id).limit(self.batch_size).all()
+
+        events = []
+        expected = position + 1
+        for row in rows:
+            # Position 0 means "from the start": whatever was purged before the
+            # oldest event is not a gap
+            if row.id != expected and position > 0:
+                gap_since = self._gap_since.setdefault(shard.index, time.monotonic())
+                if time.monotonic() - gap_since < self.gap_timeout:
+                    break
+            self._gap_since.pop(shard.index, None)
+            events.append(row)
+            expected = row.id + 1
+            position = row.id
+        return events
+
+    def read(self) -> List[Tuple[Shard, OutboxEvent, str]]:
+        """
+        Next events from every shard as (shard, event, token after the event).
+
+        Events of one registration stay in order (they share a shard); events
+        from different shards are interleaved by creation time.
+        """
+        per_shard = [
+            [(shard, row) for row in self._read_shard(shard)] for shard in self.shards.shards
+        ]
+        results = []
+        # Each shard's events keep their id order; the merge only interleaves shards
+        for shard, row in heapq.merge(*per_shard, key=lambda item: (_utc(item[1].created_at), item[0].index)):
+            self.positions[shard.index] = row.id
+            results.append((shard, row, self.token))
+        return results
+
+
+def _utc(value: Optional[datetime]) -> datetime:
+    # SQLite hands back naive UTC timestamps
+    if value is None:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def event_message(shards: ShardRouter, shard: Shard, row: OutboxEvent) -> dict:
+    created_at = _utc(row.created_at) if row.created_at else None
+    return {
+        "type": row.event_type,
+        "registration_id": shards.encode_id(shard, row.registration_id),
+        "occurred_at": created_at.isoformat() if created_at else None,
+        "data": json.loads(row.payload)
+    }
+
+
+def purge_expired(db: Session, retention_days: Optional[int] = None) -> int:
+    """Delete events older than the retention period; returns rows deleted"""
+    retention_days = settings.OUTBOX_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    if db.get_bind().dialect.name == "sqlite":
+        cutoff = cutoff.replace(tzinfo=None)
+    deleted = db.query(OutboxEvent).filter(
+        OutboxEvent.created_at < cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def purge_all(shards: ShardRouter) -> int:
+    """`purge_expired` on every shard; returns rows deleted"""
+    deleted = 0
+    for shard in shards.shards:
+        with shards.session(shard) as db:
+            deleted += purge_expired(db)
+    return deleted
+
+
+class OutboxPurgeJob:
+    """Runs `purge_all` every `interval` seconds in a background thread"""
+
+    def __init__(self, interval: float, shards: ShardRouter = shard_router):
+        self.interval = interval
+        self.shards = shards
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> int:
+        deleted = purge_all(self.shards)
+        logger.info("Purged %s expired outbox events", deleted)
+        return deleted
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Outbox purge failed")
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox-purge", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+# Global purge job instance
+outbox_purge_job = OutboxPurgeJob(settings.OUTBOX_PURGE_SECONDS)
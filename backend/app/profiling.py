@@ -0,0 +1,299 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it carries the admin token in the
+`X-Profile-Request` header or is picked by `PROFILING_SAMPLE_RATE`. Every SQL
+statement it issues (on any shard or replica) is timed in order, and the
+result is written to a bounded on-disk ring buffer served by the /profiles
+endpoints. A profile ends early when the response turns out to be an event
+stream, or after PROFILING_MAX_SECONDS, so the long-lived change feed cannot
+hold the profiler or grow its trace forever.
+
+cProfile hooks the whole event loop thread, not one request, so it only
+runs while the profiled request is the only one in flight: it is skipped
+when other requests are already running and stopped when another one
+arrives (`cpu_profile` is then "skipped" or "partial"). The SQL trace is
+per request and always complete.
+
+Nothing is installed unless profiling is configured: no middleware and no
+SQLAlchemy listeners, so a disabled deployment pays nothing.
+"""
+
+import asyncio
+import contextvars
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile-Request"
+PROFILE_ID_HEADER = "X-Profile-Id"
+ADMIN_HEADER = "X-Profile-Admin"
+
+# Functions listed in the text summary stored with each profile
+SUMMARY_LINES = 40
+
+_PROFILE_ID = re.compile(r"^\d{8}T\d{6}-[0-9a-f]{8}$")
+
+# SQL trace of the request being profiled, if any
+current_trace: contextvars.ContextVar[Optional["SQLTrace"]] = contextvars.ContextVar(
+    "profiling_sql_trace", default=None
+)
+
+
+def profiling_enabled() -> bool:
+    return bool(settings.PROFILING_ADMIN_TOKEN) or settings.PROFILING_SAMPLE_RATE > 0
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    return bool(settings.PROFILING_ADMIN_TOKEN) and token is not None and hmac.compare_digest(
+        token.encode("utf-8"), settings.PROFILING_ADMIN_TOKEN.encode("utf-8")
+    )
+
+
+class SQLTrace:
+    """Ordered SQL statements of one request with their timings, up to `max_statements`"""
+
+    def __init__(self, max_statements: int = 0):
+        self.started = time.perf_counter()
+        self.statements: List[dict] = []
+        self.max_statements = max_statements
+        self.dropped = 0
+        self.closed = False
+
+    def add(self, database: str, statement: str, started: float, executemany: bool):
+        if self.closed:
+            return
+        if self.max_statements and len(self.statements) >= self.max_statements:
+            self.dropped += 1
+            return
+        now = time.perf_counter()
+        self.statements.append({
+            "offset_ms": round((started - self.started) * 1000, 3),
+            "duration_ms": round((now - started) * 1000, 3),
+            "database": database,
+            "statement": statement,
+            "executemany": executemany
+        })
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_trace.get() is not None:
+        conn.info.setdefault("profiling_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = current_trace.get()
+    started = conn.info.get("profiling_started")
+    if trace is None or not started:
+        return
+    # Parameters are left out: they hold Aadhaar and PAN numbers
+    trace.add(conn.engine.url.database or "", statement, started.pop(), executemany)
+
+
+def _discard_failed_statement(context):
+    # A statement that raised never reaches after_cursor_execute
+    started = context.connection.info.get("profiling_started") if context.connection is not None else None
+    if current_trace.get() is not None and started:
+        started.pop()
+
+
+def install_sql_trace(engines):
+    """Time statements on `engines` for profiled requests (other requests pay one contextvar lookup)"""
+    for engine in {id(e): e for e in engines}.values():
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _discard_failed_statement)
+
+
+def new_profile_id() -> str:
+    # Sorts by time, so the ring buffer can evict by name
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+
+
+class ProfileStore:
+    """Ring buffer of profiles on disk: <id>.json (request, SQL, summary) and <id>.pstats"""
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def save(self, profile_id: str, meta: dict, profiler: Optional[cProfile.Profile], trace: SQLTrace):
+        artifact = dict(meta, id=profile_id, sql=trace.statements, summary=None)
+        os.makedirs(self.directory, exist_ok=True)
+
+        if profiler is not None:
+            profiler.dump_stats(os.path.join(self.directory, f"{profile_id}.pstats"))
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(SUMMARY_LINES)
+            artifact["summary"] = out.getvalue()
+
+        tmp_path = os.path.join(self.directory, f".{profile_id}.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(artifact, f)
+        os.replace(tmp_path, os.path.join(self.directory, f"{profile_id}.json"))
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            ids = self.ids()
+            for profile_id in ids[self.max_profiles:]:
+                for suffix in (".json", ".pstats"):
+                    try:
+                        os.remove(os.path.join(self.directory, profile_id + suffix))
+                    except FileNotFoundError:
+                        pass
+
+    def ids(self) -> List[str]:
+        """Stored profile ids, newest first"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted((n[:-5] for n in names if n.endswith(".json") and _PROFILE_ID.match(n[:-5])),
+                      reverse=True)
+
+    def path(self, profile_id: str, suffix: str) -> Optional[str]:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, profile_id + suffix)
+        return path if os.path.exists(path) else None
+
+    def load(self, profile_id: str) -> Optional[dict]:
+        path = self.path(profile_id, ".json")
+        if path is None:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests picked by header or sampling"""
+
+    def __init__(self, app, store: ProfileStore):
+        self.app = app
+        self.store = store
+        # HTTP requests in flight on this event loop, profiled or not
+        self._in_flight = 0
+        # Stops the running cProfile, if any; cProfile sees every coroutine
+        # on the loop, so it only runs while its request is alone
+        self._stop_profiler: Optional[Callable[[], None]] = None
+
+    def _trigger(self, scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"x-profile-request":
+                return "header" if is_admin_token(value.decode("latin-1")) else None
+        if settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        self._in_flight += 1
+        try:
+            # Whatever runs from now on would land in the running profile
+            if self._stop_profiler is not None:
+                self._stop_profiler()
+            trigger = self._trigger(scope)
+            if trigger is None:
+                await self.app(scope, receive, send)
+            else:
+                await self._profile(scope, receive, send, trigger)
+        finally:
+            self._in_flight -= 1
+
+    async def _profile(self, scope, receive, send, trigger: str):
+        profile_id = new_profile_id()
+        response = {"status": None, "stopped_at": None, "stopped_by": None}
+        trace = SQLTrace(settings.PROFILING_MAX_STATEMENTS)
+        profiler = None
+        cpu_profile = "skipped"
+
+        def stop_profiler():
+            nonlocal cpu_profile
+            if self._stop_profiler is stop_profiler:
+                profiler.disable()
+                self._stop_profiler = None
+                if response["stopped_at"] is None:
+                    cpu_profile = "partial"
+
+        def stop(reason: Optional[str]):
+            """End the profile; whatever the request does afterwards is not measured"""
+            if response["stopped_at"] is not None:
+                return
+            response["stopped_at"] = time.perf_counter()
+            response["stopped_by"] = reason
+            trace.closed = True
+            stop_profiler()
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                headers = list(message.get("headers", []))
+                if trigger == "header":
+                    message["headers"] = headers + [
+                        (PROFILE_ID_HEADER.lower().encode("latin-1"), profile_id.encode("latin-1"))
+                    ]
+                # An event stream stays open indefinitely; profile its setup only
+                if any(name.lower() == b"content-type" and value.startswith(b"text/event-stream")
+                       for name, value in headers):
+                    stop("event stream")
+            await send(message)
+
+        trace_token = current_trace.set(trace)
+        if self._in_flight == 1:
+            profiler = cProfile.Profile()
+            cpu_profile = "full"
+            self._stop_profiler = stop_profiler
+            profiler.enable()
+        started = time.perf_counter()
+        timer = None
+        if settings.PROFILING_MAX_SECONDS > 0:
+            timer = asyncio.get_running_loop().call_later(settings.PROFILING_MAX_SECONDS, stop, "time limit")
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            stop(None)
+            current_trace.reset(trace_token)
+            meta = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": response["status"],
+                "trigger": trigger,
+                "duration_ms": round((response["stopped_at"] - started) * 1000, 3),
+                "stopped_by": response["stopped_by"],
+                "cpu_profile": cpu_profile,
+                "sql_ms": round(sum(s["duration_ms"] for s in trace.statements), 3),
+                "sql_dropped": trace.dropped,
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            }
+            try:
+                # Writing the pstats file and summary is blocking disk I/O
+                await run_in_threadpool(self.store.save, profile_id, meta, profiler, trace)
+            except OSError:
+                logger.exception("Could not store request profile")
+
+
+# Global profile store
+profile_store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
@@ -0,0 +1,123 @@
+import heapq
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import RegistrationSequence, UdyamRegistration
+
+NUMBER_FORMAT = "UDYAM-{sequence:06d}-{year}"
+
+
+class RegistrationNumberAllocator:
+    """
+    Hi-lo allocator for Udyam registration numbers.
+
+    Each worker reserves a block of `block_size` numbers per year with one
+    atomic UPDATE on the registration_sequences table, then hands them out
+    from memory, so issuing a number costs no database round-trip until the
+    block runs out. Blocks never overlap, so numbers are unique across
+    workers. Numbers whose registration failed to commit are released and
+    reissued first, and `close()` hands an untouched block tail back to the
+    sequence when no other worker has reserved past it.
+    """
+
+    def __init__(self, block_size: int, session_factory=SessionLocal):
+        self.block_size = block_size
+        self.session_factory = session_factory
+        self._blocks: Dict[int, List[int]] = {}  # year -> [next, end)
+        self._released: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, year: Optional[int] = None) -> str:
+        """Issue the next registration number for `year` (default: this year)"""
+        year = year or datetime.now().year
+        with self._lock:
+            released = self._released.get(year)
+            if released:
+                return self.format(heapq.heappop(released), year)
+            block = self._blocks.get(year)
+            if block is None or block[0] >= block[1]:
+                block = list(self._reserve_block(year))
+                self._blocks[year] = block
+            sequence = block[0]
+            block[0] += 1
+        return self.format(sequence, year)
+
+    def release(self, registration_number: str):
+        """Return a number whose registration was not committed"""
+        sequence, year = self.parse(registration_number)
+        with self._lock:
+            heapq.heappush(self._released.setdefault(year, []), sequence)
+
+    def close(self):
+        """Give unused block tails back to the sequence where possible"""
+        with self._lock:
+            blocks, self._blocks = self._blocks, {}
+            released, self._released = self._released, {}
+        db = self.session_factory()
+        try:
+            for year, (start, end) in blocks.items():
+                # Released numbers directly below the tail can go back too
+                pending = sorted(released.get(year, []))
+                while pending and pending[-1] == start - 1:
+                    start = pending.pop()
+                if start >= end:
+                    continue
+                db.query(RegistrationSequence).filter(
+                    RegistrationSequence.year == year,
+                    RegistrationSequence.next_value == end
+                ).update({RegistrationSequence.next_value: start}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _reserve_block(self, year: int) -> Tuple[int, int]:
+        db = self.session_factory()
+        try:
+            for _ in range(3):
+                # The UPDATE takes the row (Postgres) or database (SQLite) write
+                # lock before we read the new value back, so blocks never overlap
+                updated = db.query(RegistrationSequence).filter(
+                    RegistrationSequence.year == year
+                ).update(
+                    {RegistrationSequence.next_value: RegistrationSequence.next_value + self.block_size},
+                    synchronize_session=False
+                )
+                if updated:
+                    end = db.query(RegistrationSequence.next_value).filter(
+                        RegistrationSequence.year == year
+                    ).scalar()
+                    db.commit()
+                    return end - self.block_size, end
+
+                # First block of the year. Start above every row id, so numbers
+                # never collide with ones issued as UDYAM-{id}-{year} before.
+                start = (db.query(func.max(UdyamRegistration.id)).scalar() or 0) + 1
+                db.add(RegistrationSequence(year=year, next_value=start + self.block_size))
+                try:
+                    db.commit()
+                    return start, start + self.block_size
+                except IntegrityError:
+                    # Another worker created the year's row first; take a block from it
+                    db.rollback()
+            raise RuntimeError(f"Could not reserve registration numbers for {year}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def format(sequence: int, year: int) -> str:
+        return NUMBER_FORMAT.format(sequence=sequence, year=year)
+
+    @staticmethod
+    def parse(registration_number: str) -> Tuple[int, int]:
+        _, sequence, year = registration_number.split("-")
+        return int(sequence), int(year)
+
+
+# Global allocator instance
+registration_numbers = RegistrationNumberAllocator(settings.REGISTRATION_NUMBER_BLOCK_SIZE)
@@ -0,0 +1,104 @@
+import itertools
+import logging
+import threading
+import time
+from typing import List, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.database import replica_engine_options
+
+logger = logging.getLogger(__name__)
+
+# Set after a write; while present the client's reads go to the primary
+READ_YOUR_WRITES_COOKIE = "udyam_read_primary"
+
+
+class Replica:
+    """One read replica and its health state"""
+
+    def __init__(self, url: str):
+        self.engine = create_engine(url, **replica_engine_options(url))
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.ejected_until = 0.0
+
+    def __repr__(self):
+        return f"<Replica(url={self.engine.url!r})>"
+
+
+class ReplicaSet:
+    """
+    Read replicas of one primary, used round-robin.
+
+    A replica that fails to hand out a connection is ejected for
+    `eject_seconds` and the next one is tried; once the ejection expires it
+    is tried again. `open_session` returns None when no replica is usable,
+    so the caller can fall back to the primary.
+    """
+
+    def __init__(self, urls: List[str], eject_seconds: float):
+        self.replicas = [Replica(url) for url in urls]
+        self.eject_seconds = eject_seconds
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def healthy(self) -> List[Replica]:
+        now = time.monotonic()
+        return [r for r in self.replicas if r.ejected_until <= now]
+
+    def eject(self, replica: Replica, error: Exception):
+        with self._lock:
+            replica.ejected_until = time.monotonic() + self.eject_seconds
+        logger.warning("Ejecting %r for %ss: %s", replica, self.eject_seconds, error)
+
+    def open_session(self) -> Optional[Session]:
+        healthy = self.healthy()
+        if not healthy:
+            return None
+        start = next(self._turn)
+        for offset in range(len(healthy)):
+            replica = healthy[(start + offset) % len(healthy)]
+            db = replica.session_factory()
+            try:
+                # Check out a connection now so a dead replica is caught here
+                db.connection()
+                return db
+            except DBAPIError as e:
+                db.close()
+                self.eject(replica, e)
+        return None
+
+
+def create_replica_sets(count: int) -> List[ReplicaSet]:
+    """One ReplicaSet per primary from DATABASE_REPLICA_URLS (groups split by ";")"""
+    groups = settings.DATABASE_REPLICA_URLS.split(";") if settings.DATABASE_REPLICA_URLS.strip() else []
+    if len(groups) > count:
+        raise ValueError(
+            f"DATABASE_REPLICA_URLS has {len(groups)} replica groups for {count} primary database(s)"
+        )
+    groups += [""] * (count - len(groups))
+    return [
+        ReplicaSet([url.strip() for url in group.split(",") if url.strip()], settings.REPLICA_EJECT_SECONDS)
+        for group in groups
+    ]
+
+
+def pin_reads_to_primary(response: Response):
+    """Send this client's reads to the primary until replicas have caught up"""
+    response.set_cookie(
+        READ_YOUR_WRITES_COOKIE, "1",
+        max_age=settings.READ_YOUR_WRITES_SECONDS,
+        httponly=True,
+        samesite="lax"
+    )
+
+
+def reads_need_primary(request: Request) -> bool:
+    return READ_YOUR_WRITES_COOKIE in request.cookies
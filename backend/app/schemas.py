@@ -1,5 +1,5 @@
 from pydantic import BaseModel, validator, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime, date
 from app.models import OrganizationType, RegistrationStatus
 
@@ -31,11 +31,13 @@ class AadhaarVerificationResponse(BaseModel):
     message: str
     registration_id: Optional[int] = None
     otp_sent: bool = False
+    step_token: Optional[str] = None
 
 # OTP Validation Schemas
 class OTPValidationRequest(BaseModel):
     registration_id: int = Field(..., description="Registration ID from step 1")
     otp_code: str = Field(..., min_length=6, max_length=6, description="6-digit OTP")
+    step_token: Optional[str] = Field(None, description="Step token from step 1")
 
     @validator('otp_code')
     def validate_otp(cls, v):
@@ -47,6 +49,7 @@ class OTPValidationResponse(BaseModel):
     success: bool
     message: str
     aadhaar_verified: bool = False
+    step_token: Optional[str] = None
 
 # Step 2: PAN Validation Schemas
 class PANValidationRequest(BaseModel):
@@ -55,6 +58,7 @@ class PANValidationRequest(BaseModel):
     pan_name: str = Field(..., min_length=1, max_length=255, description="Name as per PAN")
     date_of_incorporation: Optional[date] = Field(None, description="Date of incorporation")
     organization_type: Optional[OrganizationType] = Field(None, description="Type of organization")
+    step_token: Optional[str] = Field(None, description="Step token from OTP validation")
 
     @validator('pan_number')
     def validate_pan(cls, v):
@@ -75,6 +79,7 @@ class PANValidationResponse(BaseModel):
     message: str
     pan_verified: bool = False
     registration_number: Optional[str] = None
+    step_token: Optional[str] = None
 
 # Complete Registration Schema
 class CompleteRegistrationRequest(BaseModel):
@@ -110,6 +115,36 @@ class RegistrationResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Batch Lookup Schemas
+BATCH_LOOKUP_MAX_KEYS = 5000
+
+class BatchLookupRequest(BaseModel):
+    ids: List[int] = Field(default_factory=list, description="Registration IDs")
+    registration_numbers: List[str] = Field(default_factory=list, description="Udyam registration numbers")
+
+    @validator('registration_numbers', each_item=True)
+    def normalize_registration_number(cls, v):
+        return v.strip().upper()
+
+    @validator('registration_numbers', always=True)
+    def validate_key_count(cls, v, values):
+        if len(values.get('ids', [])) + len(v) > BATCH_LOOKUP_MAX_KEYS:
+            raise ValueError(f'At most {BATCH_LOOKUP_MAX_KEYS} ids and registration numbers per request')
+        return v
+
+class RegistrationSearchHit(BaseModel):
+    id: int
+    entrepreneur_name: str
+    pan_name: Optional[str]
+    business_name: Optional[str]
+    registration_number: Optional[str]
+    status: RegistrationStatus
+    score: float
+
+class RegistrationSearchResponse(BaseModel):
+    items: List[RegistrationSearchHit]
+    next_cursor: Optional[str] = None
+
 # Validation Response Schemas
 class ValidationResponse(BaseModel):
     is_valid: bool
@@ -0,0 +1,180 @@
+"""
+Name search over registrations.
+
+Entrepreneur, PAN and business names are normalized (case, whitespace and
+dots folded) into `UdyamRegistration.search_names` whenever a registration
+is written. That column is indexed with a pg_trgm GIN index on Postgres and
+an FTS5 trigram table on SQLite (see app.models), so lookups touch only
+matching rows. Results are ranked by relevance - word prefix matches first,
+then trigram similarity - and paginated with a (score, id) keyset cursor.
+"""
+
+import base64
+import json
+import re
+import sqlite3
+import unicodedata
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Numeric, case, cast, event, func, literal, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models import UdyamRegistration
+
+SEARCHED_FIELDS = ("entrepreneur_name", "pan_name", "business_name")
+NAME_SEPARATOR = " | "
+MIN_QUERY_LENGTH = 3
+# Lowest trigram word similarity that still counts as a (fuzzy) match
+MIN_SIMILARITY = 0.5
+
+_DOTS = re.compile(r"\.")
+_SPACES = re.compile(r"\s+")
+_WORDS = re.compile(r"\w+")
+
+SearchHit = Tuple[int, float]  # (local registration id, score)
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Case-folded name with dots and repeated whitespace removed"""
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFKC", name).casefold()
+    # Dots become spaces first so "R.K." and "R. K." both end up as initials "r k"
+    words = _SPACES.sub(" ", _DOTS.sub(" ", name)).split()
+    # Runs of initials are joined: "r k sharma" -> "rk sharma"
+    merged = []
+    for word in words:
+        if len(word) == 1 and merged and merged[-1][1]:
+            merged[-1] = (merged[-1][0] + word, True)
+        else:
+            merged.append((word, len(word) == 1))
+    return " ".join(word for word, _ in merged)
+
+
+def search_names_for(registration: UdyamRegistration) -> Optional[str]:
+    names = []
+    for field in SEARCHED_FIELDS:
+        name = normalize_name(getattr(registration, field))
+        if name and name not in names:
+            names.append(name)
+    return NAME_SEPARATOR.join(names) or None
+
+
+@event.listens_for(UdyamRegistration, "before_insert")
+@event.listens_for(UdyamRegistration, "before_update")
+def _update_search_names(mapper, connection, registration):
+    registration.search_names = search_names_for(registration)
+
+
+def encode_cursor(score: float, registration_id: int) -> str:
+    raw = json.dumps([score, registration_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """(score, id) of the last hit on the previous page; raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, registration_id = json.loads(raw)
+        return float(score), int(registration_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _trigrams(text: str) -> set:
+    """pg_trgm-style trigrams: each word padded with two leading and one trailing space"""
+    grams = set()
+    for word in _WORDS.findall(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def word_similarity(query: Optional[str], names: Optional[str]) -> float:
+    """
+    Share of the query's trigrams found in the best matching name.
+
+    Registered as an SQL function on SQLite connections so both backends rank
+    with the same `word_similarity(query, search_names)` expression (pg_trgm
+    provides it natively on Postgres).
+    """
+    if not query or not names:
+        return 0.0
+    query_grams = _trigrams(query)
+    if not query_grams:
+        return 0.0
+    return max(
+        len(query_grams & _trigrams(name)) / len(query_grams)
+        for name in names.split(NAME_SEPARATOR)
+    )
+
+
+@event.listens_for(Engine, "connect")
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function("word_similarity", 2, word_similarity, deterministic=True)
+
+
+def _trigram_match(query: str) -> str:
+    """FTS5 MATCH expression hitting any trigram of `query`"""
+    trigrams = dict.fromkeys(query[i:i + 3] for i in range(len(query) - 2))
+    return " OR ".join('"' + t.replace('"', '""') + '"' for t in trigrams)
+
+
+def _prefix_match(column, query: str):
+    escaped = _like_escape(query)
+    return or_(column.like(f"{escaped}%", escape="\\"), column.like(f"% {escaped}%", escape="\\"))
+
+
+def search(db: Session, query: str, limit: int,
+           after: Optional[Tuple[float, int]] = None) -> List[SearchHit]:
+    """
+    Best `limit` matches for an already normalized `query`, ordered by score
+    (descending) then id. `after` is the (score, local id) the page starts after.
+
+    Score is 1 for a word prefix match plus the trigram word similarity, so
+    prefix matches rank first and misspellings down to MIN_SIMILARITY match.
+    """
+    column = UdyamRegistration.search_names
+    dialect = db.get_bind().dialect.name
+    prefix = _prefix_match(column, query)
+
+    if dialect in ("postgresql", "sqlite"):
+        similarity = func.word_similarity(query, column)
+        score = func.round(cast(similarity + case((prefix, 1), else_=0), Numeric), 4)
+        if dialect == "postgresql":
+            # `query <% search_names` is answered from the trigram GIN index
+            db.execute(select(func.set_config(
+                "pg_trgm.word_similarity_threshold", str(MIN_SIMILARITY), True
+            )))
+            matches = or_(literal(query).op("<%")(column), column.like(
+                f"%{_like_escape(query)}%", escape="\\"
+            ))
+        else:
+            # Candidates come from the FTS5 trigram index, then get the same threshold
+            fts_hits = text(
+                "SELECT rowid FROM registration_search WHERE registration_search MATCH :match"
+            ).bindparams(match=_trigram_match(query)).columns(UdyamRegistration.id)
+            matches = UdyamRegistration.id.in_(fts_hits) & or_(prefix, similarity >= MIN_SIMILARITY)
+    else:
+        # No trigram support: substring scan, ranked by prefix matches only
+        score = case((prefix, 1.0), else_=0.0)
+        matches = column.like(f"%{_like_escape(query)}%", escape="\\")
+
+    ranked = db.query(
+        UdyamRegistration.id.label("id"), score.label("score")
+    ).filter(matches).subquery()
+    page = db.query(ranked.c.id, ranked.c.score)
+    if after is not None:
+        after_score, after_id = after
+        page = page.filter(or_(
+            ranked.c.score < after_score,
+            (ranked.c.score == after_score) & (ranked.c.id > after_id)
+        ))
+    rows = page.order_by(ranked.c.score.desc(), ranked.c.id).limit(limit).all()
+    return [(registration_id, float(score)) for registration_id, score in rows]
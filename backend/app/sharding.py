@@ -0,0 +1,198 @@
+import hashlib
+import heapq
+from contextlib import contextmanager
+from itertools import islice
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.database import SessionLocal, engine, primary_engine_options
+from app.models import ShardLayout, UdyamRegistration
+from app.replicas import ReplicaSet, create_replica_sets
+
+# Registration ids carry their shard in the low bits: global = local * stride + shard
+MAX_SHARDS = 64
+
+
+class Shard:
+    """One registrations database and its read replicas"""
+
+    def __init__(self, index: int, engine, session_factory, replicas: Optional[ReplicaSet] = None):
+        self.index = index
+        self.engine = engine
+        self.session_factory = session_factory
+        self.replicas = replicas or ReplicaSet([], 0)
+
+    def __repr__(self):
+        return f"<Shard(index={self.index}, url={self.engine.url!r})>"
+
+
+class ShardRouter:
+    """
+    Routes registration data to shards by Aadhaar hash.
+
+    `UdyamRegistration`, `OTPLog` and `ValidationLog` rows for one identity all
+    live on the shard picked by `shard_for_aadhaar`, and registration ids
+    returned to clients encode that shard so later steps can be routed
+    without a lookup. With no shard URLs configured there is a single shard
+    (the primary database) and ids are left unencoded.
+
+    Sessions opened with `read_only=True` go to one of the shard's replicas
+    when it has any, and to the shard itself otherwise.
+
+    Placement depends on the number of shards, so it is fixed once
+    registrations exist; see `check_layout`.
+    """
+
+    def __init__(self, shards: List[Shard]):
+        if not shards:
+            raise ValueError("At least one shard is required")
+        if len(shards) > MAX_SHARDS:
+            raise ValueError(f"At most {MAX_SHARDS} shards are supported")
+        self.shards = shards
+
+    @classmethod
+    def from_urls(cls, urls: Iterable[str], **engine_options) -> "ShardRouter":
+        shards = []
+        for index, url in enumerate(urls):
+            shard_engine = create_engine(url, **{**primary_engine_options(url), **engine_options})
+            shards.append(Shard(
+                index, shard_engine,
+                sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)
+            ))
+        return cls(shards)
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.shards) > 1
+
+    def shard_for_aadhaar(self, aadhaar_number: str) -> Shard:
+        digest = hashlib.sha256(aadhaar_number.encode("utf-8")).digest()
+        return self.shards[int.from_bytes(digest[:8], "big") % len(self.shards)]
+
+    def encode_id(self, shard: Shard, local_id: int) -> int:
+        if not self.sharded:
+            return local_id
+        return local_id * MAX_SHARDS + shard.index
+
+    def locate(self, registration_id: int) -> Tuple[Optional[Shard], int]:
+        """Shard and shard-local id for a client-facing registration id"""
+        if not self.sharded:
+            return self.shards[0], registration_id
+        local_id, index = divmod(registration_id, MAX_SHARDS)
+        if index >= len(self.shards):
+            return None, local_id
+        return self.shards[index], local_id
+
+    def local_id_after(self, shard: Shard, registration_id: int) -> int:
+        """Largest local id on `shard` whose client-facing id is <= registration_id"""
+        if not self.sharded:
+            return registration_id
+        return (registration_id - shard.index) // MAX_SHARDS
+
+    @contextmanager
+    def session(self, shard: Shard, read_only: bool = False):
+        db: Optional[Session] = shard.replicas.open_session() if read_only else None
+        if db is None:
+            db = shard.session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def any_shard(self, predicate: Callable[[Session, Shard], bool]) -> bool:
+        """True if `predicate(db, shard)` holds on any shard; stops at the first hit"""
+        for shard in self.shards:
+            with self.session(shard) as db:
+                if predicate(db, shard):
+                    return True
+        return False
+
+    def merged(self, query: Callable[[Session, Shard], list], key: Callable,
+               skip: int = 0, limit: int = 100, read_only: bool = False) -> list:
+        """
+        Fan a query out to every shard and merge the sorted results.
+
+        `query(db, shard)` must return at most skip + limit rows ordered by
+        `key`; the merge then yields the global page [skip, skip + limit).
+        """
+        per_shard = []
+        for shard in self.shards:
+            with self.session(shard, read_only) as db:
+                per_shard.append([(shard, row) for row in query(db, shard)])
+        return list(islice(
+            heapq.merge(*per_shard, key=lambda item: key(*item)), skip, skip + limit
+        ))
+
+    def engines(self) -> list:
+        """Engines of every shard and replica"""
+        return [e for shard in self.shards
+                for e in [shard.engine] + [replica.engine for replica in shard.replicas.replicas]]
+
+    def create_all(self, metadata):
+        for shard in self.shards:
+            metadata.create_all(bind=shard.engine)
+
+    def check_layout(self, session_factory=SessionLocal):
+        """
+        Record the shard count on the primary database, or refuse to start if
+        it differs from the recorded one.
+
+        With another count an Aadhaar hashes to another shard, where the
+        shard-local duplicate check would let it register again, and plain
+        ids from an unsharded database would be decoded as shard-encoded ones.
+        Changing the count means moving every registration to its new shard
+        (and renumbering its id) offline first.
+        """
+        count = len(self.shards)
+        db = session_factory()
+        try:
+            layout = db.get(ShardLayout, 1)
+            if layout is None:
+                # Databases from before the layout was recorded held a single shard
+                # on the primary, unless the primary is itself one of the shards
+                primary_url = db.get_bind().url.render_as_string(hide_password=False)
+                primary_is_shard = any(
+                    shard.engine.url.render_as_string(hide_password=False) == primary_url
+                    for shard in self.shards
+                )
+                if not primary_is_shard and db.query(UdyamRegistration.id).first() is not None:
+                    recorded = 1
+                else:
+                    db.add(ShardLayout(id=1, shard_count=count))
+                    try:
+                        db.commit()
+                        return
+                    except IntegrityError:
+                        # Recorded concurrently by another worker
+                        db.rollback()
+                        recorded = db.get(ShardLayout, 1).shard_count
+            else:
+                recorded = layout.shard_count
+        finally:
+            db.close()
+        if recorded != count:
+            raise RuntimeError(
+                f"SHARD_DATABASE_URLS configures {count} shard(s) but existing registrations "
+                f"were placed on {recorded}; registrations must be moved to their new shards "
+                f"before the shard count can change"
+            )
+
+
+def create_shard_router() -> ShardRouter:
+    urls = [url.strip() for url in settings.SHARD_DATABASE_URLS.split(",") if url.strip()]
+    router = ShardRouter.from_urls(urls) if urls else ShardRouter([Shard(0, engine, SessionLocal)])
+    for shard, replicas in zip(router.shards, create_replica_sets(len(router.shards))):
+        shard.replicas = replicas
+    return router
+
+
+# Global shard router
+shard_router = create_shard_router()
+
+# Dependency to get the shard router
+def get_shard_router() -> ShardRouter:
+    return shard_router
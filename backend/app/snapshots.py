@@ -0,0 +1,403 @@
+"""
+Columnar snapshots of registrations and validation logs for analytics.
+
+A background job appends rows changed since the last run to compressed
+Parquet files, so aggregate queries read those files instead of the OLTP
+tables. Every run reads the window (watermark, now - SNAPSHOT_LAG_SECONDS]
+of each shard from its replicas, writes it under SNAPSHOT_DIR partitioned
+by day and status, and then moves the shard's watermark to the end of the
+window. The lag gives replicas and in-flight transactions time to settle.
+
+    registrations/submitted_on=2024-01-01/status=verified/part-s0-<run>-0.parquet
+    validation_logs/validated_on=2024-01-01/part-s0-<run>-0.parquet
+    _watermarks.json
+
+A run is written to a staging directory first and then moved into place,
+replacing every file an earlier attempt at the same window left behind.
+Each API worker runs the job, so a run first takes an exclusive lock on
+`_lock` in SNAPSHOT_DIR and is skipped while another process holds it
+(the lock needs fcntl; elsewhere run a single exporter). A changed
+registration is appended again, so `read` keeps the latest version of each
+one. Aadhaar and PAN numbers, names and IP addresses are not exported.
+pyarrow is optional: without it the job does not start.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import UdyamRegistration, ValidationLog
+from app.sharding import Shard, ShardRouter, shard_router
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:  # pyarrow is optional; snapshots are disabled without it
+    pa = None
+    pc = None
+    ds = None
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; runs are not locked there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+REGISTRATIONS = "registrations"
+VALIDATION_LOGS = "validation_logs"
+TABLES = (REGISTRATIONS, VALIDATION_LOGS)
+
+WATERMARKS_FILE = "_watermarks.json"
+# Held for the whole of a run, so one process exports at a time
+LOCK_FILE = "_lock"
+# Runs are written here before being moved into the table directories
+STAGING_DIR = "_staging"
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive UTC timestamps
+    if value is None:
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _bound(db: Session, value: datetime) -> datetime:
+    """`value` (UTC) in the form the session's database compares with"""
+    return value.replace(tzinfo=None) if db.get_bind().dialect.name == "sqlite" else value
+
+
+def _enum_value(value) -> Optional[str]:
+    return value.value if value is not None else None
+
+
+def _schemas():
+    timestamp = pa.timestamp("us", tz="UTC")
+    return {
+        REGISTRATIONS: (
+            pa.schema([
+                ("id", pa.int64()),
+                ("registration_number", pa.string()),
+                ("organization_type", pa.string()),
+                ("business_type", pa.string()),
+                ("aadhaar_verified", pa.bool_()),
+                ("otp_verified", pa.bool_()),
+                ("pan_verified", pa.bool_()),
+                ("date_of_incorporation", pa.timestamp("us")),
+                ("submitted_at", timestamp),
+                ("updated_at", timestamp),
+                ("changed_at", timestamp),
+                ("submitted_on", pa.date32()),
+                ("status", pa.string()),
+            ]),
+            pa.schema([("submitted_on", pa.date32()), ("status", pa.string())]),
+        ),
+        VALIDATION_LOGS: (
+            pa.schema([
+                ("id", pa.int64()),
+                ("registration_id", pa.int64()),
+                ("field_name", pa.string()),
+                ("validation_type", pa.string()),
+                ("is_valid", pa.bool_()),
+                ("error_message", pa.string()),
+                ("validated_at", timestamp),
+                ("validated_on", pa.date32()),
+            ]),
+            pa.schema([("validated_on", pa.date32())]),
+        ),
+    }
+
+
+def _registration_rows(db: Session, start: Optional[datetime], end: datetime):
+    """Registrations created or updated in (start, end]"""
+    r = UdyamRegistration
+    end = _bound(db, end)
+    created = and_(r.updated_at.is_(None), r.submitted_at <= end)
+    updated = r.updated_at <= end
+    if start is not None:
+        start = _bound(db, start)
+        created = and_(created, r.submitted_at > start)
+        updated = and_(updated, r.updated_at > start)
+    return select(
+        r.id, r.registration_number, r.status, r.organization_type, r.business_type,
+        r.aadhaar_verified, r.otp_verified, r.pan_verified, r.date_of_incorporation,
+        r.submitted_at, r.updated_at
+    ).where(or_(created, updated))
+
+
+def _registration_record(shards: ShardRouter, shard: Shard, row) -> dict:
+    submitted_at = _utc(row.submitted_at)
+    updated_at = _utc(row.updated_at)
+    return {
+        "id": shards.encode_id(shard, row.id),
+        "registration_number": row.registration_number,
+        "organization_type": _enum_value(row.organization_type),
+        "business_type": row.business_type,
+        "aadhaar_verified": row.aadhaar_verified,
+        "otp_verified": row.otp_verified,
+        "pan_verified": row.pan_verified,
+        "date_of_incorporation": row.date_of_incorporation,
+        "submitted_at": submitted_at,
+        "updated_at": updated_at,
+        "changed_at": updated_at or submitted_at,
+        "submitted_on": submitted_at.date(),
+        "status": _enum_value(row.status),
+    }
+
+
+def _validation_log_rows(db: Session, start: Optional[datetime], end: datetime):
+    """Validation logs written in (start, end]"""
+    condition = ValidationLog.validated_at <= _bound(db, end)
+    if start is not None:
+        condition = and_(condition, ValidationLog.validated_at > _bound(db, start))
+    return select(
+        ValidationLog.id, ValidationLog.registration_id, ValidationLog.field_name,
+        ValidationLog.validation_type, ValidationLog.is_valid, ValidationLog.error_message,
+        ValidationLog.validated_at
+    ).where(condition)
+
+
+def _validation_log_record(shards: ShardRouter, shard: Shard, row) -> dict:
+    validated_at = _utc(row.validated_at)
+    return {
+        # Log ids are per shard; encoded like registration ids to stay unique
+        "id": shards.encode_id(shard, row.id),
+        "registration_id": shards.encode_id(shard, row.registration_id),
+        "field_name": row.field_name,
+        "validation_type": row.validation_type,
+        "is_valid": row.is_valid,
+        "error_message": row.error_message,
+        "validated_at": validated_at,
+        "validated_on": validated_at.date(),
+    }
+
+
+_EXPORTS = {
+    REGISTRATIONS: (_registration_rows, _registration_record),
+    VALIDATION_LOGS: (_validation_log_rows, _validation_log_record),
+}
+
+
+class SnapshotWriter:
+    """Appends per-shard windows of the OLTP tables to a Parquet dataset directory"""
+
+    def __init__(self, directory: str, shards: ShardRouter = shard_router,
+                 lag_seconds: float = 300, batch_size: int = 10000):
+        if pa is None:
+            raise RuntimeError("pyarrow is required for analytics snapshots")
+        self.directory = directory
+        self.shards = shards
+        self.lag_seconds = lag_seconds
+        self.batch_size = batch_size
+        self.schemas = _schemas()
+
+    def _watermarks_path(self) -> str:
+        return os.path.join(self.directory, WATERMARKS_FILE)
+
+    def watermarks(self) -> Dict[str, Dict[str, str]]:
+        """Per table, the end of the last exported window of each shard (ISO timestamps)"""
+        try:
+            with open(self._watermarks_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_watermarks(self, watermarks: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._watermarks_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(watermarks, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._watermarks_path())
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[bool]:
+        """Hold the directory's run lock; yields False if another run holds it"""
+        os.makedirs(self.directory, exist_ok=True)
+        if fcntl is None:
+            yield True
+            return
+        with open(os.path.join(self.directory, LOCK_FILE), "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _batches(self, db: Session, table: str, shard: Shard,
+                 start: Optional[datetime], end: datetime) -> Iterator["pa.RecordBatch"]:
+        query, record = _EXPORTS[table]
+        schema = self.schemas[table][0]
+        result = db.execute(query(db, start, end).execution_options(yield_per=self.batch_size))
+        for rows in result.partitions():
+            yield pa.RecordBatch.from_pylist([record(self.shards, shard, row) for row in rows], schema=schema)
+
+    def _export(self, table: str, shard: Shard, start: Optional[datetime], end: datetime) -> int:
+        schema, partitioning = self.schemas[table]
+        # Named after the window start, which a retry of a failed run shares
+        prefix = f"part-s{shard.index}-{start.strftime('%Y%m%dT%H%M%S%f') if start else 'initial'}-"
+        table_dir = os.path.join(self.directory, table)
+        staging = os.path.join(self.directory, STAGING_DIR, table, f"s{shard.index}")
+        shutil.rmtree(staging, ignore_errors=True)
+        written = []
+        with self.shards.session(shard, read_only=True) as db:
+            ds.write_dataset(
+                self._batches(db, table, shard, start, end),
+                staging,
+                schema=schema,
+                format="parquet",
+                partitioning=ds.partitioning(partitioning, flavor="hive"),
+                basename_template=prefix + "{i}.parquet",
+                file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+                file_visitor=lambda f: written.append((f.path, f.metadata.num_rows))
+            )
+
+        # Files of an earlier attempt at this window may cover fewer or other
+        # partitions, so all of them go before the new ones are moved in
+        for root, _, files in os.walk(table_dir):
+            for name in files:
+                if name.startswith(prefix):
+                    os.remove(os.path.join(root, name))
+        for path, _ in written:
+            target = os.path.join(table_dir, os.path.relpath(path, staging))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(path, target)
+        shutil.rmtree(staging, ignore_errors=True)
+        return sum(rows for _, rows in written)
+
+    def run(self, now: Optional[datetime] = None) -> Optional[Dict[str, int]]:
+        """
+        Export every shard's changes up to `now` minus the lag; returns rows
+        written per table, or None when another run holds the lock.
+        """
+        with self._exclusive() as locked:
+            if not locked:
+                return None
+            return self._run(now)
+
+    def _run(self, now: Optional[datetime]) -> Dict[str, int]:
+        end = (now or datetime.now(timezone.utc)) - timedelta(seconds=self.lag_seconds)
+        watermarks = self.watermarks()
+        totals = {table: 0 for table in TABLES}
+        for shard in self.shards.shards:
+            for table in TABLES:
+                table_marks = watermarks.setdefault(table, {})
+                previous = table_marks.get(str(shard.index))
+                start = datetime.fromisoformat(previous) if previous else None
+                if start is not None and start >= end:
+                    continue
+                totals[table] += self._export(table, shard, start, end)
+                table_marks[str(shard.index)] = end.isoformat()
+                self._save_watermarks(watermarks)
+        return totals
+
+
+def _one_per_id(table: "pa.Table") -> "pa.Table":
+    """`table` with one row per id; rows sharing an id must be copies of one version"""
+    if table.num_rows < 2:
+        return table
+    table = table.sort_by("id")
+    ids = table.column("id")
+    first = pc.not_equal(ids.slice(1), ids.slice(0, table.num_rows - 1))
+    return table.filter(pa.chunked_array([pa.array([True])] + first.chunks))
+
+
+def read(directory: str, table: str, columns: Optional[List[str]] = None,
+         filter=None) -> "pa.Table":
+    """
+    Snapshot rows of `table` as a pyarrow Table, reading only `columns`.
+
+    `filter` is a pyarrow.dataset expression, e.g.
+    `ds.field("status") == "verified"`; conditions on the partition columns
+    (submitted_on, status, validated_on) skip whole directories. Each row
+    comes back once, and registrations in their latest exported version only.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is required for analytics snapshots")
+    schema, partitioning = _schemas()[table]
+    path = os.path.join(directory, table)
+    if not os.path.isdir(path):
+        return schema.empty_table().select(columns) if columns else schema.empty_table()
+    dataset = ds.dataset(path, schema=schema, format="parquet",
+                         partitioning=ds.partitioning(partitioning, flavor="hive"))
+    keys = ["id", "changed_at", "submitted_on"] if table == REGISTRATIONS else ["id"]
+    selected = dataset.to_table(
+        columns=list(dict.fromkeys((columns or schema.names) + keys)), filter=filter
+    )
+
+    if table == REGISTRATIONS and selected.num_rows:
+        # Latest version of each selected registration. All versions share the
+        # submission day, so only the selected days' partitions are scanned,
+        # and only their two key columns are read
+        versions = dataset.to_table(
+            columns=["id", "changed_at"],
+            filter=ds.field("submitted_on").isin(pc.unique(selected.column("submitted_on")))
+            & ds.field("id").isin(pc.unique(selected.column("id")))
+        )
+        latest = versions.group_by("id").aggregate([("changed_at", "max")]).rename_columns(["id", "changed_at"])
+        selected = selected.join(latest, keys=["id", "changed_at"], join_type="left semi")
+
+    current = _one_per_id(selected)
+    return current.select(columns) if columns else current
+
+
+class SnapshotJob:
+    """Runs a SnapshotWriter every `interval` seconds in a background thread"""
+
+    def __init__(self, interval: float, shards: ShardRouter = shard_router):
+        self.interval = interval
+        self.shards = shards
+        self.last_run_at: Optional[datetime] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Optional[Dict[str, int]]:
+        writer = SnapshotWriter(settings.SNAPSHOT_DIR, self.shards,
+                                settings.SNAPSHOT_LAG_SECONDS, settings.SNAPSHOT_BATCH_SIZE)
+        totals = writer.run()
+        if totals is None:
+            logger.info("Skipped analytics snapshots: another process is writing them")
+            return None
+        self.last_run_at = datetime.now(timezone.utc)
+        logger.info("Wrote analytics snapshots: %s", totals)
+        return totals
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Analytics snapshot failed")
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        if pa is None:
+            logger.warning("SNAPSHOT_INTERVAL_SECONDS is set but pyarrow is not installed; snapshots are disabled")
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="snapshot-job", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+# Global snapshot job instance
+snapshot_job = SnapshotJob(settings.SNAPSHOT_INTERVAL_SECONDS)
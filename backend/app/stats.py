@@ -0,0 +1,232 @@
+"""
+Registration counts by day, status and organization type.
+
+The registration steps adjust the `registration_stats` summary table in the
+same transaction as the registration row they change, so dashboard reads
+cost a handful of summary rows no matter how many registrations exist. A
+background reconciler periodically rebuilds the table from
+`udyam_registrations` to repair drift (manual edits, rows written by other
+tools, counts from before this table existed). Only one worker at a time
+runs it: the reconciler holds a lease row on each shard and the others skip.
+"""
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, or_, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import MaintenanceLease, RegistrationStat, UdyamRegistration
+from app.sharding import ShardRouter, shard_router
+
+logger = logging.getLogger(__name__)
+
+StatKey = Tuple[date, str, str]
+
+RECONCILE_LEASE = "stats-reconcile"
+
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def bucket(day: date, status, organization_type) -> StatKey:
+    """Key of the bucket for a day, status and (optional) organization type"""
+    return (day, status.value, organization_type.value if organization_type else "")
+
+
+def stat_key(registration: UdyamRegistration) -> StatKey:
+    """(day, status, organization_type) bucket a registration is counted in"""
+    return bucket(registration.submitted_at.date(), registration.status, registration.organization_type)
+
+
+def _increment(db: Session, key: StatKey, delta: int):
+    day, status, organization_type = key
+    insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(RegistrationStat).values(
+            day=day, status=status, organization_type=organization_type, registrations=delta
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["day", "status", "organization_type"],
+            set_={"registrations": RegistrationStat.__table__.c.registrations + delta}
+        ))
+        return
+
+    updated = db.query(RegistrationStat).filter(
+        RegistrationStat.day == day,
+        RegistrationStat.status == status,
+        RegistrationStat.organization_type == organization_type
+    ).update(
+        {RegistrationStat.registrations: RegistrationStat.registrations + delta},
+        synchronize_session=False
+    )
+    if not updated:
+        db.add(RegistrationStat(
+            day=day, status=status, organization_type=organization_type, registrations=delta
+        ))
+        db.flush()
+
+
+def record_created(db: Session, registration: UdyamRegistration):
+    """Count a new (flushed) registration; call before committing it"""
+    _increment(db, stat_key(registration), 1)
+
+
+def record_move(db: Session, before: StatKey, after: StatKey):
+    """Move one registration from bucket `before` to bucket `after`"""
+    if after != before:
+        _increment(db, before, -1)
+        _increment(db, after, 1)
+
+
+def reconcile(db: Session) -> int:
+    """
+    Rebuild the summary table from udyam_registrations; returns the rows written.
+
+    Concurrent step handlers are held off while this runs: on Postgres by an
+    EXCLUSIVE lock on registration_stats, elsewhere by the write lock the
+    initial DELETE takes, so no increment is lost or double counted.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"LOCK TABLE {RegistrationStat.__tablename__} IN EXCLUSIVE MODE"))
+    db.query(RegistrationStat).delete(synchronize_session=False)
+
+    day = func.date(UdyamRegistration.submitted_at)
+    rows = db.query(
+        day, UdyamRegistration.status, UdyamRegistration.organization_type, func.count()
+    ).group_by(day, UdyamRegistration.status, UdyamRegistration.organization_type).all()
+
+    counts: Dict[StatKey, int] = defaultdict(int)
+    for submitted_on, status, organization_type, registrations in rows:
+        if submitted_on is None or status is None:
+            continue
+        if isinstance(submitted_on, str):
+            submitted_on = date.fromisoformat(submitted_on)
+        counts[(submitted_on, status.value, organization_type.value if organization_type else "")] += registrations
+
+    db.add_all(
+        RegistrationStat(day=d, status=s, organization_type=o, registrations=n)
+        for (d, s, o), n in counts.items()
+    )
+    db.commit()
+    return len(counts)
+
+
+def claim_lease(db: Session, name: str, holder: str, seconds: float) -> bool:
+    """
+    Take or renew the lease `name` for `seconds`; False while another holder has it.
+
+    The conditional UPDATE (or the primary key on INSERT) lets exactly one
+    of several concurrent claimants win.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=seconds)
+    claimed = db.query(MaintenanceLease).filter(
+        MaintenanceLease.name == name,
+        or_(MaintenanceLease.holder == holder, MaintenanceLease.expires_at <= now)
+    ).update({MaintenanceLease.holder: holder, MaintenanceLease.expires_at: expires_at},
+             synchronize_session=False)
+    if not claimed:
+        if db.get(MaintenanceLease, name) is not None:
+            db.rollback()
+            return False
+        db.add(MaintenanceLease(name=name, holder=holder, expires_at=expires_at))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+
+def last_reconciled_at(db: Session) -> Optional[datetime]:
+    """When any worker last finished reconciling this shard (UTC)"""
+    lease = db.get(MaintenanceLease, RECONCILE_LEASE)
+    if lease is None or lease.last_run_at is None:
+        return None
+    return lease.last_run_at.replace(tzinfo=timezone.utc)
+
+
+def summarize(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None) -> dict:
+    """Totals by status, organization type and day from the summary table"""
+    query = db.query(RegistrationStat).filter(RegistrationStat.registrations != 0)
+    if date_from is not None:
+        query = query.filter(RegistrationStat.day >= date_from)
+    if date_to is not None:
+        query = query.filter(RegistrationStat.day <= date_to)
+
+    summary = {"total": 0, "by_status": defaultdict(int),
+               "by_organization_type": defaultdict(int), "by_day": defaultdict(int)}
+    for row in query:
+        summary["total"] += row.registrations
+        summary["by_status"][row.status] += row.registrations
+        summary["by_organization_type"][row.organization_type or "unspecified"] += row.registrations
+        summary["by_day"][row.day.isoformat()] += row.registrations
+    return summary
+
+
+class StatsReconciler:
+    """
+    Runs `reconcile` on every shard at startup and then every `interval` seconds.
+
+    Every worker starts a reconciler, but a shard is only reconciled by the
+    worker holding its lease; the lease outlives one interval, so the holder
+    keeps renewing it and the others take over only if it stops.
+    """
+
+    def __init__(self, interval: float, shards: ShardRouter = shard_router):
+        self.interval = interval
+        self.shards = shards
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def reconcile_all(self) -> int:
+        """Reconcile the shards whose lease this worker holds; returns how many"""
+        reconciled = 0
+        for shard in self.shards.shards:
+            with self.shards.session(shard) as db:
+                if not claim_lease(db, RECONCILE_LEASE, self.holder, 2 * self.interval):
+                    logger.debug("Registration stats on shard %s are reconciled by another worker", shard.index)
+                    continue
+                rows = reconcile(db)
+                db.query(MaintenanceLease).filter(MaintenanceLease.name == RECONCILE_LEASE).update(
+                    {MaintenanceLease.last_run_at: datetime.utcnow()}, synchronize_session=False
+                )
+                db.commit()
+            logger.info("Reconciled registration stats on shard %s (%s rows)", shard.index, rows)
+            reconciled += 1
+        return reconciled
+
+    def _run(self):
+        while True:
+            try:
+                self.reconcile_all()
+            except Exception:
+                logger.exception("Registration stats reconciliation failed")
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="stats-reconciler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+# Global reconciler instance
+stats_reconciler = StatsReconciler(settings.STATS_RECONCILE_SECONDS)
@@ -0,0 +1,184 @@
+"""
+Encrypted step tokens.
+
+Each registration step returns a short-lived token carrying the
+registration id and the registration state later steps need: Aadhaar
+number, names, completed steps, status and submission day. Steps 2 and 3
+accept it back and skip reading the registration row. Writes stay
+conditional on the state the token asserts, so a stale token only costs a
+re-read, never a wrong update.
+
+Tokens are JWEs (direct AES-256-GCM with a key derived from SECRET_KEY):
+the claims include the Aadhaar number, so clients must not be able to read
+them, and the GCM tag makes them tamper-proof as well.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import NamedTuple, Optional, Tuple
+
+from jose import JOSEError, jwe
+
+from app.config import settings
+from app.models import OrganizationType, RegistrationStatus, UdyamRegistration
+
+TOKEN_TYPE = "udyam-step"
+TOKEN_ALGORITHM = "dir"
+TOKEN_ENCRYPTION = "A256GCM"
+
+STEP_AADHAAR = "aadhaar"  # step 1 submitted
+STEP_OTP = "otp"          # Aadhaar verified by OTP
+STEP_PAN = "pan"          # PAN verified
+
+
+class StepTokenError(ValueError):
+    """Step token is malformed, forged, expired or for another registration"""
+
+
+class RegistrationState(NamedTuple):
+    """What the registration steps need to know about a registration"""
+    aadhaar_number: str
+    entrepreneur_name: str
+    business_name: Optional[str]
+    status: RegistrationStatus
+    organization_type: Optional[OrganizationType]
+    registration_number: Optional[str]
+    aadhaar_verified: bool
+    pan_verified: bool
+    submitted_on: date
+
+    @property
+    def otp_verified(self) -> bool:
+        return self.aadhaar_verified
+
+    @classmethod
+    def of(cls, registration) -> "RegistrationState":
+        """State of a registration, or of a row selected with STATE_COLUMNS"""
+        return cls(
+            aadhaar_number=registration.aadhaar_number,
+            entrepreneur_name=registration.entrepreneur_name,
+            business_name=registration.business_name,
+            status=registration.status,
+            organization_type=registration.organization_type,
+            registration_number=registration.registration_number,
+            aadhaar_verified=bool(registration.aadhaar_verified),
+            pan_verified=bool(registration.pan_verified),
+            submitted_on=registration.submitted_at.date()
+        )
+
+
+# Columns read when no (valid) step token is presented
+STATE_COLUMNS = (
+    UdyamRegistration.aadhaar_number,
+    UdyamRegistration.entrepreneur_name,
+    UdyamRegistration.business_name,
+    UdyamRegistration.status,
+    UdyamRegistration.organization_type,
+    UdyamRegistration.registration_number,
+    UdyamRegistration.aadhaar_verified,
+    UdyamRegistration.pan_verified,
+    UdyamRegistration.submitted_at
+)
+
+
+def _key() -> bytes:
+    # A256GCM takes a 256-bit key; deriving it keeps SECRET_KEY the only secret
+    return hashlib.sha256(f"{TOKEN_TYPE}:{settings.SECRET_KEY}".encode("utf-8")).digest()
+
+
+def issue(registration_id: int, state: RegistrationState) -> str:
+    """Encrypted token for the client-facing `registration_id` in `state`"""
+    now = int(time.time())
+    steps = [STEP_AADHAAR]
+    if state.aadhaar_verified:
+        steps.append(STEP_OTP)
+    if state.pan_verified:
+        steps.append(STEP_PAN)
+    claims = {
+        "typ": TOKEN_TYPE,
+        "sub": str(registration_id),
+        "aad": state.aadhaar_number,
+        "name": state.entrepreneur_name,
+        "steps": steps,
+        "st": state.status.value,
+        "day": state.submitted_on.isoformat(),
+        "iat": now,
+        "exp": now + settings.STEP_TOKEN_EXPIRE_MINUTES * 60
+    }
+    # Optional fields are left out while unset to keep tokens short
+    if state.business_name:
+        claims["bn"] = state.business_name
+    if state.organization_type:
+        claims["org"] = state.organization_type.value
+    if state.registration_number:
+        claims["rn"] = state.registration_number
+    payload = json.dumps(claims, separators=(",", ":"))
+    return jwe.encrypt(payload, _key(), algorithm=TOKEN_ALGORITHM, encryption=TOKEN_ENCRYPTION).decode("ascii")
+
+
+def _decode(token: str) -> Tuple[int, RegistrationState, float]:
+    try:
+        claims = json.loads(jwe.decrypt(token, _key()))
+        if claims.get("typ") != TOKEN_TYPE:
+            raise StepTokenError("Not a step token")
+        steps = claims["steps"]
+        state = RegistrationState(
+            aadhaar_number=claims["aad"],
+            entrepreneur_name=claims["name"],
+            business_name=claims.get("bn"),
+            status=RegistrationStatus(claims["st"]),
+            organization_type=OrganizationType(claims["org"]) if claims.get("org") else None,
+            registration_number=claims.get("rn"),
+            aadhaar_verified=STEP_OTP in steps,
+            pan_verified=STEP_PAN in steps,
+            submitted_on=date.fromisoformat(claims["day"])
+        )
+        return int(claims["sub"]), state, float(claims["exp"])
+    except (JOSEError, KeyError, TypeError, ValueError) as e:
+        raise StepTokenError("Invalid or expired step token") from e
+
+
+class StepTokenVerifier:
+    """
+    Verifies step tokens, caching successful verifications.
+
+    A retried or repeated step presents the same token, so decryption and
+    claim parsing run once per token; cache hits only re-check
+    the expiry.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[int, RegistrationState, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify(self, token: str, registration_id: int) -> RegistrationState:
+        """State carried by `token`; raises StepTokenError unless it is valid for `registration_id`"""
+        with self._lock:
+            cached = self._cache.get(token)
+            if cached is not None:
+                self._cache.move_to_end(token)
+        if cached is None:
+            cached = _decode(token)
+            if self.max_entries > 0:
+                with self._lock:
+                    self._cache[token] = cached
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+
+        token_registration_id, state, expires_at = cached
+        if expires_at <= time.time():
+            with self._lock:
+                self._cache.pop(token, None)
+            raise StepTokenError("Invalid or expired step token")
+        if token_registration_id != registration_id:
+            raise StepTokenError("Step token is for a different registration")
+        return state
+
+
+# Global verifier instance
+step_token_verifier = StepTokenVerifier(settings.STEP_TOKEN_CACHE_SIZE)
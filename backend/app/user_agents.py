@@ -0,0 +1,106 @@
+"""
+Interned User-Agent strings.
+
+Registrations store the id of a `user_agents` row instead of the raw
+header: a few hundred distinct browsers account for almost every request,
+so each string is stored once per database. A per-process LRU maps strings
+to ids, so creating a registration normally costs no extra query; an
+unseen string costs one lookup and, the first time, one insert.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import UserAgent
+
+# Longer headers are truncated before interning
+MAX_LENGTH = 1024
+
+_PENDING_KEY = "user_agents_pending"
+_INSERT_IGNORES = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def fingerprint(user_agent: str) -> Tuple[str, str]:
+    """(stored value, digest) for a User-Agent header"""
+    value = user_agent[:MAX_LENGTH]
+    return value, hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class UserAgentInterner:
+    """LRU of User-Agent ids per database, filled from the user_agents table"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._ids: "OrderedDict[tuple, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key) -> Optional[int]:
+        with self._lock:
+            user_agent_id = self._ids.get(key)
+            if user_agent_id is not None:
+                self._ids.move_to_end(key)
+            return user_agent_id
+
+    def remember(self, key, user_agent_id: int):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._ids[key] = user_agent_id
+            self._ids.move_to_end(key)
+            while len(self._ids) > self.max_entries:
+                self._ids.popitem(last=False)
+
+    def intern(self, db: Session, user_agent: Optional[str]) -> Optional[int]:
+        """Id of `user_agent` in the session's database, inserting it if new"""
+        if not user_agent:
+            return None
+        value, digest = fingerprint(user_agent)
+        # Ids are per database: every shard has its own user_agents table
+        key = (db.get_bind().engine.url, digest)
+        user_agent_id = self._get(key)
+        if user_agent_id is not None:
+            return user_agent_id
+
+        user_agent_id = db.query(UserAgent.id).filter(UserAgent.digest == digest).scalar()
+        if user_agent_id is not None:
+            self.remember(key, user_agent_id)
+            return user_agent_id
+
+        insert = _INSERT_IGNORES.get(db.get_bind().dialect.name)
+        if insert is not None:
+            db.execute(insert(UserAgent).values(digest=digest, user_agent=value).on_conflict_do_nothing(
+                index_elements=["digest"]
+            ))
+        else:
+            try:
+                with db.begin_nested():
+                    db.add(UserAgent(digest=digest, user_agent=value))
+            except IntegrityError:
+                pass  # inserted concurrently
+        user_agent_id = db.query(UserAgent.id).filter(UserAgent.digest == digest).scalar()
+        # A row inserted by this transaction is only cached once it commits
+        db.info.setdefault(_PENDING_KEY, {})[key] = user_agent_id
+        return user_agent_id
+
+
+# Global interner instance
+user_agents = UserAgentInterner(settings.USER_AGENT_CACHE_SIZE)
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_committed_user_agents(session):
+    for key, user_agent_id in session.info.pop(_PENDING_KEY, {}).items():
+        user_agents.remember(key, user_agent_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending_user_agents(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -1,234 +1,248 @@
 import re
-import requests
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, List, NamedTuple, Tuple, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.models import UdyamRegistration, ValidationLog, OTPLog
-from app.schemas import ValidationResponse
+from app import form_schema, identifiers
+
+
+class ValidationResult(NamedTuple):
+    """
+    Lightweight validation outcome used on the validator hot path.
+
+    Results are immutable, so every outcome that does not depend on the input
+    is built once at import time and shared.
+    """
+    is_valid: bool
+    message: str
+    field_name: Optional[str] = None
+    validation_type: Optional[str] = None
+
+
+# Pre-built results, one per field and outcome
+AADHAAR_REQUIRED = ValidationResult(False, "Aadhaar number is required", "aadhaar_number", "aadhaar")
+AADHAAR_INVALID_FORMAT = ValidationResult(
+    False, "Aadhaar number must be exactly 12 digits", "aadhaar_number", "aadhaar"
+)
+AADHAAR_INVALID_LEADING_DIGIT = ValidationResult(
+    False, "Aadhaar number cannot start with 0 or 1", "aadhaar_number", "aadhaar"
+)
+AADHAAR_INVALID_CHECKSUM = ValidationResult(
+    False, "Aadhaar number failed checksum validation", "aadhaar_number", "aadhaar"
+)
+AADHAAR_VALID = ValidationResult(True, "Aadhaar number is valid", "aadhaar_number", "aadhaar")
+
+NAME_REQUIRED = ValidationResult(False, "Entrepreneur name is required", "entrepreneur_name", "name")
+NAME_TOO_SHORT = ValidationResult(False, "Entrepreneur name must be at least 2 characters", "entrepreneur_name", "name")
+NAME_TOO_LONG = ValidationResult(False, "Entrepreneur name cannot exceed 255 characters", "entrepreneur_name", "name")
+NAME_INVALID_CHARACTERS = ValidationResult(
+    False, "Entrepreneur name can only contain letters, spaces, and dots", "entrepreneur_name", "name"
+)
+NAME_VALID = ValidationResult(True, "Entrepreneur name is valid", "entrepreneur_name", "name")
+
+PAN_REQUIRED = ValidationResult(False, "PAN number is required", "pan_number", "pan")
+PAN_INVALID_FORMAT = ValidationResult(False, "PAN must be in format: ABCDE1234F", "pan_number", "pan")
+PAN_INVALID_ENTITY_TYPE = ValidationResult(False, "PAN has an unknown holder type (4th character)", "pan_number", "pan")
+PAN_INVALID_SEQUENCE = ValidationResult(False, "PAN serial number cannot be 0000", "pan_number", "pan")
+PAN_ORGANIZATION_MISMATCH = ValidationResult(
+    False, "PAN holder type does not match the organization type", "pan_number", "pan"
+)
+PAN_VALID = ValidationResult(True, "PAN number is valid", "pan_number", "pan")
+
+OTP_REQUIRED = ValidationResult(False, "OTP is required", "otp_code", "otp")
+OTP_INVALID_FORMAT = ValidationResult(False, "OTP must be exactly 6 digits", "otp_code", "otp")
+OTP_VALID = ValidationResult(True, "OTP format is valid", "otp_code", "otp")
+
+GSTIN_REQUIRED = ValidationResult(False, "GSTIN is required", "gstin", "gstin")
+GSTIN_OPTIONAL = ValidationResult(True, "GSTIN is optional", "gstin", "gstin")
+GSTIN_INVALID_FORMAT = ValidationResult(False, "GSTIN must be in format: 27AAPFU0939F1ZV", "gstin", "gstin")
+GSTIN_INVALID_STATE_CODE = ValidationResult(False, "GSTIN has an unknown state code", "gstin", "gstin")
+GSTIN_INVALID_PAN = ValidationResult(False, "GSTIN does not contain a valid PAN", "gstin", "gstin")
+GSTIN_INVALID_CHECKSUM = ValidationResult(False, "GSTIN check character is invalid", "gstin", "gstin")
+GSTIN_PAN_MISMATCH = ValidationResult(False, "GSTIN does not belong to the given PAN", "gstin", "gstin")
+GSTIN_VALID = ValidationResult(True, "GSTIN is valid", "gstin", "gstin")
+
+NAME_PATTERN = re.compile(r"^[a-zA-Z\s\.]+$")
+
+# Identifier check codes mapped onto the pre-built results
+IDENTIFIER_RESULTS = {
+    "aadhaar": {
+        identifiers.OK: AADHAAR_VALID,
+        identifiers.REQUIRED: AADHAAR_REQUIRED,
+        identifiers.INVALID_FORMAT: AADHAAR_INVALID_FORMAT,
+        identifiers.INVALID_LEADING_DIGIT: AADHAAR_INVALID_LEADING_DIGIT,
+        identifiers.INVALID_CHECKSUM: AADHAAR_INVALID_CHECKSUM,
+    },
+    "pan": {
+        identifiers.OK: PAN_VALID,
+        identifiers.REQUIRED: PAN_REQUIRED,
+        identifiers.INVALID_FORMAT: PAN_INVALID_FORMAT,
+        identifiers.INVALID_ENTITY_TYPE: PAN_INVALID_ENTITY_TYPE,
+        identifiers.INVALID_SEQUENCE: PAN_INVALID_SEQUENCE,
+    },
+    "gstin": {
+        identifiers.OK: GSTIN_VALID,
+        identifiers.REQUIRED: GSTIN_OPTIONAL,
+        identifiers.INVALID_FORMAT: GSTIN_INVALID_FORMAT,
+        identifiers.INVALID_STATE_CODE: GSTIN_INVALID_STATE_CODE,
+        identifiers.INVALID_ENTITY_TYPE: GSTIN_INVALID_PAN,
+        identifiers.INVALID_SEQUENCE: GSTIN_INVALID_PAN,
+        identifiers.INVALID_CHECKSUM: GSTIN_INVALID_CHECKSUM,
+    },
+}
+
 
 class UdyamValidator:
     """Validator for Udyam registration form data"""
-    
-    def __init__(self):
-        # Validation patterns extracted from scraper
-        self.validation_rules = {
-            "aadhaar": {
-                "pattern": r"^\d{12}$",
-                "description": "12-digit Aadhaar number",
-                "max_length": 12
-            },
-            "pan": {
-                "pattern": r"^[A-Za-z]{5}[0-9]{4}[A-Za-z]{1}$",
-                "description": "PAN format: ABCDE1234F",
-                "max_length": 10
-            },
-            "otp": {
-                "pattern": r"^\d{6}$",
-                "description": "6-digit OTP",
-                "max_length": 6
-            },
-            "gstin": {
-                "pattern": r"^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z]{1}[1-9A-Z]{1}Z[0-9A-Z]{1}$",
-                "description": "GSTIN format: 22AAAAA0000A1Z5",
-                "max_length": 15
-            }
-        }
-    
-    def validate_aadhaar(self, aadhaar_number: str) -> ValidationResponse:
+
+    def __init__(self, plan_holder=form_schema.plan_holder):
+        # Patterns come from the scraped form schema, compiled into a plan
+        # that is hot-swapped when the schema file changes
+        self.plan_holder = plan_holder
+
+    @property
+    def validation_rules(self) -> Dict[str, Dict[str, Any]]:
+        """Rules of the current validation plan"""
+        return self.plan_holder.current.as_dict()
+
+    def validate_aadhaar(self, aadhaar_number: str) -> ValidationResult:
         """Validate Aadhaar number"""
         if not aadhaar_number:
-            return ValidationResponse(
-                is_valid=False,
-                message="Aadhaar number is required",
-                field_name="aadhaar_number",
-                validation_type="aadhaar"
-            )
-        
-        if not re.match(self.validation_rules["aadhaar"]["pattern"], aadhaar_number):
-            return ValidationResponse(
-                is_valid=False,
-                message="Aadhaar number must be exactly 12 digits",
-                field_name="aadhaar_number",
-                validation_type="aadhaar"
-            )
-        
-        # Additional Aadhaar validation logic can be added here
-        # For example, checksum validation, UIDAI API integration, etc.
-        
-        return ValidationResponse(
-            is_valid=True,
-            message="Aadhaar number is valid",
-            field_name="aadhaar_number",
-            validation_type="aadhaar"
-        )
-    
-    def validate_entrepreneur_name(self, name: str) -> ValidationResponse:
+            return AADHAAR_REQUIRED
+
+        if not self.plan_holder.current["aadhaar"].matches(aadhaar_number):
+            return AADHAAR_INVALID_FORMAT
+
+        # Leading digit and Verhoeff checksum
+        return IDENTIFIER_RESULTS["aadhaar"][identifiers.check_aadhaar(aadhaar_number)]
+
+    def validate_entrepreneur_name(self, name: str) -> ValidationResult:
         """Validate entrepreneur name"""
-        if not name or not name.strip():
-            return ValidationResponse(
-                is_valid=False,
-                message="Entrepreneur name is required",
-                field_name="entrepreneur_name",
-                validation_type="name"
-            )
-        
-        if len(name.strip()) < 2:
-            return ValidationResponse(
-                is_valid=False,
-                message="Entrepreneur name must be at least 2 characters",
-                field_name="entrepreneur_name",
-                validation_type="name"
-            )
-        
-        if len(name.strip()) > 255:
-            return ValidationResponse(
-                is_valid=False,
-                message="Entrepreneur name cannot exceed 255 characters",
-                field_name="entrepreneur_name",
-                validation_type="name"
-            )
-        
+        if not name:
+            return NAME_REQUIRED
+
+        stripped = name.strip()
+        if not stripped:
+            return NAME_REQUIRED
+
+        if len(stripped) < 2:
+            return NAME_TOO_SHORT
+
+        if len(stripped) > 255:
+            return NAME_TOO_LONG
+
         # Check for valid characters (letters, spaces, dots)
-        if not re.match(r"^[a-zA-Z\s\.]+$", name.strip()):
-            return ValidationResponse(
-                is_valid=False,
-                message="Entrepreneur name can only contain letters, spaces, and dots",
-                field_name="entrepreneur_name",
-                validation_type="name"
-            )
-        
-        return ValidationResponse(
-            is_valid=True,
-            message="Entrepreneur name is valid",
-            field_name="entrepreneur_name",
-            validation_type="name"
-        )
-    
-    def validate_pan(self, pan_number: str) -> ValidationResponse:
+        if not NAME_PATTERN.match(stripped):
+            return NAME_INVALID_CHARACTERS
+
+        return NAME_VALID
+
+    def validate_pan(self, pan_number: str) -> ValidationResult:
         """Validate PAN number"""
         if not pan_number:
-            return ValidationResponse(
-                is_valid=False,
-                message="PAN number is required",
-                field_name="pan_number",
-                validation_type="pan"
-            )
-        
-        pan_upper = pan_number.upper()
-        if not re.match(self.validation_rules["pan"]["pattern"], pan_upper):
-            return ValidationResponse(
-                is_valid=False,
-                message="PAN must be in format: ABCDE1234F",
-                field_name="pan_number",
-                validation_type="pan"
-            )
-        
-        return ValidationResponse(
-            is_valid=True,
-            message="PAN number is valid",
-            field_name="pan_number",
-            validation_type="pan"
-        )
-    
-    def validate_otp(self, otp_code: str) -> ValidationResponse:
+            return PAN_REQUIRED
+
+        if not self.plan_holder.current["pan"].matches(pan_number.upper()):
+            return PAN_INVALID_FORMAT
+
+        # Holder type and serial number
+        return IDENTIFIER_RESULTS["pan"][identifiers.check_pan(pan_number)]
+
+    def validate_pan_for_organization(self, pan_number: str, organization_type: Optional[str]) -> ValidationResult:
+        """Cross-check the PAN holder type against the organization type"""
+        if not identifiers.pan_matches_organization(pan_number, organization_type):
+            return PAN_ORGANIZATION_MISMATCH
+        return PAN_VALID
+
+    def validate_otp(self, otp_code: str) -> ValidationResult:
         """Validate OTP code"""
         if not otp_code:
-            return ValidationResponse(
-                is_valid=False,
-                message="OTP is required",
-                field_name="otp_code",
-                validation_type="otp"
-            )
-        
-        if not re.match(self.validation_rules["otp"]["pattern"], otp_code):
-            return ValidationResponse(
-                is_valid=False,
-                message="OTP must be exactly 6 digits",
-                field_name="otp_code",
-                validation_type="otp"
-            )
-        
-        return ValidationResponse(
-            is_valid=True,
-            message="OTP format is valid",
-            field_name="otp_code",
-            validation_type="otp"
-        )
-    
-    def validate_gstin(self, gstin: str) -> ValidationResponse:
+            return OTP_REQUIRED
+
+        if not self.plan_holder.current["otp"].matches(otp_code):
+            return OTP_INVALID_FORMAT
+
+        return OTP_VALID
+
+    def validate_gstin(self, gstin: str) -> ValidationResult:
         """Validate GSTIN (optional field)"""
+        rule = self.plan_holder.current["gstin"]
         if not gstin:
-            return ValidationResponse(
-                is_valid=True,
-                message="GSTIN is optional",
-                field_name="gstin",
-                validation_type="gstin"
-            )
-        
-        gstin_upper = gstin.upper()
-        if not re.match(self.validation_rules["gstin"]["pattern"], gstin_upper):
-            return ValidationResponse(
-                is_valid=False,
-                message="GSTIN must be in format: 22AAAAA0000A1Z5",
-                field_name="gstin",
-                validation_type="gstin"
-            )
-        
-        return ValidationResponse(
-            is_valid=True,
-            message="GSTIN is valid",
-            field_name="gstin",
-            validation_type="gstin"
-        )
-    
+            return GSTIN_REQUIRED if rule.required else GSTIN_OPTIONAL
+
+        if not rule.matches(gstin.upper()):
+            return GSTIN_INVALID_FORMAT
+
+        # State code, embedded PAN and mod-36 check character
+        return IDENTIFIER_RESULTS["gstin"][identifiers.check_gstin(gstin)]
+
+    def validate_gstin_for_pan(self, gstin: str, pan_number: str) -> ValidationResult:
+        """Cross-check that the GSTIN embeds the given PAN"""
+        if gstin and not identifiers.gstin_matches_pan(gstin, pan_number):
+            return GSTIN_PAN_MISMATCH
+        return self.validate_gstin(gstin)
+
+    def validate_identifiers(self, kind: str, values: List[str]) -> List[ValidationResult]:
+        """Validate many identifiers of one kind (aadhaar, pan or gstin)"""
+        results = IDENTIFIER_RESULTS[kind]
+        return [results[code] for code in identifiers.check_many(kind, values)]
+
     def check_duplicate_aadhaar(self, db: Session, aadhaar_number: str, exclude_id: Optional[int] = None) -> bool:
         """Check if Aadhaar number is already registered"""
         query = db.query(UdyamRegistration).filter(
             UdyamRegistration.aadhaar_number == aadhaar_number
         )
-        
+
         if exclude_id:
             query = query.filter(UdyamRegistration.id != exclude_id)
-        
+
         return query.first() is not None
-    
+
     def check_duplicate_pan(self, db: Session, pan_number: str, exclude_id: Optional[int] = None) -> bool:
         """Check if PAN number is already registered"""
         if not pan_number:
             return False
-            
+
         query = db.query(UdyamRegistration).filter(
             UdyamRegistration.pan_number == pan_number.upper()
         )
-        
+
         if exclude_id:
             query = query.filter(UdyamRegistration.id != exclude_id)
-        
+
         return query.first() is not None
-    
+
     def validate_otp_with_database(self, db: Session, aadhaar_number: str, otp_code: str) -> Tuple[bool, str]:
-        """Validate OTP against database records"""
+        """
+        Validate OTP against database records and mark it used.
+
+        Does not commit: the caller commits the OTP together with the
+        registration update, so a failed update leaves the OTP usable.
+        """
         # Find the most recent OTP for this Aadhaar number
         otp_record = db.query(OTPLog).filter(
             OTPLog.aadhaar_number == aadhaar_number,
             OTPLog.otp_code == otp_code,
-            OTPLog.is_used == False,
-            OTPLog.is_expired == False,
+            OTPLog.is_used.is_(False),
+            OTPLog.is_expired.is_(False),
             OTPLog.expires_at > datetime.utcnow()
         ).order_by(OTPLog.created_at.desc()).first()
-        
+
         if not otp_record:
             return False, "Invalid or expired OTP"
-        
-        # Mark OTP as used
-        otp_record.is_used = True
-        otp_record.used_at = datetime.utcnow()
-        db.commit()
-        
+
+        # Mark OTP as used, unless a concurrent request already did
+        marked = db.query(OTPLog).filter(
+            OTPLog.id == otp_record.id,
+            OTPLog.is_used.is_(False)
+        ).update({OTPLog.is_used: True, OTPLog.used_at: datetime.utcnow()}, synchronize_session=False)
+        if not marked:
+            return False, "Invalid or expired OTP"
+
         return True, "OTP validated successfully"
-    
-    def log_validation(self, db: Session, registration_id: int, field_name: str, 
-                      validation_type: str, is_valid: bool, error_message: Optional[str] = None):
+
+    def log_validation(self, db: Session, registration_id: int, field_name: str,
+                       validation_type: str, is_valid: bool, error_message: Optional[str] = None):
         """Log validation results to database"""
         validation_log = ValidationLog(
             registration_id=registration_id,
@@ -239,27 +253,28 @@ class UdyamValidator:
         )
         db.add(validation_log)
         db.commit()
-    
+
     def generate_otp(self) -> str:
         """Generate a 6-digit OTP"""
         import random
         return str(random.randint(100000, 999999))
-    
+
     def create_otp_record(self, db: Session, aadhaar_number: str) -> str:
         """Create OTP record in database"""
         otp_code = self.generate_otp()
         expires_at = datetime.utcnow() + timedelta(minutes=10)  # OTP expires in 10 minutes
-        
+
         otp_record = OTPLog(
             aadhaar_number=aadhaar_number,
             otp_code=otp_code,
             expires_at=expires_at
         )
-        
+
         db.add(otp_record)
         db.commit()
-        
+
         return otp_code
 
+
 # Global validator instance
-validator = UdyamValidator() 
\ No newline at end of file
+validator = UdyamValidator()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Table size before and after the compact audit metadata migration
+
+Builds a temporary SQLite database in the previous layout (raw user_agent
+Text, ip_address as a string), fills it with registrations drawn from a
+few hundred distinct user agents and mostly IPv4 addresses, then runs
+`alembic upgrade 0001` on it and compares the pages each table occupies
+(after VACUUM, from the dbstat virtual table).
+
+Run from the backend directory:
+    python benchmarks/bench_audit_storage.py [rows]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine
+
+from app.database import Base
+import app.models  # noqa: F401  (registers the tables on Base.metadata)
+
+ROWS = 100_000
+DISTINCT_USER_AGENTS = 300
+IPV6_SHARE = 0.15
+
+
+def user_agent(i):
+    if i % 3:
+        return (f"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                f"Chrome/{100 + i // 4}.0.{4000 + i}.{i * 7 % 200} Safari/537.36")
+    return (f"Mozilla/5.0 (Linux; Android {8 + i % 6}; SM-A{100 + i}F) AppleWebKit/537.36 "
+            f"(KHTML, like Gecko) Chrome/{100 + i // 4}.0.0.0 Mobile Safari/537.36")
+
+
+def ip_address(rng):
+    if rng.random() < IPV6_SHARE:
+        return ":".join(f"{rng.randrange(65536):x}" for _ in range(8))
+    return ".".join(str(rng.randrange(1, 255)) for _ in range(4))
+
+
+def table_sizes(path):
+    db = sqlite3.connect(path)
+    db.execute("VACUUM")
+    sizes = dict(db.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))
+    db.close()
+    return sizes
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    rng = random.Random(1)
+    agents = [user_agent(i) for i in range(DISTINCT_USER_AGENTS)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "audit.db")
+        engine = create_engine(f"sqlite:///{path}")
+        config = Config(os.path.join(BACKEND, "alembic.ini"))
+        config.set_main_option("script_location", os.path.join(BACKEND, "alembic"))
+
+        def alembic(operation, revision):
+            with engine.connect() as connection:
+                config.attributes["connection"] = connection
+                operation(config, revision)
+
+        # Current layout, then the migration's downgrade to get the previous one
+        Base.metadata.create_all(engine)
+        alembic(command.stamp, "head")
+        alembic(command.downgrade, "base")
+
+        db = sqlite3.connect(path)
+        db.executemany(
+            "INSERT INTO udyam_registrations (aadhaar_number, entrepreneur_name, status, "
+            "ip_address, user_agent, consent_given) VALUES (?, 'John Doe', 'PENDING', ?, ?, 1)",
+            ((f"{200000000000 + i}", ip_address(rng), rng.choice(agents)) for i in range(rows))
+        )
+        db.commit()
+        db.close()
+        before = table_sizes(path)
+
+        alembic(command.upgrade, "0001")
+        after = table_sizes(path)
+        engine.dispose()
+
+    print(f"{rows} registrations, {DISTINCT_USER_AGENTS} distinct user agents")
+    print(f"{'table':<42} {'before KiB':>11} {'after KiB':>10}")
+    for name in sorted(set(before) | set(after)):
+        if name.startswith(("udyam_registrations", "user_agents", "sqlite_autoindex_user_agents",
+                            "ix_udyam_registrations")):
+            print(f"{name:<42} {before.get(name, 0) / 1024:>11.0f} {after.get(name, 0) / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for how steps 2 and 3 learn a registration's state
+
+Compares loading the full registration row (previous approach), selecting
+only the step token columns (fallback without a token), and verifying a
+step token with and without the verification cache. Rows live in an
+in-memory SQLite database, so the database numbers are a lower bound for a
+networked Postgres.
+
+Run from the backend directory:
+    python benchmarks/bench_step_tokens.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import RegistrationStatus, UdyamRegistration
+from app.step_tokens import STATE_COLUMNS, RegistrationState, StepTokenVerifier, issue
+
+ROWS = 50_000
+NUMBER = 5_000
+REPEAT = 5
+
+
+def build_database():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all(
+        UdyamRegistration(
+            aadhaar_number=f"{200000000000 + i}",
+            entrepreneur_name="John Doe",
+            consent_given=True,
+            ip_address="127.0.0.1",
+            status=RegistrationStatus.PENDING,
+            aadhaar_verified=True,
+            otp_verified=True
+        )
+        for i in range(ROWS)
+    )
+    db.commit()
+    return db
+
+
+def per_call_us(func):
+    best = min(timeit.repeat(func, number=NUMBER, repeat=REPEAT))
+    return best / NUMBER * 1e6
+
+
+def main():
+    db = build_database()
+    registration_id = ROWS // 2
+    state = RegistrationState.of(db.get(UdyamRegistration, registration_id))
+    token = issue(registration_id, state)
+    uncached = StepTokenVerifier(max_entries=0)
+    cached = StepTokenVerifier(max_entries=16)
+
+    def full_row():
+        db.query(UdyamRegistration).filter(UdyamRegistration.id == registration_id).first()
+        db.expire_all()
+
+    def state_columns():
+        RegistrationState.of(db.query(*STATE_COLUMNS).filter(UdyamRegistration.id == registration_id).first())
+
+    cases = [
+        ("full row load", full_row),
+        ("state columns select", state_columns),
+        ("token verify (uncached)", lambda: uncached.verify(token, registration_id)),
+        ("token verify (cached)", lambda: cached.verify(token, registration_id)),
+    ]
+    assert uncached.verify(token, registration_id) == state
+    baseline = None
+    print(f"{'method':<26} {'us/call':>9} {'speedup':>8}")
+    for name, func in cases:
+        us = per_call_us(func)
+        baseline = baseline or us
+        print(f"{name:<26} {us:>9.1f} {baseline / us:>7.1f}x")
+    print(f"token length: {len(token)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the UdyamValidator hot path
+
+Compares the pre-built ValidationResult constants against the previous
+approach of building a Pydantic ValidationResponse for every outcome.
+
+Run from the backend directory:
+    python benchmarks/bench_validators.py
+"""
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.schemas import ValidationResponse
+from app.validators import validator
+
+NUMBER = 200_000
+REPEAT = 5
+
+
+def legacy_validate_aadhaar(aadhaar_number):
+    """Previous implementation: re.match on a pattern string, new model per call"""
+    if not aadhaar_number:
+        return ValidationResponse(is_valid=False, message="Aadhaar number is required",
+                                  field_name="aadhaar_number", validation_type="aadhaar")
+    if not re.match(r"^\d{12}$", aadhaar_number):
+        return ValidationResponse(is_valid=False, message="Aadhaar number must be exactly 12 digits",
+                                  field_name="aadhaar_number", validation_type="aadhaar")
+    return ValidationResponse(is_valid=True, message="Aadhaar number is valid",
+                              field_name="aadhaar_number", validation_type="aadhaar")
+
+
+def legacy_validate_pan(pan_number):
+    if not pan_number:
+        return ValidationResponse(is_valid=False, message="PAN number is required",
+                                  field_name="pan_number", validation_type="pan")
+    if not re.match(r"^[A-Za-z]{5}[0-9]{4}[A-Za-z]{1}$", pan_number.upper()):
+        return ValidationResponse(is_valid=False, message="PAN must be in format: ABCDE1234F",
+                                  field_name="pan_number", validation_type="pan")
+    return ValidationResponse(is_valid=True, message="PAN number is valid",
+                              field_name="pan_number", validation_type="pan")
+
+
+def legacy_validate_entrepreneur_name(name):
+    if not name or not name.strip():
+        return ValidationResponse(is_valid=False, message="Entrepreneur name is required",
+                                  field_name="entrepreneur_name", validation_type="name")
+    if len(name.strip()) < 2:
+        return ValidationResponse(is_valid=False, message="Entrepreneur name must be at least 2 characters",
+                                  field_name="entrepreneur_name", validation_type="name")
+    if len(name.strip()) > 255:
+        return ValidationResponse(is_valid=False, message="Entrepreneur name cannot exceed 255 characters",
+                                  field_name="entrepreneur_name", validation_type="name")
+    if not re.match(r"^[a-zA-Z\s\.]+$", name.strip()):
+        return ValidationResponse(is_valid=False, message="Entrepreneur name can only contain letters, spaces, and dots",
+                                  field_name="entrepreneur_name", validation_type="name")
+    return ValidationResponse(is_valid=True, message="Entrepreneur name is valid",
+                              field_name="entrepreneur_name", validation_type="name")
+
+
+CASES = [
+    ("validate_aadhaar", legacy_validate_aadhaar, validator.validate_aadhaar, "234567890124"),
+    ("validate_pan", legacy_validate_pan, validator.validate_pan, "ABCPE1234F"),
+    ("validate_entrepreneur_name", legacy_validate_entrepreneur_name,
+     validator.validate_entrepreneur_name, "John Doe"),
+]
+
+
+def per_call_ns(func, value):
+    best = min(timeit.repeat(lambda: func(value), number=NUMBER, repeat=REPEAT))
+    return best / NUMBER * 1e9
+
+
+def main():
+    print(f"{'method':<28} {'legacy ns':>10} {'current ns':>11} {'speedup':>8}")
+    for name, legacy, current, value in CASES:
+        assert legacy(value).message == current(value).message
+        before = per_call_ns(legacy, value)
+        after = per_call_ns(current, value)
+        print(f"{name:<28} {before:>10.0f} {after:>11.0f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,30 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.config import settings
+from app.config import PLACEHOLDER_SECRET_KEY, settings
 from app.api.api import api_router
 from app.database import engine
 from app.models import Base
+from app.form_schema import plan_holder
+from app.registration_numbers import registration_numbers
+from app.sharding import shard_router
+from app.stats import stats_reconciler
+from app.idempotency import idempotency_purge_job
+from app.outbox import outbox_purge_job
+from app.snapshots import snapshot_job
+from app.profiling import ProfilingMiddleware, install_sql_trace, profile_store, profiling_enabled
+
+# Step tokens are encrypted with SECRET_KEY; with the published example value
+# anyone could read (Aadhaar numbers) and forge them
+if settings.SECRET_KEY in ("", PLACEHOLDER_SECRET_KEY):
+    raise RuntimeError(
+        "SECRET_KEY is not set; generate one with "
+        "python -c \"import secrets; print(secrets.token_urlsafe(32))\""
+    )
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+shard_router.create_all(Base.metadata)
+shard_router.check_layout()
 
 # Create FastAPI app
 app = FastAPI(
@@ -23,11 +41,62 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients revalidate the form schema and read its version
+    expose_headers=["ETag", "X-Schema-Version"],
 )
 
+# Opt-in request profiling; nothing is installed unless it is configured
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware, store=profile_store)
+    install_sql_trace([engine] + shard_router.engines())
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+async def start_form_schema_watcher():
+    plan_holder.start()
+
+@app.on_event("shutdown")
+async def stop_form_schema_watcher():
+    plan_holder.stop()
+
+@app.on_event("shutdown")
+async def return_unused_registration_numbers():
+    registration_numbers.close()
+
+@app.on_event("startup")
+async def start_stats_reconciler():
+    stats_reconciler.start()
+
+@app.on_event("shutdown")
+async def stop_stats_reconciler():
+    stats_reconciler.stop()
+
+@app.on_event("startup")
+async def start_idempotency_purge_job():
+    idempotency_purge_job.start()
+
+@app.on_event("shutdown")
+async def stop_idempotency_purge_job():
+    idempotency_purge_job.stop()
+
+@app.on_event("startup")
+async def start_outbox_purge_job():
+    outbox_purge_job.start()
+
+@app.on_event("shutdown")
+async def stop_outbox_purge_job():
+    outbox_purge_job.stop()
+
+@app.on_event("startup")
+async def start_snapshot_job():
+    snapshot_job.start()
+
+@app.on_event("shutdown")
+async def stop_snapshot_job():
+    snapshot_job.stop()
+
 @app.get("/")
 async def root():
     return {
@@ -23,7 +23,7 @@ def test_aadhaar_verification():
     print("🔍 Testing Aadhaar verification...")
     
     data = {
-        "aadhaar_number": "123456789012",
+        "aadhaar_number": "234567890124",
         "entrepreneur_name": "John Doe",
         "consent_given": True
     }
@@ -58,7 +58,7 @@ def test_pan_validation(registration_id):
     
     data = {
         "registration_id": registration_id,
-        "pan_number": "ABCDE1234F",
+        "pan_number": "ABCPE1234F",
         "pan_name": "John Doe",
         "date_of_incorporation": "2023-01-01",
         "organization_type": "proprietorship"
@@ -0,0 +1,39 @@
+"""
+Shared test setup. Settings are read at import time, so the app's own
+database is pointed at a temporary directory before any app module loads.
+"""
+
+import os
+import tempfile
+
+_DIRECTORY = tempfile.mkdtemp(prefix="udyam-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DIRECTORY, 'primary.db')}"
+os.environ["SHARD_DATABASE_URLS"] = ""
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import Base
+from app.sharding import ShardRouter, get_shard_router
+from main import app
+
+from helpers import SHARDS
+
+
+@pytest.fixture
+def router(tmp_path):
+    router = ShardRouter.from_urls(
+        [f"sqlite:///{tmp_path / f'shard{i}.db'}" for i in range(SHARDS)]
+    )
+    router.create_all(Base.metadata)
+    yield router
+    for shard in router.shards:
+        shard.engine.dispose()
+
+
+@pytest.fixture
+def client(router):
+    app.dependency_overrides[get_shard_router] = lambda: router
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_shard_router, None)
@@ -0,0 +1,52 @@
+"""Registration flow helpers shared by the API tests"""
+
+from app.identifiers import verhoeff_check_digit
+from app.models import OTPLog
+
+SHARDS = 3
+API = "/api/v1/registration"
+
+
+def aadhaar_numbers():
+    """Valid Aadhaar numbers, in order"""
+    for base in range(23456789000, 23456799000):
+        yield f"{base}{verhoeff_check_digit(str(base))}"
+
+
+def aadhaar_per_shard(router):
+    """One Aadhaar number placed on each shard, by shard index"""
+    found = {}
+    for number in aadhaar_numbers():
+        found.setdefault(router.shard_for_aadhaar(number).index, number)
+        if len(found) == len(router.shards):
+            return found
+    raise AssertionError("no Aadhaar number for some shard")
+
+
+def latest_otp(router, aadhaar_number):
+    with router.session(router.shard_for_aadhaar(aadhaar_number)) as db:
+        return db.query(OTPLog.otp_code).filter(
+            OTPLog.aadhaar_number == aadhaar_number
+        ).order_by(OTPLog.id.desc()).first().otp_code
+
+
+def start_registration(client, router, aadhaar_number, entrepreneur_name="Ravi Kumar"):
+    """Steps 1 and 2; returns the client-facing registration id"""
+    response = client.post(f"{API}/aadhaar-verification", json={
+        "aadhaar_number": aadhaar_number, "entrepreneur_name": entrepreneur_name
+    })
+    assert response.status_code == 200, response.json()
+    registration_id = response.json()["registration_id"]
+    response = client.post(f"{API}/otp-validation", json={
+        "registration_id": registration_id, "otp_code": latest_otp(router, aadhaar_number)
+    })
+    assert response.status_code == 200, response.json()
+    return registration_id
+
+
+def submit_pan(client, registration_id, pan_number, organization_type="proprietorship",
+               pan_name="Ravi Kumar"):
+    return client.post(f"{API}/pan-validation", json={
+        "registration_id": registration_id, "pan_number": pan_number,
+        "pan_name": pan_name, "organization_type": organization_type
+    })
@@ -0,0 +1,91 @@
+"""
+Batch lookup: key limits, registration number normalization, results that
+span chunk boundaries, and keys that are not found.
+
+Run from the backend directory:
+    pytest tests/test_batch_lookup.py
+"""
+
+import json
+import string
+
+import pytest
+
+from app.api.endpoints import registration as registration_endpoints
+from app.schemas import BATCH_LOOKUP_MAX_KEYS
+from app.sharding import MAX_SHARDS
+
+from helpers import API, aadhaar_numbers, start_registration, submit_pan
+
+LOOKUP_URL = f"{API}/batch-lookup"
+
+
+@pytest.fixture
+def verified(client, router):
+    """Five verified registrations across the shards: {id: registration number}"""
+    numbers = aadhaar_numbers()
+    registrations = {}
+    for letter in string.ascii_uppercase[:5]:
+        registration_id = start_registration(client, router, next(numbers))
+        response = submit_pan(client, registration_id, f"ABCP{letter}1234F")
+        assert response.status_code == 200, response.json()
+        registrations[registration_id] = response.json()["registration_number"]
+    return registrations
+
+
+def lookup(client, ids=(), registration_numbers=()):
+    response = client.post(LOOKUP_URL, json={
+        "ids": list(ids), "registration_numbers": list(registration_numbers)
+    })
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_too_many_keys_are_rejected(client):
+    response = client.post(LOOKUP_URL, json={
+        "ids": list(range(1, BATCH_LOOKUP_MAX_KEYS)),
+        "registration_numbers": ["UDYAM-000001-2026", "UDYAM-000002-2026"]
+    })
+    assert response.status_code == 422
+    assert len(lookup(client, ids=range(1, BATCH_LOOKUP_MAX_KEYS + 1))) == BATCH_LOOKUP_MAX_KEYS
+
+
+def test_registration_numbers_are_normalized(client, verified):
+    registration_id, number = next(iter(verified.items()))
+    records = lookup(client, registration_numbers=[f"  {number.lower()} "])
+    assert records == [dict(records[0], found=True, id=registration_id, registration_number=number)]
+    assert records[0]["status"] == "verified"
+
+
+def test_results_span_chunk_boundaries(client, router, verified, monkeypatch):
+    monkeypatch.setattr(registration_endpoints, "BATCH_LOOKUP_CHUNK_SIZE", 2)
+    ids = list(verified)
+    missing_id = max(ids) + MAX_SHARDS * 1000
+    requested = [ids[4], missing_id, ids[0], ids[4], ids[2], ids[1], ids[3]]
+    numbers = [verified[i] for i in reversed(ids)] + ["UDYAM-999999-2026"]
+
+    records = lookup(client, ids=requested, registration_numbers=numbers)
+    # One line per distinct key, ids first, each in request order
+    assert [r.get("id") for r in records[:6]] == [ids[4], missing_id, ids[0], ids[2], ids[1], ids[3]]
+    assert [r["registration_number"] for r in records[6:]] == numbers
+    assert [r["found"] for r in records[:6]] == [True, False, True, True, True, True]
+    assert [r["found"] for r in records[6:]] == [True] * 5 + [False]
+    for record in records[:6]:
+        if record["found"]:
+            assert record["registration_number"] == verified[record["id"]]
+    # Only the projected columns are returned
+    assert set(records[0]) == {
+        "found", "id", "registration_number", "status", "aadhaar_verified",
+        "otp_verified", "pan_verified", "submitted_at", "updated_at"
+    }
+
+
+def test_unknown_keys_are_reported_not_found(client, router, verified):
+    beyond_shards = 7 * MAX_SHARDS + len(router.shards)
+    records = lookup(client, ids=[beyond_shards, 10 ** 9], registration_numbers=["UDYAM-000000-1999"])
+    assert records == [
+        {"id": beyond_shards, "found": False},
+        {"id": 10 ** 9, "found": False},
+        {"registration_number": "UDYAM-000000-1999", "found": False},
+    ]
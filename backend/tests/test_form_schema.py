@@ -0,0 +1,51 @@
+"""
+Form schema hot reload: a changed schema file swaps in a newly compiled plan.
+
+Run from the backend directory:
+    pytest tests/test_form_schema.py
+"""
+
+import json
+import os
+
+from app.config import REPO_ROOT, settings
+from app.form_schema import ValidationPlanHolder
+
+
+def write_schema(path, pan_pattern, mtime):
+    path.write_text(json.dumps({"validation_rules": {"pan": {"pattern": pan_pattern}}}))
+    # Distinct mtimes even when both writes land in the same clock tick
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_changed_schema_swaps_the_plan(tmp_path):
+    path = tmp_path / "udyam_form_schema.json"
+    holder = ValidationPlanHolder(str(path), poll_interval=0)
+    default_plan = holder.current
+    assert holder.reload_if_changed() is False
+
+    write_schema(path, "[A-Z]{5}[0-9]{4}[A-Z]", 1_000_000_000)
+    assert holder.reload_if_changed() is True
+    first = holder.current
+    assert first is not default_plan
+    assert first["pan"].pattern.pattern == "^(?:[A-Z]{5}[0-9]{4}[A-Z])$"
+    assert not first["pan"].matches("abcpe1234f")
+    assert holder.reload_if_changed() is False
+    assert holder.current is first
+
+    write_schema(path, "[A-Za-z]{5}[0-9]{4}[A-Za-z]", 2_000_000_000)
+    assert holder.reload_if_changed() is True
+    assert holder.current is not first
+    assert holder.current.version != first.version
+    assert holder.current["pan"].matches("abcpe1234f")
+
+    # Removing the file falls back to the built-in rules
+    path.unlink()
+    assert holder.reload_if_changed() is True
+    assert holder.current.version == "default"
+
+
+def test_default_schema_path_is_where_the_scraper_writes():
+    if "FORM_SCHEMA_PATH" not in os.environ:
+        assert settings.FORM_SCHEMA_PATH == os.path.join(REPO_ROOT, "udyam_form_schema.json")
+    assert os.path.exists(os.path.join(REPO_ROOT, "scraper.py"))
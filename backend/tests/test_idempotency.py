@@ -0,0 +1,100 @@
+"""
+Idempotency-Key handling: replays, key reuse with another body, and which
+failures are stored versus released for a retry.
+
+Run from the backend directory:
+    pytest tests/test_idempotency.py
+"""
+
+import pytest
+from fastapi import HTTPException
+
+from app.database import Base
+from app.idempotency import (
+    REPLAY_HEADER, MemoryIdempotencyStore, SQLIdempotencyStore, idempotent,
+    request_fingerprint
+)
+from app.models import UdyamRegistration
+from app.sharding import ShardRouter
+
+from helpers import API, aadhaar_per_shard
+
+
+@pytest.fixture(params=["memory", "sql"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryIdempotencyStore(max_entries=100, ttl_seconds=3600, lease_seconds=60)
+        return
+    keys = ShardRouter.from_urls([f"sqlite:///{tmp_path / 'keys.db'}"])
+    keys.create_all(Base.metadata)
+    yield SQLIdempotencyStore(ttl_seconds=3600, lease_seconds=60,
+                              session_factory=keys.shards[0].session_factory)
+    keys.shards[0].engine.dispose()
+
+
+def run(store, key, payload, error=None):
+    """One request through `idempotent()`; returns the replayed response or the handler's result"""
+    with idempotent("test", key, payload, store=store) as guard:
+        if guard.replay is not None:
+            return guard.replay
+        if error is not None:
+            raise error
+        return guard.save({"ok": True})
+
+
+def test_retry_replays_the_stored_response(client, router):
+    aadhaar_number = aadhaar_per_shard(router)[0]
+    body = {"aadhaar_number": aadhaar_number, "entrepreneur_name": "Ravi Kumar"}
+    headers = {"Idempotency-Key": "step-1-replay"}
+
+    first = client.post(f"{API}/aadhaar-verification", json=body, headers=headers)
+    second = client.post(f"{API}/aadhaar-verification", json=body, headers=headers)
+    assert first.status_code == second.status_code == 200
+    assert second.headers[REPLAY_HEADER] == "true"
+    assert second.json()["registration_id"] == first.json()["registration_id"]
+    with router.session(router.shard_for_aadhaar(aadhaar_number)) as db:
+        assert db.query(UdyamRegistration).count() == 1
+
+
+def test_key_reused_with_another_body_is_rejected(client, router):
+    placed = aadhaar_per_shard(router)
+    headers = {"Idempotency-Key": "step-1-reused"}
+    response = client.post(f"{API}/aadhaar-verification", headers=headers, json={
+        "aadhaar_number": placed[0], "entrepreneur_name": "Ravi Kumar"
+    })
+    assert response.status_code == 200
+    response = client.post(f"{API}/aadhaar-verification", headers=headers, json={
+        "aadhaar_number": placed[1], "entrepreneur_name": "Ravi Kumar"
+    })
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("status_code", [400, 404, 422])
+def test_validation_failures_are_replayed(store, status_code):
+    with pytest.raises(HTTPException):
+        run(store, "k", {"n": 1}, HTTPException(status_code=status_code, detail="Invalid"))
+    replay = run(store, "k", {"n": 1})
+    assert replay.status_code == status_code
+    assert replay.headers[REPLAY_HEADER] == "true"
+
+
+@pytest.mark.parametrize("status_code", [401, 403, 409, 500])
+def test_retryable_failures_release_the_key(store, status_code):
+    with pytest.raises(HTTPException):
+        run(store, "k", {"n": 1}, HTTPException(status_code=status_code, detail="Try again"))
+    # The retry runs the handler instead of replaying the failure
+    assert run(store, "k", {"n": 1}) == {"ok": True}
+    assert run(store, "k", {"n": 1}).headers[REPLAY_HEADER] == "true"
+
+
+def test_in_flight_key_is_taken_over_after_its_lease(store):
+    payload = {"n": 1}
+    # A request still running (or whose worker died) holds the key
+    assert store.begin("test:k", request_fingerprint(payload)) is None
+    with pytest.raises(HTTPException) as error:
+        run(store, "k", payload)
+    assert error.value.status_code == 409
+
+    store.lease_seconds = 0
+    assert store.begin("test:lease", request_fingerprint(payload)) is None
+    assert run(store, "lease", payload) == {"ok": True}
@@ -0,0 +1,82 @@
+"""
+Aadhaar (Verhoeff), PAN and GSTIN (mod-36) checks against known-good and
+known-bad values.
+
+Run from the backend directory:
+    pytest tests/test_identifiers.py
+"""
+
+import pytest
+
+from app import form_schema, identifiers, validators
+
+
+@pytest.mark.parametrize("number, check_digit", [
+    ("236", "3"),
+    ("12345", "1"),
+    ("142857", "0"),
+    ("8473643095483728456789", "2"),
+])
+def test_verhoeff_check_digit(number, check_digit):
+    assert identifiers.verhoeff_check_digit(number) == check_digit
+    assert identifiers.verhoeff_checksum(number + check_digit) == 0
+
+
+@pytest.mark.parametrize("aadhaar_number", ["234567890124", "999941057058"])
+def test_valid_aadhaar(aadhaar_number):
+    assert identifiers.check_aadhaar(aadhaar_number) == identifiers.OK
+
+
+@pytest.mark.parametrize("aadhaar_number, code", [
+    ("234567890123", identifiers.INVALID_CHECKSUM),
+    # Adjacent digits swapped: Verhoeff catches every single transposition
+    ("324567890124", identifiers.INVALID_CHECKSUM),
+    ("234567890142", identifiers.INVALID_CHECKSUM),
+    ("123456789012", identifiers.INVALID_LEADING_DIGIT),
+    ("23456789012", identifiers.INVALID_FORMAT),
+    ("23456789012a", identifiers.INVALID_FORMAT),
+    ("", identifiers.REQUIRED),
+])
+def test_invalid_aadhaar(aadhaar_number, code):
+    assert identifiers.check_aadhaar(aadhaar_number) == code
+
+
+@pytest.mark.parametrize("gstin", ["27AAPFU0939F1ZV", "22ABCPE1234F1ZL", "27aapfu0939f1zv"])
+def test_valid_gstin(gstin):
+    assert identifiers.check_gstin(gstin) == identifiers.OK
+    assert identifiers.gstin_check_character(gstin.upper()[:14]) == gstin.upper()[14]
+
+
+@pytest.mark.parametrize("gstin, code", [
+    ("27AAPFU0939F1ZW", identifiers.INVALID_CHECKSUM),
+    ("27AAPFU0939F2ZV", identifiers.INVALID_CHECKSUM),
+    ("72AAPFU0939F1ZV", identifiers.INVALID_STATE_CODE),
+    ("00AAPFU0939F1ZV", identifiers.INVALID_STATE_CODE),
+    ("27AAPFU0939F1YV", identifiers.INVALID_FORMAT),
+    ("27AAPFU0939F0ZV", identifiers.INVALID_FORMAT),
+    ("27AAPFU0939F1Z", identifiers.INVALID_FORMAT),
+    # The old documentation example: serial 0000 is not a valid PAN
+    ("22AAAAA0000A1Z5", identifiers.INVALID_SEQUENCE),
+    ("27AAPQU0939F1ZV", identifiers.INVALID_ENTITY_TYPE),
+])
+def test_invalid_gstin(gstin, code):
+    assert identifiers.check_gstin(gstin) == code
+
+
+def test_documented_examples_are_valid():
+    examples = [
+        validators.GSTIN_INVALID_FORMAT.message.rsplit(" ", 1)[-1],
+        form_schema.DEFAULT_RULES["gstin"]["description"].rsplit(" ", 1)[-1],
+    ] + list(form_schema.VALID_SAMPLES["gstin"])
+    assert all(identifiers.check_gstin(example) == identifiers.OK for example in examples)
+
+
+@pytest.mark.parametrize("pan_number, organization_type, matches", [
+    ("ABCPE1234F", "proprietorship", True),
+    ("ABCFE1234F", "partnership", True),
+    ("ABCPE1234F", "private-limited", False),
+    ("ABCPE1234F", None, True),
+    ("ABCPE1234F", "society", False),
+])
+def test_pan_matches_organization(pan_number, organization_type, matches):
+    assert identifiers.pan_matches_organization(pan_number, organization_type) is matches
@@ -0,0 +1,67 @@
+"""
+OTP validation: an OTP is consumed together with the registration update,
+so a failed update leaves it usable for the retry.
+
+Run from the backend directory:
+    pytest tests/test_otp.py
+"""
+
+from fastapi import HTTPException
+
+from app.api.endpoints import registration
+from app.models import OTPLog, UdyamRegistration
+
+from helpers import API, aadhaar_per_shard, latest_otp
+
+
+def begin(client, router):
+    """Step 1 only; returns the registration id, its Aadhaar number and the OTP"""
+    aadhaar_number = aadhaar_per_shard(router)[0]
+    response = client.post(f"{API}/aadhaar-verification", json={
+        "aadhaar_number": aadhaar_number, "entrepreneur_name": "Ravi Kumar"
+    })
+    assert response.status_code == 200, response.json()
+    return response.json()["registration_id"], aadhaar_number, latest_otp(router, aadhaar_number)
+
+
+def validate(client, registration_id, otp_code):
+    return client.post(f"{API}/otp-validation", json={
+        "registration_id": registration_id, "otp_code": otp_code
+    })
+
+
+def otp_used(router, aadhaar_number):
+    with router.session(router.shard_for_aadhaar(aadhaar_number)) as db:
+        return [row.is_used for row in db.query(OTPLog.is_used).filter(
+            OTPLog.aadhaar_number == aadhaar_number
+        )]
+
+
+def test_otp_is_single_use(client, router):
+    registration_id, aadhaar_number, otp_code = begin(client, router)
+    assert validate(client, registration_id, otp_code).status_code == 200
+    assert otp_used(router, aadhaar_number) == [True]
+
+    response = validate(client, registration_id, otp_code)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid or expired OTP"
+
+
+def test_conflict_leaves_otp_usable(client, router, monkeypatch):
+    registration_id, aadhaar_number, otp_code = begin(client, router)
+    update_if_unchanged = registration._update_if_unchanged
+
+    def conflict(*args, **kwargs):
+        raise HTTPException(status_code=409, detail="Registration was modified concurrently, please retry")
+
+    monkeypatch.setattr(registration, "_update_if_unchanged", conflict)
+    assert validate(client, registration_id, otp_code).status_code == 409
+    assert otp_used(router, aadhaar_number) == [False]
+
+    monkeypatch.setattr(registration, "_update_if_unchanged", update_if_unchanged)
+    response = validate(client, registration_id, otp_code)
+    assert response.status_code == 200, response.json()
+    assert otp_used(router, aadhaar_number) == [True]
+    shard, local_id = router.locate(registration_id)
+    with router.session(shard) as db:
+        assert db.get(UdyamRegistration, local_id).otp_verified is True
@@ -0,0 +1,49 @@
+"""
+Change feed outbox: resume tokens keep working after expired events are purged.
+
+Run from the backend directory:
+    pytest tests/test_outbox.py
+"""
+
+from app import outbox
+from app.models import OutboxEvent
+
+from helpers import aadhaar_numbers, aadhaar_per_shard, start_registration
+
+
+def read_all(router, token):
+    reader = outbox.FeedReader(router, outbox.decode_token(token, len(router.shards)), gap_timeout=0)
+    return reader.read(), reader.token
+
+
+def test_resume_after_purge_sees_new_events(client, router):
+    for aadhaar_number in aadhaar_per_shard(router).values():
+        start_registration(client, router, aadhaar_number)
+    events, token = read_all(router, "0")
+    assert len(events) == 2 * len(router.shards)
+
+    # Every event is past retention; the outbox ends up empty
+    for shard in router.shards:
+        with router.session(shard) as db:
+            assert outbox.purge_expired(db, retention_days=-1) == 2
+            assert db.query(OutboxEvent).count() == 0
+
+    numbers = aadhaar_numbers()
+    placed = set(aadhaar_per_shard(router).values())
+    aadhaar_number = next(n for n in numbers if n not in placed)
+    registration_id = start_registration(client, router, aadhaar_number)
+
+    events, _ = read_all(router, token)
+    assert [(row.event_type, outbox.event_message(router, shard, row)["registration_id"])
+            for shard, row, _ in events] == [
+        (outbox.REGISTRATION_CREATED, registration_id),
+        (outbox.REGISTRATION_AADHAAR_VERIFIED, registration_id),
+    ]
+
+
+def test_purge_keeps_recent_events(client, router):
+    aadhaar_number = aadhaar_per_shard(router)[0]
+    start_registration(client, router, aadhaar_number)
+    assert outbox.purge_all(router) == 0
+    events, _ = read_all(router, "0")
+    assert len(events) == 2
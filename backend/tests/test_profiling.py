@@ -0,0 +1,109 @@
+"""
+Request profiling: cProfile only covers requests that ran alone on the
+event loop, and failed statements do not leave stale SQL timers behind.
+
+Run from the backend directory:
+    pytest tests/test_profiling.py
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.config import settings
+from app.profiling import ProfileStore, ProfilingMiddleware, SQLTrace, current_trace, install_sql_trace
+
+TOKEN = "profiling-test-token"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_ADMIN_TOKEN", TOKEN)
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 0)
+    return ProfileStore(str(tmp_path), 10)
+
+
+class SlowApp:
+    """ASGI app whose requests finish when their path's event is set"""
+
+    def __init__(self):
+        self.release = {}
+
+    async def __call__(self, scope, receive, send):
+        await self.release.setdefault(scope["path"], asyncio.Event()).wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+def http_scope(path, profiled):
+    headers = [(b"x-profile-request", TOKEN.encode())] if profiled else []
+    return {"type": "http", "method": "GET", "path": path, "headers": headers}
+
+
+async def request(middleware, path, profiled):
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+    await middleware(http_scope(path, profiled), receive, send)
+
+
+def run_requests(store, order):
+    """
+    Start (path, profiled) requests in order, then finish them in order;
+    returns the stored profiles by path.
+    """
+    async def scenario():
+        app = SlowApp()
+        middleware = ProfilingMiddleware(app, store)
+        tasks = []
+        for path, profiled in order:
+            tasks.append(asyncio.create_task(request(middleware, path, profiled)))
+            await asyncio.sleep(0.01)
+        for path, _ in order:
+            app.release.setdefault(path, asyncio.Event()).set()
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*tasks)
+    asyncio.run(scenario())
+    return {profile["path"]: profile for profile in map(store.load, store.ids())}
+
+
+def test_request_alone_gets_a_full_profile(store):
+    profiles = run_requests(store, [("/alone", True)])
+    assert profiles["/alone"]["cpu_profile"] == "full"
+    assert store.path(profiles["/alone"]["id"], ".pstats") is not None
+
+
+def test_profile_stops_when_another_request_arrives(store):
+    profiles = run_requests(store, [("/profiled", True), ("/other", False)])
+    assert profiles["/profiled"]["cpu_profile"] == "partial"
+    assert profiles["/profiled"]["stopped_by"] is None
+    assert profiles["/profiled"]["status"] == 200
+
+
+def test_profile_is_skipped_while_other_requests_run(store):
+    profiles = run_requests(store, [("/other", False), ("/profiled", True)])
+    assert profiles["/profiled"]["cpu_profile"] == "skipped"
+    assert store.path(profiles["/profiled"]["id"], ".pstats") is None
+    # The per-request SQL trace is kept either way
+    assert profiles["/profiled"]["sql"] == []
+
+
+def test_failed_statement_does_not_leak_its_timer():
+    engine = create_engine("sqlite://")
+    install_sql_trace([engine])
+    trace = SQLTrace()
+    token = current_trace.set(trace)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+            assert conn.info.get("profiling_started") == []
+            conn.execute(text("SELECT 1"))
+            assert conn.info["profiling_started"] == []
+    finally:
+        current_trace.reset(token)
+    assert [s["statement"] for s in trace.statements] == ["SELECT 1"]
@@ -0,0 +1,56 @@
+"""
+Form schema endpoint: per-encoding ETags, conditional requests and the
+headers exposed to browser clients.
+
+Run from the backend directory:
+    pytest tests/test_schema_endpoint.py
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.form_schema import compile_plan, plan_holder
+from main import app
+
+URL = "/api/v1/schema/form"
+ORIGIN = "http://localhost:5173"
+
+
+@pytest.fixture
+def schema_client(monkeypatch):
+    plan = compile_plan({"step1": [], "step2": [], "validation_rules": {}}, "abc123")
+    monkeypatch.setattr(plan_holder, "current", plan)
+    return TestClient(app), plan.artifact
+
+
+def test_etag_differs_per_encoding(schema_client):
+    client, artifact = schema_client
+    gzip = client.get(URL, headers={"Accept-Encoding": "gzip"})
+    identity = client.get(URL, headers={"Accept-Encoding": "identity"})
+    assert gzip.headers["ETag"] == artifact.etags["gzip"]
+    assert identity.headers["ETag"] == artifact.etags["identity"]
+    assert gzip.headers["ETag"] != identity.headers["ETag"]
+
+
+def test_if_none_match_only_matches_the_representation_sent(schema_client):
+    client, artifact = schema_client
+    gzip_etag = artifact.etags["gzip"]
+
+    response = client.get(URL, headers={"Accept-Encoding": "gzip", "If-None-Match": gzip_etag})
+    assert response.status_code == 304
+    # The gzip ETag says nothing about the identity body this client would get
+    response = client.get(URL, headers={"Accept-Encoding": "identity", "If-None-Match": gzip_etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == artifact.etags["identity"]
+    response = client.get(URL, headers={
+        "Accept-Encoding": "identity", "If-None-Match": f'{gzip_etag}, W/{artifact.etags["identity"]}'
+    })
+    assert response.status_code == 304
+
+
+def test_cors_exposes_etag_and_version(schema_client):
+    client, artifact = schema_client
+    response = client.get(URL, headers={"Origin": ORIGIN})
+    exposed = {name.strip().lower() for name in response.headers["Access-Control-Expose-Headers"].split(",")}
+    assert {"etag", "x-schema-version"} <= exposed
+    assert response.headers["X-Schema-Version"] == artifact.version
@@ -0,0 +1,106 @@
+"""
+Name search: normalization, ranking, and (score, id) keyset paging across
+shards without duplicated or skipped rows.
+
+Run from the backend directory:
+    pytest tests/test_search.py
+"""
+
+import pytest
+
+from app.search import decode_cursor, encode_cursor, normalize_name, word_similarity
+
+from helpers import aadhaar_numbers, start_registration
+
+SEARCH_URL = "/api/v1/search/registrations"
+NAMES = [
+    "Ravi Kumar", "Ravi Kumaar", "R.K. Kumar", "Kumar Singh", "Anil Kumar", "Sunil Kumar",
+    "Kumari Devi", "Raj Kumar Gupta", "Kumar Enterprises", "Ravi Kumar", "Ravi Kumar",
+    "Vijay Kumar", "Mohan Lal", "Ravi Kapoor",
+]
+
+
+@pytest.mark.parametrize("name, normalized", [
+    ("  Ravi   KUMAR ", "ravi kumar"),
+    ("R.K. Sharma", "rk sharma"),
+    ("R. K. Sharma", "rk sharma"),
+    ("R K Sharma", "rk sharma"),
+    ("Dr.Ravi", "dr ravi"),
+    ("ＲＡＶＩ", "ravi"),  # full-width letters fold under NFKC
+    ("STRASSE Straße", "strasse strasse"),
+    ("", ""),
+    (None, ""),
+])
+def test_normalize_name(name, normalized):
+    assert normalize_name(name) == normalized
+
+
+def test_word_similarity_uses_the_best_name():
+    assert word_similarity("kumar", "ravi kumar | kumar enterprises") == 1.0
+    assert 0.5 <= word_similarity("kumaar", "ravi kumar") < 1.0
+    assert word_similarity("zzz", "ravi kumar") == 0.0
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    assert decode_cursor(encode_cursor(1.8333, 130)) == (1.8333, 130)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.fixture
+def registered(client, router):
+    numbers = aadhaar_numbers()
+    return {
+        start_registration(client, router, next(numbers), entrepreneur_name=name): name
+        for name in NAMES
+    }
+
+
+def search_all(client, q, limit):
+    """Every page of a search, following next_cursor"""
+    pages, cursor = [], None
+    while True:
+        params = {"q": q, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(SEARCH_URL, params=params)
+        assert response.status_code == 200, response.json()
+        body = response.json()
+        pages.append(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_results_are_ranked_and_stable(client, registered):
+    first = client.get(SEARCH_URL, params={"q": "ravi kumar", "limit": 100}).json()["items"]
+    again = client.get(SEARCH_URL, params={"q": "  RAVI   kumar ", "limit": 100}).json()["items"]
+    assert first == again
+
+    keys = [(-item["score"], item["id"]) for item in first]
+    assert keys == sorted(keys)
+    # Exact prefix matches first; the misspelling only matches by similarity
+    exact = [item["id"] for item in first if item["entrepreneur_name"] == "Ravi Kumar"]
+    assert [item["id"] for item in first[:3]] == sorted(exact)
+    assert "Ravi Kumaar" in [item["entrepreneur_name"] for item in first[3:]]
+    assert "Mohan Lal" not in [item["entrepreneur_name"] for item in first]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 5])
+def test_paging_across_shards_has_no_duplicates_or_gaps(client, router, registered, limit):
+    everything = client.get(SEARCH_URL, params={"q": "kumar", "limit": 100}).json()["items"]
+    matched = {item["id"] for item in everything}
+    # Hits come from every shard, so the cursor has to work across them
+    assert {router.locate(registration_id)[0].index for registration_id in matched} == set(
+        range(len(router.shards))
+    )
+
+    pages = search_all(client, "kumar", limit)
+    paged = [item for page in pages for item in page]
+    assert all(len(page) <= limit for page in pages)
+    assert [item["id"] for item in paged] == [item["id"] for item in everything]
+
+
+def test_short_query_and_bad_cursor_are_rejected(client):
+    assert client.get(SEARCH_URL, params={"q": " r.k "}).status_code == 400
+    assert client.get(SEARCH_URL, params={"q": "kumar", "cursor": "@@"}).status_code == 400
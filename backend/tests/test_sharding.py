@@ -0,0 +1,113 @@
+"""
+Registration sharding over several SQLite databases: placement, id encoding,
+cross-shard duplicate PAN checks and the recorded shard layout.
+
+Run from the backend directory:
+    pytest tests/test_sharding.py
+"""
+
+import pytest
+
+from app.database import Base, SessionLocal
+from app.models import ShardLayout, UdyamRegistration
+from app.sharding import MAX_SHARDS, ShardRouter
+
+from helpers import API, SHARDS, aadhaar_per_shard, start_registration, submit_pan
+
+
+def test_placement_is_stable_and_covers_every_shard(router):
+    placed = aadhaar_per_shard(router)
+    numbers = [placed[index] for index in range(SHARDS)]
+    assert [router.shard_for_aadhaar(n).index for n in numbers] == list(range(SHARDS))
+    # Placement depends only on the Aadhaar number and the shard count
+    other = ShardRouter(router.shards)
+    assert all(other.shard_for_aadhaar(n) is router.shard_for_aadhaar(n) for n in numbers)
+
+
+def test_ids_encode_the_shard(router):
+    for shard in router.shards:
+        for local_id in (1, 2, 1000):
+            registration_id = router.encode_id(shard, local_id)
+            assert registration_id == local_id * MAX_SHARDS + shard.index
+            assert router.locate(registration_id) == (shard, local_id)
+            assert router.local_id_after(shard, registration_id) == local_id
+    # Ids pointing past the configured shards are not found
+    assert router.locate(5 * MAX_SHARDS + SHARDS)[0] is None
+
+
+def test_registration_lives_on_its_aadhaar_shard(client, router):
+    for index, aadhaar_number in aadhaar_per_shard(router).items():
+        registration_id = start_registration(client, router, aadhaar_number)
+        shard, local_id = router.locate(registration_id)
+        assert shard.index == index
+        for other in router.shards:
+            with router.session(other) as db:
+                stored = db.query(UdyamRegistration.aadhaar_number).filter(
+                    UdyamRegistration.aadhaar_number == aadhaar_number
+                ).all()
+            assert len(stored) == (1 if other is shard else 0)
+
+        response = client.get(f"{API}/registration/{registration_id}")
+        assert response.status_code == 200
+        assert response.json()["aadhaar_number"] == aadhaar_number
+
+
+def test_duplicate_pan_is_rejected_across_shards(client, router):
+    placed = aadhaar_per_shard(router)
+    first, second = placed[0], placed[1]
+    first_id = start_registration(client, router, first)
+    second_id = start_registration(client, router, second)
+    assert router.locate(first_id)[0] is not router.locate(second_id)[0]
+
+    assert submit_pan(client, first_id, "ABCPE1234F").status_code == 200
+    response = submit_pan(client, second_id, "ABCPE1234F")
+    assert response.status_code == 409
+    assert response.json()["detail"] == "PAN number already registered"
+    # Submitting the same PAN again for its own registration is not a duplicate
+    assert submit_pan(client, first_id, "ABCPE1234F").status_code == 200
+
+
+def test_duplicate_aadhaar_is_rejected(client, router):
+    aadhaar_number = aadhaar_per_shard(router)[SHARDS - 1]
+    start_registration(client, router, aadhaar_number)
+    response = client.post(f"{API}/aadhaar-verification", json={
+        "aadhaar_number": aadhaar_number, "entrepreneur_name": "Ravi Kumar"
+    })
+    assert response.status_code == 409
+
+
+def test_shard_count_cannot_change(router, tmp_path):
+    layout_db = f"sqlite:///{tmp_path / 'layout.db'}"
+    primary = ShardRouter.from_urls([layout_db])
+    primary.create_all(Base.metadata)
+    session_factory = primary.shards[0].session_factory
+
+    router.check_layout(session_factory)
+    router.check_layout(session_factory)
+    with pytest.raises(RuntimeError):
+        ShardRouter(router.shards[:2]).check_layout(session_factory)
+    with session_factory() as db:
+        assert db.get(ShardLayout, 1).shard_count == SHARDS
+    primary.shards[0].engine.dispose()
+
+
+def test_unsharded_registrations_block_sharding(router, tmp_path):
+    primary = ShardRouter.from_urls([f"sqlite:///{tmp_path / 'unsharded.db'}"])
+    primary.create_all(Base.metadata)
+    session_factory = primary.shards[0].session_factory
+    with session_factory() as db:
+        db.add(UdyamRegistration(aadhaar_number="234567890124", entrepreneur_name="Ravi Kumar"))
+        db.commit()
+
+    # The unsharded database itself is fine, and records a single shard
+    with pytest.raises(RuntimeError):
+        router.check_layout(session_factory)
+    primary.check_layout(session_factory)
+    with session_factory() as db:
+        assert db.get(ShardLayout, 1).shard_count == 1
+    primary.shards[0].engine.dispose()
+
+
+def test_default_primary_layout_is_recorded():
+    with SessionLocal() as db:
+        assert db.get(ShardLayout, 1).shard_count == 1
@@ -0,0 +1,118 @@
+"""
+Analytics snapshots: retried windows replace their files, `read` returns
+the latest version of each registration once, and one run writes at a time.
+
+Run from the backend directory:
+    pytest tests/test_snapshots.py
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+ds = pytest.importorskip("pyarrow.dataset")
+fcntl = pytest.importorskip("fcntl")
+
+from app.config import settings
+from app.models import RegistrationStatus, UdyamRegistration
+from app.snapshots import (
+    LOCK_FILE, REGISTRATIONS, WATERMARKS_FILE, SnapshotJob, SnapshotWriter, read
+)
+
+T0 = datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc)
+
+
+def at(minutes):
+    return T0 + timedelta(minutes=minutes)
+
+
+def naive(value):
+    # SQLite stores naive UTC timestamps
+    return value.replace(tzinfo=None)
+
+
+def add_registration(router, aadhaar_number, submitted_at):
+    shard = router.shards[0]
+    with router.session(shard) as db:
+        registration = UdyamRegistration(
+            aadhaar_number=aadhaar_number, entrepreneur_name="Ravi Kumar",
+            status=RegistrationStatus.PENDING, submitted_at=naive(submitted_at)
+        )
+        db.add(registration)
+        db.commit()
+        return router.encode_id(shard, registration.id)
+
+
+def set_status(router, registration_id, status, updated_at):
+    shard, local_id = router.locate(registration_id)
+    with router.session(shard) as db:
+        db.query(UdyamRegistration).filter(UdyamRegistration.id == local_id).update({
+            UdyamRegistration.status: status, UdyamRegistration.updated_at: naive(updated_at)
+        }, synchronize_session=False)
+        db.commit()
+
+
+def part_files(directory, prefix):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), directory)
+        for root, _, files in os.walk(directory) for name in files if name.startswith(prefix)
+    )
+
+
+@pytest.fixture
+def writer(router, tmp_path):
+    return SnapshotWriter(str(tmp_path / "snapshots"), router, lag_seconds=0)
+
+
+def test_retried_window_replaces_its_files(router, writer):
+    first = add_registration(router, "234567890124", at(0))
+    writer.run(now=at(1))
+    set_status(router, first, RegistrationStatus.VERIFIED, at(2))
+    watermarks = open(os.path.join(writer.directory, WATERMARKS_FILE)).read()
+    writer.run(now=at(3))
+    prefix = f"part-s0-{naive(at(1)).strftime('%Y%m%dT%H%M%S%f')}-"
+    assert [path.split(os.sep)[2] for path in part_files(writer.directory, prefix)] == ["status=verified"]
+
+    # The attempt failed before its watermark was saved; the retry sees a
+    # different status and must not leave the earlier attempt's file behind
+    with open(os.path.join(writer.directory, WATERMARKS_FILE), "w") as f:
+        f.write(watermarks)
+    set_status(router, first, RegistrationStatus.REJECTED, at(2))
+    assert writer.run(now=at(3))[REGISTRATIONS] == 1
+    assert [path.split(os.sep)[2] for path in part_files(writer.directory, prefix)] == ["status=rejected"]
+    assert not os.path.exists(os.path.join(writer.directory, "_staging", REGISTRATIONS, "s0"))
+
+
+def test_read_returns_latest_version_once(router, writer):
+    first = add_registration(router, "234567890124", at(0))
+    second = add_registration(router, "234567890132", at(0))
+    writer.run(now=at(1))
+    set_status(router, first, RegistrationStatus.VERIFIED, at(2))
+    writer.run(now=at(3))
+    set_status(router, first, RegistrationStatus.COMPLETED, at(4))
+    writer.run(now=at(5))
+
+    rows = read(writer.directory, REGISTRATIONS, ["id", "status"]).to_pylist()
+    assert sorted(rows, key=lambda row: row["id"]) == [
+        {"id": first, "status": "completed"}, {"id": second, "status": "pending"}
+    ]
+    # Filtering on an older version's partition does not bring it back
+    assert read(writer.directory, REGISTRATIONS, ["id"], filter=ds.field("status") == "verified").num_rows == 0
+
+
+def test_run_is_skipped_while_another_holds_the_lock(router, writer, monkeypatch):
+    add_registration(router, "234567890124", at(0))
+    os.makedirs(writer.directory)
+    with open(os.path.join(writer.directory, LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        assert writer.run(now=at(1)) is None
+        monkeypatch.setattr(settings, "SNAPSHOT_DIR", writer.directory)
+        job = SnapshotJob(interval=0, shards=router)
+        assert job.run_once() is None
+        assert job.last_run_at is None
+        fcntl.flock(lock, fcntl.LOCK_UN)
+    assert not os.path.exists(os.path.join(writer.directory, WATERMARKS_FILE))
+
+    assert writer.run(now=at(1))[REGISTRATIONS] == 1
+    assert writer.watermarks()[REGISTRATIONS] == {str(shard.index): at(1).isoformat() for shard in router.shards}
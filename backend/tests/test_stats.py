@@ -0,0 +1,69 @@
+"""
+Registration statistics: incremental counters agree with a full rebuild,
+and only one worker reconciles a shard at a time.
+
+Run from the backend directory:
+    pytest tests/test_stats.py
+"""
+
+from app.models import MaintenanceLease, RegistrationStat
+from app.stats import RECONCILE_LEASE, StatsReconciler, reconcile
+
+from helpers import aadhaar_numbers, start_registration, submit_pan
+
+STATS_URL = "/api/v1/stats/registrations"
+PANS = ("ABCPE1234F", "ABCPF1234F", "ABCPG1234F", "ABCPH1234F")
+
+
+def stat_rows(router):
+    rows = set()
+    for shard in router.shards:
+        with router.session(shard) as db:
+            rows.update(
+                (shard.index, row.day, row.status, row.organization_type, row.registrations)
+                for row in db.query(RegistrationStat).filter(RegistrationStat.registrations != 0)
+            )
+    return rows
+
+
+def test_counters_match_a_fresh_reconcile(client, router):
+    numbers = aadhaar_numbers()
+    registration_ids = [start_registration(client, router, next(numbers)) for _ in range(8)]
+    # Moves: pending -> verified with an organization type, and a repeated PAN step
+    for registration_id, pan in zip(registration_ids, PANS):
+        assert submit_pan(client, registration_id, pan).status_code == 200
+    assert submit_pan(client, registration_ids[0], PANS[0]).status_code == 200
+
+    incremental = stat_rows(router)
+    assert sum(row[-1] for row in incremental) == 8
+    for shard in router.shards:
+        with router.session(shard) as db:
+            reconcile(db)
+    assert stat_rows(router) == incremental
+
+    totals = client.get(STATS_URL).json()
+    assert totals["total"] == 8
+    assert totals["by_status"] == {"pending": 4, "verified": 4}
+    assert totals["by_organization_type"] == {"unspecified": 4, "proprietorship": 4}
+
+
+def test_one_worker_reconciles_each_shard(client, router):
+    first = StatsReconciler(3600, router)
+    second = StatsReconciler(3600, router)
+    assert client.get(STATS_URL).json()["reconciled_at"] is None
+
+    assert first.reconcile_all() == len(router.shards)
+    # The lease is held: the other worker skips, the holder renews it
+    assert second.reconcile_all() == 0
+    assert first.reconcile_all() == len(router.shards)
+    assert client.get(STATS_URL).json()["reconciled_at"] is not None
+
+    # A holder that stopped renewing is taken over once its lease expires
+    for shard in router.shards:
+        with router.session(shard) as db:
+            db.query(MaintenanceLease).filter(MaintenanceLease.name == RECONCILE_LEASE).update(
+                {MaintenanceLease.expires_at: MaintenanceLease.last_run_at}
+            )
+            db.commit()
+    assert second.reconcile_all() == len(router.shards)
+    assert first.reconcile_all() == 0
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark the single-pass FormExtraction against the previous multi-pass
+extraction (separate find_all passes and a document-wide label search per
+input) on large saved pages.
+
+    python bench_scraper.py                    # synthetic pages
+    python bench_scraper.py saved/*.html       # saved snapshots
+"""
+
+import argparse
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+from extractor import DEFAULT_PARSER, FormExtraction
+
+
+class LegacyExtraction:
+    """Multi-pass extraction as it was before FormExtraction, kept for comparison"""
+
+    def schema(self, soup):
+        return {
+            "step1": self.extract_fields(soup, [re.compile(r'aadhaar|aadhar', re.I),
+                                                re.compile(r'entrepreneur|name', re.I)]),
+            "step2": self.extract_fields(soup, [re.compile(r'pan|PAN', re.I)]),
+            "validation_rules": self.extract_validation_rules(soup),
+            "ui_components": self.extract_ui_components(soup)
+        }
+
+    def extract_fields(self, soup, id_patterns):
+        inputs = []
+        for pattern in id_patterns:
+            inputs += soup.find_all('input', {'id': pattern})
+        return [{
+            "id": elem.get('id', ''),
+            "name": elem.get('name', ''),
+            "type": elem.get('type', 'text'),
+            "placeholder": elem.get('placeholder', ''),
+            "required": elem.get('required') is not None,
+            "maxlength": elem.get('maxlength', ''),
+            "pattern": elem.get('pattern', ''),
+            "label": self.find_field_label(soup, elem)
+        } for elem in inputs]
+
+    def extract_validation_rules(self, soup):
+        rules = {
+            "aadhaar": {"pattern": r"\d{12}", "description": "12-digit Aadhaar number"},
+            "pan": {"pattern": r"[A-Za-z]{5}[0-9]{4}[A-Za-z]{1}", "description": "PAN format: ABCDE1234F"},
+            "otp": {"pattern": r"\d{6}", "description": "6-digit OTP"}
+        }
+        for script in soup.find_all('script'):
+            if script.string:
+                pan_match = re.search(r'[A-Za-z]{5}[0-9]{4}[A-Za-z]{1}', script.string)
+                if pan_match:
+                    rules["pan"]["pattern"] = pan_match.group()
+        return rules
+
+    def extract_ui_components(self, soup):
+        buttons = soup.find_all('button') + soup.find_all('input', {'type': 'submit'})
+        return {
+            "buttons": [{"id": b.get('id', ''), "text": b.get_text(strip=True) or b.get('value', ''),
+                         "type": b.get('type', 'button')} for b in buttons],
+            "dropdowns": [{"id": s.get('id', ''), "name": s.get('name', ''),
+                           "options": [o.get_text(strip=True) for o in s.find_all('option')]}
+                          for s in soup.find_all('select')],
+            "checkboxes": [{"id": c.get('id', ''), "name": c.get('name', ''),
+                            "checked": c.get('checked') is not None}
+                           for c in soup.find_all('input', {'type': 'checkbox'})],
+            "radio_buttons": []
+        }
+
+    def find_field_label(self, soup, input_elem):
+        input_id = input_elem.get('id')
+        if input_id:
+            label = soup.find('label', {'for': input_id})
+            if label:
+                return label.get_text(strip=True)
+        parent = input_elem.parent
+        if parent:
+            label = parent.find('label')
+            if label:
+                return label.get_text(strip=True)
+        return ""
+
+
+def synthetic_page(fields):
+    """A registration-like page with `fields` labelled inputs per step"""
+    rows = []
+    for i in range(fields):
+        rows.append(f'<div class="row"><label for="txtaadhaar{i}">Aadhaar {i}</label>'
+                    f'<input id="txtaadhaar{i}" name="aadhaar{i}" maxlength="12" required></div>')
+        rows.append(f'<div class="row"><label>Name {i}</label>'
+                    f'<input id="txtname{i}" name="name{i}" placeholder="Name"></div>')
+        rows.append(f'<div class="row"><input id="txtPan{i}" name="pan{i}" pattern="[A-Z]{{5}}[0-9]{{4}}[A-Z]">'
+                    f'<label for="txtPan{i}">PAN {i}</label></div>')
+        rows.append(f'<p>Filler paragraph {i} <span>with</span> <b>nested</b> <i>markup</i></p>')
+    rows.append('<select id="ddlOrg">' + ''.join(f'<option>Type {i}</option>' for i in range(20)) + '</select>')
+    rows.append('<input type="checkbox" id="chkConsent" checked><button id="btnGo">Validate</button>')
+    rows.append('<input type="submit" id="btnSubmit" value="Submit">')
+    rows.append('<script>var pan = /[A-Za-z]{5}[0-9]{4}[A-Za-z]{1}/;</script>')
+    return f'<html><body><form>{"".join(rows)}</form></body></html>'.encode('utf-8')
+
+
+def timed(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def bench_page(name, content, repeat):
+    legacy_html_parser = lambda: LegacyExtraction().schema(BeautifulSoup(content, 'html.parser'))
+    legacy_same_parser = lambda: LegacyExtraction().schema(BeautifulSoup(content, DEFAULT_PARSER))
+    single_pass = lambda: FormExtraction(BeautifulSoup(content, DEFAULT_PARSER)).schema()
+
+    t_old, old = timed(legacy_html_parser, repeat)
+    t_old_same, old_same = timed(legacy_same_parser, repeat)
+    t_new, new = timed(single_pass, repeat)
+
+    print(f"{name[-36:]:<36} {len(content) / 1024:>8.0f} KB "
+          f"{t_old * 1000:>10.1f} {t_old_same * 1000:>12.1f} {t_new * 1000:>10.1f} "
+          f"{t_old / t_new:>8.1f}x  "
+          f"{'identical' if new == old_same else 'DIFFERENT'}"
+          f"{'' if new == old else ' (differs from html.parser output)'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", help="Saved HTML pages (default: synthetic pages)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = []
+        for path in args.pages:
+            with open(path, 'rb') as f:
+                pages.append((path, f.read()))
+    else:
+        pages = [(f"synthetic-{n}-fields", synthetic_page(n)) for n in (50, 200, 400)]
+
+    print(f"{'page':<36} {'size':>11} {'legacy ms':>10} {'legacy/' + DEFAULT_PARSER:>12} "
+          f"{'single ms':>10} {'speedup':>9}  output")
+    for name, content in pages:
+        bench_page(name, content, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
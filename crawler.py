@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import httpx
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+HREF_RE = re.compile(r'''<a\s[^>]*?href\s*=\s*["']([^"'#]+)''', re.I)
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int
+    content: bytes
+    from_cache: bool = False
+    elapsed: float = 0.0
+
+
+class HttpCache:
+    """On-disk HTTP cache keyed by URL, storing validators for conditional GETs"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base + '.body'
+
+    def get(self, url):
+        """Return (meta, body) for a cached URL, or (None, None)"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return meta, body
+
+    def conditional_headers(self, meta):
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def store(self, url, response):
+        etag = response.headers.get('etag')
+        last_modified = response.headers.get('last-modified')
+        if not etag and not last_modified:
+            return
+        meta_path, body_path = self._paths(url)
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_type': response.headers.get('content-type', ''),
+            'fetched_at': time.time()
+        }
+        # Write body first and swap files in atomically so readers never see a torn entry
+        for path, data, mode in ((body_path, response.content, 'wb'),
+                                 (meta_path, json.dumps(meta), 'w')):
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, mode) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+
+class RateLimiter:
+    """Polite per-host pacing: at most `rate` requests per second to one host"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, host):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class UdyamCrawler:
+    """
+    Async crawler for the Udyam registration page and its linked step pages.
+
+    Requests share one pooled client, are paced per host, retried with
+    exponential backoff on transient failures, and revalidated against the
+    on-disk cache so unchanged pages come back as a 304.
+    """
+
+    def __init__(self, base_url, cache_dir='.http_cache', concurrency=4, rate=2.0,
+                 max_retries=3, backoff=0.5, timeout=20.0, max_pages=10,
+                 step_link_pattern=r'Udyam[^/?]*\.aspx', user_agent=DEFAULT_USER_AGENT):
+        self.base_url = base_url
+        self.cache = HttpCache(cache_dir) if cache_dir else None
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(rate)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.step_link_re = re.compile(step_link_pattern, re.I)
+        self.headers = {'User-Agent': user_agent}
+
+    def _client(self):
+        return httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concurrency,
+                                max_keepalive_connections=self.concurrency)
+        )
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        if retry_after:
+            retry_after = retry_after.strip()
+            if retry_after.isdigit():
+                return float(retry_after)
+            # Retry-After may also be an HTTP-date
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+            except (TypeError, ValueError):
+                retry_at = None
+            if retry_at is not None:
+                if retry_at.tzinfo is None:
+                    retry_at = retry_at.replace(tzinfo=timezone.utc)
+                return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+        return self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+
+    async def fetch(self, client, url):
+        """GET one URL with caching, pacing and retries"""
+        meta, cached_body = self.cache.get(url) if self.cache else (None, None)
+        headers = self.cache.conditional_headers(meta) if self.cache else {}
+        host = urlparse(url).netloc
+
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.wait(host)
+            started = time.perf_counter()
+            try:
+                response = await client.get(url, headers=headers)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+            elapsed = time.perf_counter() - started
+
+            if response.status_code == 304 and cached_body is not None:
+                return FetchResult(url, 304, cached_body, from_cache=True, elapsed=elapsed)
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                await asyncio.sleep(self._retry_delay(attempt, response))
+                continue
+
+            response.raise_for_status()
+            if self.cache:
+                self.cache.store(url, response)
+            return FetchResult(url, response.status_code, response.content, elapsed=elapsed)
+
+    def discover_step_pages(self, page_url, content):
+        """Same-host links from a page that look like registration step pages"""
+        html = content.decode('utf-8', errors='replace')
+        origin = urlparse(page_url).netloc
+        seen = set()
+        links: List[str] = []
+        for href in HREF_RE.findall(html):
+            url = urldefrag(urljoin(page_url, href.strip()))[0]
+            if urlparse(url).netloc != origin or url == page_url or url in seen:
+                continue
+            if self.step_link_re.search(urlparse(url).path):
+                seen.add(url)
+                links.append(url)
+        return links[:self.max_pages]
+
+    async def crawl(self):
+        """Fetch the registration page, then its step pages concurrently"""
+        async with self._client() as client:
+            main = await self.fetch(client, self.base_url)
+            step_urls = self.discover_step_pages(self.base_url, main.content)
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def bounded(url):
+                async with semaphore:
+                    return await self.fetch(client, url)
+
+            results = await asyncio.gather(*(bounded(url) for url in step_urls),
+                                           return_exceptions=True)
+
+        pages = {main.url: main}
+        for url, result in zip(step_urls, results):
+            if isinstance(result, Exception):
+                print(f"⚠️  Skipping {url}: {result}")
+                continue
+            pages[url] = result
+        return pages
+
+    def crawl_sync(self):
+        return asyncio.run(self.crawl())
@@ -0,0 +1,167 @@
+import re
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+
+AADHAAR_ID_RE = re.compile(r'aadhaar|aadhar', re.I)
+ENTREPRENEUR_ID_RE = re.compile(r'entrepreneur|name', re.I)
+PAN_ID_RE = re.compile(r'pan|PAN', re.I)
+PAN_SCRIPT_RE = re.compile(r'[A-Za-z]{5}[0-9]{4}[A-Za-z]{1}')
+
+EXTRACTED_TAGS = ['input', 'button', 'select', 'label', 'script']
+
+
+def parse_html(content, parser=DEFAULT_PARSER):
+    return BeautifulSoup(content, parser)
+
+
+class FormExtraction:
+    """
+    Single-pass extraction of form fields and UI components from a page.
+
+    One traversal collects inputs, buttons, selects, labels and scripts in
+    document order and builds the label lookups, so finding a field label is
+    a dict hit instead of a search over the whole document.
+    """
+
+    def __init__(self, soup):
+        self.soup = soup
+        self.inputs = []
+        self.buttons = []
+        self.selects = []
+        self.scripts = []
+        self.labels_by_for = {}
+        self.first_label_under = {}
+
+        for elem in soup.find_all(EXTRACTED_TAGS):
+            name = elem.name
+            if name == 'input':
+                self.inputs.append(elem)
+            elif name == 'label':
+                for_id = elem.get('for')
+                if for_id is not None:
+                    self.labels_by_for.setdefault(for_id, elem)
+                # Remember the first label below every ancestor, for the
+                # "label somewhere in the parent" fallback
+                for ancestor in elem.parents:
+                    key = id(ancestor)
+                    if key in self.first_label_under:
+                        break
+                    self.first_label_under[key] = elem
+            elif name == 'button':
+                self.buttons.append(elem)
+            elif name == 'select':
+                self.selects.append(elem)
+            else:
+                self.scripts.append(elem)
+
+    def find_field_label(self, input_elem):
+        """Find the label associated with an input field"""
+        input_id = input_elem.get('id')
+        if input_id:
+            label = self.labels_by_for.get(input_id)
+            if label is not None:
+                return label.get_text(strip=True)
+
+        parent = input_elem.parent
+        if parent:
+            label = self.first_label_under.get(id(parent))
+            if label is not None:
+                return label.get_text(strip=True)
+
+        return ""
+
+    def _field_info(self, input_elem):
+        return {
+            "id": input_elem.get('id', ''),
+            "name": input_elem.get('name', ''),
+            "type": input_elem.get('type', 'text'),
+            "placeholder": input_elem.get('placeholder', ''),
+            "required": input_elem.get('required') is not None,
+            "maxlength": input_elem.get('maxlength', ''),
+            "pattern": input_elem.get('pattern', ''),
+            "label": self.find_field_label(input_elem)
+        }
+
+    def _inputs_with_id(self, regex):
+        return [elem for elem in self.inputs
+                if isinstance(elem.get('id'), str) and regex.search(elem['id'])]
+
+    def step1_fields(self):
+        """Step 1 (Aadhaar) form fields"""
+        matched = self._inputs_with_id(AADHAAR_ID_RE) + self._inputs_with_id(ENTREPRENEUR_ID_RE)
+        return [self._field_info(elem) for elem in matched]
+
+    def step2_fields(self):
+        """Step 2 (PAN) form fields"""
+        return [self._field_info(elem) for elem in self._inputs_with_id(PAN_ID_RE)]
+
+    def validation_rules(self):
+        """Validation rules and patterns"""
+        validation_rules = {
+            "aadhaar": {
+                "pattern": r"\d{12}",
+                "description": "12-digit Aadhaar number"
+            },
+            "pan": {
+                "pattern": r"[A-Za-z]{5}[0-9]{4}[A-Za-z]{1}",
+                "description": "PAN format: ABCDE1234F"
+            },
+            "otp": {
+                "pattern": r"\d{6}",
+                "description": "6-digit OTP"
+            }
+        }
+
+        for script in self.scripts:
+            if script.string:
+                pan_match = PAN_SCRIPT_RE.search(script.string)
+                if pan_match:
+                    validation_rules["pan"]["pattern"] = pan_match.group()
+
+        return validation_rules
+
+    def ui_components(self):
+        """UI components like dropdowns, buttons, etc."""
+        submits = [elem for elem in self.inputs if elem.get('type') == 'submit']
+        checkboxes = [elem for elem in self.inputs if elem.get('type') == 'checkbox']
+
+        return {
+            "buttons": [
+                {
+                    "id": btn.get('id', ''),
+                    "text": btn.get_text(strip=True) or btn.get('value', ''),
+                    "type": btn.get('type', 'button')
+                }
+                for btn in self.buttons + submits
+            ],
+            "dropdowns": [
+                {
+                    "id": select.get('id', ''),
+                    "name": select.get('name', ''),
+                    "options": [opt.get_text(strip=True) for opt in select.find_all('option')]
+                }
+                for select in self.selects
+            ],
+            "checkboxes": [
+                {
+                    "id": cb.get('id', ''),
+                    "name": cb.get('name', ''),
+                    "checked": cb.get('checked') is not None
+                }
+                for cb in checkboxes
+            ],
+            "radio_buttons": []
+        }
+
+    def schema(self):
+        return {
+            "step1": self.step1_fields(),
+            "step2": self.step2_fields(),
+            "validation_rules": self.validation_rules(),
+            "ui_components": self.ui_components()
+        }
@@ -0,0 +1,146 @@
+import json
+import os
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from extractor import DEFAULT_PARSER
+from schema_diff import diff_schemas
+from scraper import UdyamScraper
+
+SNAPSHOT_EXTENSIONS = ('.html', '.htm', '.aspx')
+MAIN_PAGE = 'main'
+
+
+def _is_page(name):
+    return name.lower().endswith(SNAPSHOT_EXTENSIONS)
+
+
+def find_snapshots(directory):
+    """
+    Saved snapshots in a directory, oldest first by name.
+
+    A snapshot is a saved registration page, or a directory holding the
+    registration page as main.* plus the step pages linked from it.
+    """
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if _is_page(name) or os.path.isdir(os.path.join(directory, name))
+    )
+
+
+def read_snapshot(path):
+    """(registration page, [step pages]) contents of a snapshot"""
+    if not os.path.isdir(path):
+        with open(path, 'rb') as f:
+            return f.read(), []
+    main, steps = None, []
+    for name in sorted(os.listdir(path)):
+        if not _is_page(name):
+            continue
+        with open(os.path.join(path, name), 'rb') as f:
+            content = f.read()
+        if os.path.splitext(name)[0] == MAIN_PAGE:
+            main = content
+        else:
+            steps.append(content)
+    if main is None:
+        raise ValueError(f"{path} has no {MAIN_PAGE}.* registration page")
+    return main, steps
+
+
+def field_counts(schema):
+    ui = schema["ui_components"]
+    return {
+        "step1": len(schema["step1"]),
+        "step2": len(schema["step2"]),
+        "buttons": len(ui["buttons"]),
+        "dropdowns": len(ui["dropdowns"]),
+        "checkboxes": len(ui["checkboxes"])
+    }
+
+
+def parse_snapshot(path, parser=DEFAULT_PARSER, compare_parser=None):
+    """
+    Build the schema of one snapshot the way the scraper does, step-page
+    merge included, so differences between snapshots show what a scrape
+    would have produced; runs in a worker process.
+    """
+    content, step_contents = read_snapshot(path)
+    scraper = UdyamScraper(cache_dir=None, store_dir=None, parser=parser)
+
+    started = time.perf_counter()
+    schema = scraper.build_schema(content, step_contents)
+    parse_ms = (time.perf_counter() - started) * 1000
+
+    # Memory is measured on a second run; tracemalloc would skew the timing
+    tracemalloc.start()
+    scraper.build_schema(content, step_contents)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "path": path,
+        "bytes": len(content) + sum(len(step) for step in step_contents),
+        "parse_ms": parse_ms,
+        "peak_kb": peak / 1024,
+        "counts": field_counts(schema),
+        "schema": schema
+    }
+
+    if compare_parser:
+        started = time.perf_counter()
+        baseline = UdyamScraper(cache_dir=None, store_dir=None, parser=compare_parser).build_schema(
+            content, step_contents
+        )
+        result["compare_ms"] = (time.perf_counter() - started) * 1000
+        result["compare_delta"] = diff_schemas(baseline, schema)
+
+    return result
+
+
+def replay_corpus(directory, workers=None, parser=DEFAULT_PARSER, compare_parser=None):
+    """
+    Run the scraper's extraction over every snapshot in `directory` in a process pool.
+
+    Returns per-page results in snapshot order; each result after the first
+    carries "delta", the schema diff against the previous snapshot.
+    """
+    paths = find_snapshots(directory)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(
+            parse_snapshot, paths,
+            [parser] * len(paths), [compare_parser] * len(paths)
+        ))
+
+    previous = None
+    for result in results:
+        result["delta"] = diff_schemas(previous, result["schema"]) if previous else {}
+        previous = result["schema"]
+    return results
+
+
+def print_report(results, compare_parser=None):
+    header = f"{'snapshot':<32} {'KB':>7} {'parse ms':>9} {'peak KB':>9} {'s1':>4} {'s2':>4} {'btn':>4} {'sel':>4}  changes"
+    if compare_parser:
+        header += f"  vs {compare_parser}"
+    print(header)
+    for result in results:
+        counts = result["counts"]
+        line = (f"{os.path.basename(result['path'])[-32:]:<32} {result['bytes'] / 1024:>7.0f} "
+                f"{result['parse_ms']:>9.1f} {result['peak_kb']:>9.0f} "
+                f"{counts['step1']:>4} {counts['step2']:>4} {counts['buttons']:>4} {counts['dropdowns']:>4}  "
+                f"{', '.join(result['delta']) or '-'}")
+        if compare_parser:
+            equivalent = "identical" if not result["compare_delta"] else "DIFFERENT"
+            line += f"  {equivalent} ({result['compare_ms']:.1f} ms)"
+        print(line)
+
+    total = sum(result["parse_ms"] for result in results)
+    print(f"\n{len(results)} snapshot(s), {total:.1f} ms total parse time")
+
+
+def write_report(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([{k: v for k, v in result.items() if k != "schema"} for result in results],
+                  f, indent=2, ensure_ascii=False)
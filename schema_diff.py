@@ -0,0 +1,88 @@
+FIELD_ATTRIBUTES = ("name", "type", "placeholder", "required", "maxlength", "pattern", "label")
+STEPS = ("step1", "step2")
+
+
+def _fields_by_key(fields):
+    # Inputs without an id are keyed by name; a repeated key keeps its first field
+    keyed = {}
+    for field in fields:
+        keyed.setdefault(field.get("id") or field.get("name") or "", field)
+    return keyed
+
+
+def diff_fields(old_fields, new_fields):
+    """Added, removed and changed fields between two field lists"""
+    old = _fields_by_key(old_fields)
+    new = _fields_by_key(new_fields)
+    changed = []
+    for key in old.keys() & new.keys():
+        changes = {
+            attr: {"old": old[key].get(attr), "new": new[key].get(attr)}
+            for attr in FIELD_ATTRIBUTES
+            if old[key].get(attr) != new[key].get(attr)
+        }
+        if changes:
+            changed.append({"id": key, "changes": changes})
+    return {
+        "added": sorted(new.keys() - old.keys()),
+        "removed": sorted(old.keys() - new.keys()),
+        "changed": sorted(changed, key=lambda item: item["id"])
+    }
+
+
+def diff_rules(old_rules, new_rules):
+    """Validation rules whose pattern was added, removed or changed"""
+    changes = {}
+    for name in sorted(old_rules.keys() | new_rules.keys()):
+        old_pattern = (old_rules.get(name) or {}).get("pattern")
+        new_pattern = (new_rules.get(name) or {}).get("pattern")
+        if old_pattern != new_pattern:
+            changes[name] = {"old": old_pattern, "new": new_pattern}
+    return changes
+
+
+def diff_ui_components(old_components, new_components):
+    """Per-kind component ids that were added or removed"""
+    changes = {}
+    for kind in sorted(old_components.keys() | new_components.keys()):
+        old_ids = {c.get("id", "") for c in old_components.get(kind, [])}
+        new_ids = {c.get("id", "") for c in new_components.get(kind, [])}
+        if old_ids != new_ids or old_components.get(kind) != new_components.get(kind):
+            changes[kind] = {
+                "added": sorted(new_ids - old_ids),
+                "removed": sorted(old_ids - new_ids),
+                "modified": sorted(
+                    c.get("id", "") for c in new_components.get(kind, [])
+                    if c.get("id", "") in old_ids and c not in old_components.get(kind, [])
+                )
+            }
+    return changes
+
+
+def diff_schemas(old_schema, new_schema):
+    """
+    Structured delta between two form schemas.
+
+    Returns {"steps": {...}, "validation_rules": {...}, "ui_components": {...}}
+    containing only the parts that changed; an empty dict means no change.
+    """
+    old_schema = old_schema or {}
+    delta = {}
+
+    steps = {}
+    for step in STEPS:
+        step_delta = diff_fields(old_schema.get(step, []), new_schema.get(step, []))
+        if any(step_delta.values()):
+            steps[step] = step_delta
+    if steps:
+        delta["steps"] = steps
+
+    rules = diff_rules(old_schema.get("validation_rules", {}), new_schema.get("validation_rules", {}))
+    if rules:
+        delta["validation_rules"] = rules
+
+    components = diff_ui_components(old_schema.get("ui_components", {}), new_schema.get("ui_components", {}))
+    if components:
+        delta["ui_components"] = components
+
+    return delta
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import re
+import time
+
+from schema_diff import diff_schemas
+
+SECTIONS = ("step1", "step2", "validation_rules", "ui_components")
+
+# ASP.NET state fields change on every request without the form changing
+VOLATILE_FIELDS_RE = re.compile(
+    rb'(name="(?:__VIEWSTATE|__VIEWSTATEGENERATOR|__EVENTVALIDATION|__PREVIOUSPAGE)"[^>]*?value=")[^"]*(")',
+    re.I
+)
+
+
+def page_fingerprint(pages):
+    """Hash of the fetched pages with per-request ASP.NET state stripped"""
+    digest = hashlib.sha256()
+    for url in sorted(pages):
+        digest.update(url.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(hashlib.sha256(VOLATILE_FIELDS_RE.sub(rb'\1\2', pages[url])).digest())
+    return digest.hexdigest()
+
+
+def section_fingerprint(section):
+    encoded = json.dumps(section, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def write_json_atomic(path, data, **dump_options):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, **dump_options)
+    os.replace(tmp_path, path)
+
+
+class SchemaStore:
+    """
+    Versioned, content-addressed store of scraped form schemas.
+
+    Each schema section is stored once under its content hash, and a version
+    is a manifest entry pointing at section hashes. Unchanged sections are
+    never rewritten, and a new version (with its delta) is only recorded when
+    at least one section really changed.
+
+    Layout:
+        manifest.json          versions, newest last
+        sections/<hash>.json   one schema section
+        deltas/v0001.json      structured delta against the previous version
+    """
+
+    def __init__(self, directory='schema_store'):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.sections_dir = os.path.join(directory, 'sections')
+        self.deltas_dir = os.path.join(directory, 'deltas')
+        os.makedirs(self.sections_dir, exist_ok=True)
+        os.makedirs(self.deltas_dir, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"versions": []}
+
+    @property
+    def current(self):
+        """Manifest entry of the newest version, or None"""
+        versions = self.manifest["versions"]
+        return versions[-1] if versions else None
+
+    def is_unchanged_page(self, fingerprint):
+        current = self.current
+        return current is not None and current.get("page_fingerprint") == fingerprint
+
+    def load(self, version=None):
+        """Reassemble a stored schema (default: the newest version)"""
+        entry = self.current if version is None else next(
+            (v for v in self.manifest["versions"] if v["version"] == version), None
+        )
+        if entry is None:
+            return None
+        schema = {}
+        for section, digest in entry["sections"].items():
+            with open(os.path.join(self.sections_dir, f'{digest}.json'), 'r', encoding='utf-8') as f:
+                schema[section] = json.load(f)
+        return schema
+
+    def record(self, schema, page_fingerprint=None):
+        """
+        Store `schema` if any section changed.
+
+        Returns (entry, delta). `delta` is None when nothing changed, in
+        which case only the page fingerprint of the current entry is updated.
+        """
+        hashes = {section: section_fingerprint(schema[section]) for section in SECTIONS}
+        current = self.current
+
+        if current is not None and current["sections"] == hashes:
+            if page_fingerprint and current.get("page_fingerprint") != page_fingerprint:
+                current["page_fingerprint"] = page_fingerprint
+                write_json_atomic(self.manifest_path, self.manifest, indent=2)
+            return current, None
+
+        for section, digest in hashes.items():
+            if current is None or current["sections"].get(section) != digest:
+                path = os.path.join(self.sections_dir, f'{digest}.json')
+                if not os.path.exists(path):
+                    write_json_atomic(path, schema[section])
+
+        delta = diff_schemas(self.load() if current else None, schema)
+        entry = {
+            "version": (current["version"] + 1) if current else 1,
+            "created_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            "page_fingerprint": page_fingerprint,
+            "sections": hashes,
+            "changed_sections": [s for s in SECTIONS
+                                 if current is None or current["sections"].get(s) != hashes[s]]
+        }
+        write_json_atomic(os.path.join(self.deltas_dir, f'v{entry["version"]:04d}.json'),
+                          {"version": entry["version"],
+                           "previous_version": current["version"] if current else None,
+                           "delta": delta}, indent=2)
+        self.manifest["versions"].append(entry)
+        write_json_atomic(self.manifest_path, self.manifest, indent=2)
+        return entry, delta
@@ -1,176 +1,151 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
 import json
-import re
-from urllib.parse import urljoin
+import os
 import time
+from crawler import UdyamCrawler
+from extractor import DEFAULT_PARSER, FormExtraction, parse_html
+from schema_store import SchemaStore, page_fingerprint, write_json_atomic
+
+DEFAULT_BASE_URL = "https://udyamregistration.gov.in/UdyamRegistration.aspx"
 
 class UdyamScraper:
-    def __init__(self):
-        self.base_url = "https://udyamregistration.gov.in/UdyamRegistration.aspx"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        
-    def scrape_form_schema(self):
+    def __init__(self, base_url=DEFAULT_BASE_URL, cache_dir='.http_cache',
+                 store_dir='schema_store', output_path='udyam_form_schema.json',
+                 parser=DEFAULT_PARSER, **crawler_options):
+        self.base_url = base_url
+        self.crawler = UdyamCrawler(base_url, cache_dir=cache_dir, **crawler_options)
+        # No store for offline use (replay), which only calls build_schema
+        self.store = SchemaStore(store_dir) if store_dir else None
+        self.output_path = output_path
+        self.parser = parser
+        self._extraction = None
+        
+    def scrape_form_schema(self, force=False):
         try:
-            print("Fetching Udyam registration page...")
-            response = self.session.get(self.base_url)
-            response.raise_for_status()
+            print("Fetching Udyam registration page and linked step pages...")
+            started = time.perf_counter()
+            pages = self.crawler.crawl_sync()
+            cached = sum(1 for page in pages.values() if page.from_cache)
+            print(f"Fetched {len(pages)} page(s) in {time.perf_counter() - started:.2f}s ({cached} unchanged, served from cache)")
+            
+            fingerprint = page_fingerprint({url: page.content for url, page in pages.items()})
+            if not force and self.store.is_unchanged_page(fingerprint) and os.path.exists(self.output_path):
+                print(f"✅ Pages unchanged since schema v{self.store.current['version']}, skipping parse")
+                return self.store.load()
+            
+            form_schema = self.build_schema(
+                pages[self.base_url].content,
+                [page.content for url, page in pages.items() if url != self.base_url]
+            )
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            form_schema = {
-                "step1": self.extract_step1_fields(soup),
-                "step2": self.extract_step2_fields(soup),
-                "validation_rules": self.extract_validation_rules(soup),
-                "ui_components": self.extract_ui_components(soup)
-            }
+            entry, delta = self.store.record(form_schema, fingerprint)
+            if delta is None and os.path.exists(self.output_path) and not force:
+                print(f"✅ Form unchanged (schema v{entry['version']}), {self.output_path} left as is")
+                return form_schema
             
-            with open('udyam_form_schema.json', 'w', encoding='utf-8') as f:
-                json.dump(form_schema, f, indent=2, ensure_ascii=False)
+            # Atomic replace so the backend never reloads a half-written file
+            write_json_atomic(self.output_path, form_schema, indent=2)
             
-            print("✅ Form schema extracted and saved to udyam_form_schema.json")
+            print(f"✅ Form schema v{entry['version']} extracted and saved to {self.output_path}")
+            if delta and entry['version'] > 1:
+                print(f"   Changed since v{entry['version'] - 1}: {', '.join(entry['changed_sections'])}")
+                print(json.dumps(delta, indent=2, ensure_ascii=False))
             return form_schema
             
         except Exception as e:
             print(f"❌ Error scraping form: {str(e)}")
             return None
     
+    def build_schema(self, main_content, step_contents=()):
+        """Form schema from the registration page plus its linked step pages"""
+        form_schema = self.parse_schema(main_content)
+        # Fields that only appear on linked step pages
+        for content in step_contents:
+            self.merge_step_page(form_schema, parse_html(content, self.parser))
+        return form_schema
+    
+    def parse_schema(self, content):
+        """Parse page HTML into the form schema in a single traversal"""
+        return FormExtraction(parse_html(content, self.parser)).schema()
+    
+    def merge_step_page(self, form_schema, soup):
+        """Add Step 1/Step 2 fields from a linked page, skipping ones already seen"""
+        extraction = FormExtraction(soup)
+        for step, fields in (("step1", extraction.step1_fields()),
+                             ("step2", extraction.step2_fields())):
+            known = {(field["id"], field["name"]) for field in form_schema[step]}
+            for field in fields:
+                if (field["id"], field["name"]) not in known:
+                    known.add((field["id"], field["name"]))
+                    form_schema[step].append(field)
+    
+    def extraction(self, soup):
+        """Single-pass FormExtraction for a soup, reused across the extract_* calls"""
+        if self._extraction is None or self._extraction.soup is not soup:
+            self._extraction = FormExtraction(soup)
+        return self._extraction
+    
     def extract_step1_fields(self, soup):
         """Extract Step 1 (Aadhaar) form fields"""
-        step1_fields = []
-        
-        aadhaar_inputs = soup.find_all('input', {'id': re.compile(r'aadhaar|aadhar', re.I)})
-        entrepreneur_inputs = soup.find_all('input', {'id': re.compile(r'entrepreneur|name', re.I)})
-        
-        
-        for input_elem in aadhaar_inputs + entrepreneur_inputs:
-            field_info = {
-                "id": input_elem.get('id', ''),
-                "name": input_elem.get('name', ''),
-                "type": input_elem.get('type', 'text'),
-                "placeholder": input_elem.get('placeholder', ''),
-                "required": input_elem.get('required') is not None,
-                "maxlength": input_elem.get('maxlength', ''),
-                "pattern": input_elem.get('pattern', ''),
-                "label": self.find_field_label(soup, input_elem)
-            }
-            step1_fields.append(field_info)
-        
-        return step1_fields
+        return self.extraction(soup).step1_fields()
     
     def extract_step2_fields(self, soup):
         """Extract Step 2 (PAN) form fields"""
-        step2_fields = []
-        
-        pan_inputs = soup.find_all('input', {'id': re.compile(r'pan|PAN', re.I)})
-        
-        for input_elem in pan_inputs:
-            field_info = {
-                "id": input_elem.get('id', ''),
-                "name": input_elem.get('name', ''),
-                "type": input_elem.get('type', 'text'),
-                "placeholder": input_elem.get('placeholder', ''),
-                "required": input_elem.get('required') is not None,
-                "maxlength": input_elem.get('maxlength', ''),
-                "pattern": input_elem.get('pattern', ''),
-                "label": self.find_field_label(soup, input_elem)
-            }
-            step2_fields.append(field_info)
-        
-        return step2_fields
+        return self.extraction(soup).step2_fields()
     
     def extract_validation_rules(self, soup):
         """Extract validation rules and patterns"""
-        validation_rules = {
-            "aadhaar": {
-                "pattern": r"\d{12}",
-                "description": "12-digit Aadhaar number"
-            },
-            "pan": {
-                "pattern": r"[A-Za-z]{5}[0-9]{4}[A-Za-z]{1}",
-                "description": "PAN format: ABCDE1234F"
-            },
-            "otp": {
-                "pattern": r"\d{6}",
-                "description": "6-digit OTP"
-            }
-        }
-        
-        scripts = soup.find_all('script')
-        for script in scripts:
-            if script.string:
-                # Extract PAN validation pattern
-                pan_match = re.search(r'[A-Za-z]{5}[0-9]{4}[A-Za-z]{1}', script.string)
-                if pan_match:
-                    validation_rules["pan"]["pattern"] = pan_match.group()
-        
-        return validation_rules
+        return self.extraction(soup).validation_rules()
     
     def extract_ui_components(self, soup):
         """Extract UI components like dropdowns, buttons, etc."""
-        ui_components = {
-            "buttons": [],
-            "dropdowns": [],
-            "checkboxes": [],
-            "radio_buttons": []
-        }
-        
-        # Extract buttons
-        buttons = soup.find_all('button') + soup.find_all('input', {'type': 'submit'})
-        for btn in buttons:
-            btn_info = {
-                "id": btn.get('id', ''),
-                "text": btn.get_text(strip=True) or btn.get('value', ''),
-                "type": btn.get('type', 'button')
-            }
-            ui_components["buttons"].append(btn_info)
-        
-        # Extract dropdowns
-        selects = soup.find_all('select')
-        for select in selects:
-            options = [opt.get_text(strip=True) for opt in select.find_all('option')]
-            select_info = {
-                "id": select.get('id', ''),
-                "name": select.get('name', ''),
-                "options": options
-            }
-            ui_components["dropdowns"].append(select_info)
-        
-        # Extract checkboxes
-        checkboxes = soup.find_all('input', {'type': 'checkbox'})
-        for cb in checkboxes:
-            cb_info = {
-                "id": cb.get('id', ''),
-                "name": cb.get('name', ''),
-                "checked": cb.get('checked') is not None
-            }
-            ui_components["checkboxes"].append(cb_info)
-        
-        return ui_components
+        return self.extraction(soup).ui_components()
     
     def find_field_label(self, soup, input_elem):
         """Find the label associated with an input field"""
-        # Try to find label by for attribute
-        input_id = input_elem.get('id')
-        if input_id:
-            label = soup.find('label', {'for': input_id})
-            if label:
-                return label.get_text(strip=True)
-        
-        # Try to find label by parent or sibling
-        parent = input_elem.parent
-        if parent:
-            label = parent.find('label')
-            if label:
-                return label.get_text(strip=True)
-        
-        return ""
+        return self.extraction(soup).find_field_label(input_elem)
 
 def main():
-    scraper = UdyamScraper()
-    schema = scraper.scrape_form_schema()
+    parser = argparse.ArgumentParser(description="Extract the Udyam registration form schema")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="Registration page URL (point at a local fixture server for testing)")
+    parser.add_argument("--cache-dir", default=".http_cache", help="On-disk HTTP cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the HTTP cache")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum concurrent requests")
+    parser.add_argument("--rate", type=float, default=2.0, help="Maximum requests per second per host")
+    parser.add_argument("--retries", type=int, default=3, help="Retries for transient failures")
+    parser.add_argument("--timeout", type=float, default=20.0, help="Per-request timeout in seconds")
+    parser.add_argument("--store-dir", default="schema_store", help="Versioned schema store directory")
+    parser.add_argument("--output", default="udyam_form_schema.json", help="Current schema output file")
+    parser.add_argument("--force", action="store_true", help="Reparse and rewrite the schema even if nothing changed")
+    replay_group = parser.add_argument_group("offline replay")
+    replay_group.add_argument("--replay", metavar="DIR", help="Parse saved HTML snapshots in DIR (pages, or directories of main.* plus step pages) instead of fetching the live site")
+    replay_group.add_argument("--workers", type=int, default=None, help="Parser processes for --replay (default: CPU count)")
+    replay_group.add_argument("--parser", default=DEFAULT_PARSER, help="BeautifulSoup parser for --replay")
+    replay_group.add_argument("--compare-parser", help="Also parse with this parser and report output equivalence")
+    replay_group.add_argument("--report", metavar="FILE", help="Write the --replay results as JSON")
+    args = parser.parse_args()
+    
+    if args.replay:
+        from replay import print_report, replay_corpus, write_report
+        print(f"Replaying snapshots from {args.replay}...")
+        results = replay_corpus(args.replay, args.workers, args.parser, args.compare_parser)
+        print_report(results, args.compare_parser)
+        if args.report:
+            write_report(results, args.report)
+            print(f"✅ Replay report saved to {args.report}")
+        return
+    
+    scraper = UdyamScraper(
+        base_url=args.base_url,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        store_dir=args.store_dir,
+        output_path=args.output,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        max_retries=args.retries,
+        timeout=args.timeout
+    )
+    schema = scraper.scrape_form_schema(force=args.force)
     
     if schema:
         print("\n📋 Extracted Form Schema Summary:")
@@ -0,0 +1,184 @@
+"""
+UdyamCrawler against a local fixture server: cache revalidation, retries
+with backoff on transient statuses, and per-host pacing.
+
+Run from the repository root:
+    pytest tests/test_crawler.py
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler import RateLimiter, UdyamCrawler  # noqa: E402
+
+
+class FixtureServer:
+    """
+    Local HTTP server answering from per-path handlers.
+
+    A handler takes the request headers and returns (status, headers, body);
+    every request is recorded as (path, headers, monotonic arrival time).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers), time.monotonic()))
+                route = server.routes.get(self.path)
+                status, headers, body = route(self.headers) if route else (404, {}, b"")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def hits(self, path):
+        return [request for request in self.requests if request[0] == path]
+
+
+@pytest.fixture
+def server():
+    server = FixtureServer()
+    server.thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+def fetch_all(crawler, urls):
+    async def run():
+        async with crawler._client() as client:
+            return await asyncio.gather(*(crawler.fetch(client, url) for url in urls))
+    return asyncio.run(run())
+
+
+def sequence(*responses):
+    """Handler answering with each response in turn, then repeating the last one"""
+    remaining = list(responses)
+
+    def route(headers):
+        return remaining.pop(0) if len(remaining) > 1 else remaining[0]
+    return route
+
+
+def test_unchanged_page_is_revalidated_from_the_cache(server, tmp_path):
+    def page(headers):
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, b""
+        return 200, {"ETag": '"v1"', "Content-Type": "text/html"}, b"<html>form</html>"
+    server.routes["/page"] = page
+    crawler = UdyamCrawler(server.base_url, cache_dir=str(tmp_path), rate=0)
+
+    first, = fetch_all(crawler, [f"{server.base_url}/page"])
+    second, = fetch_all(crawler, [f"{server.base_url}/page"])
+    assert (first.status, first.from_cache) == (200, False)
+    assert (second.status, second.from_cache) == (304, True)
+    assert second.content == first.content == b"<html>form</html>"
+    assert "If-None-Match" not in server.hits("/page")[0][1]
+    assert server.hits("/page")[1][1]["If-None-Match"] == '"v1"'
+
+
+def test_transient_statuses_are_retried(server, tmp_path):
+    past = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=5), usegmt=True)
+    server.routes["/page"] = sequence(
+        (503, {"Retry-After": "0"}, b""),
+        (429, {"Retry-After": past}, b""),
+        (200, {}, b"ok"),
+    )
+    crawler = UdyamCrawler(server.base_url, cache_dir=None, rate=0, max_retries=3, backoff=0.01)
+
+    result, = fetch_all(crawler, [f"{server.base_url}/page"])
+    assert (result.status, result.content) == (200, b"ok")
+    assert len(server.hits("/page")) == 3
+
+
+def test_retries_give_up_after_max_retries(server):
+    server.routes["/page"] = sequence((503, {}, b""))
+    crawler = UdyamCrawler(server.base_url, cache_dir=None, rate=0, max_retries=2, backoff=0.01)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch_all(crawler, [f"{server.base_url}/page"])
+    assert len(server.hits("/page")) == 3
+
+
+def test_backoff_doubles_per_attempt():
+    crawler = UdyamCrawler("http://example.invalid", cache_dir=None, backoff=0.5)
+    for attempt in range(4):
+        delay = crawler._retry_delay(attempt)
+        assert 0.5 * 2 ** attempt <= delay <= 0.5 * 2 ** attempt + 0.5
+
+
+def test_retry_after_seconds_and_http_date():
+    crawler = UdyamCrawler("http://example.invalid", cache_dir=None, backoff=0.5)
+    assert crawler._retry_delay(0, httpx.Response(429, headers={"Retry-After": "7"})) == 7.0
+
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    delay = crawler._retry_delay(0, httpx.Response(503, headers={"Retry-After": later}))
+    assert 28 <= delay <= 30
+
+    earlier = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=30), usegmt=True)
+    assert crawler._retry_delay(0, httpx.Response(503, headers={"Retry-After": earlier})) == 0.0
+    # Unparseable values fall back to the exponential backoff
+    delay = crawler._retry_delay(1, httpx.Response(503, headers={"Retry-After": "soon"}))
+    assert 1.0 <= delay <= 1.5
+
+
+def test_requests_to_one_host_are_paced(server):
+    for i in range(5):
+        server.routes[f"/step{i}"] = sequence((200, {}, b"step"))
+    crawler = UdyamCrawler(server.base_url, cache_dir=None, rate=10.0)
+
+    fetch_all(crawler, [f"{server.base_url}/step{i}" for i in range(5)])
+    arrivals = sorted(arrived for _, _, arrived in server.requests)
+    assert len(arrivals) == 5
+    # 10 requests per second: requests leave 100 ms apart; arrivals get some
+    # slack for scheduling jitter but never bunch up
+    assert arrivals[-1] - arrivals[0] >= 0.35
+    assert all(b - a >= 0.05 for a, b in zip(arrivals, arrivals[1:]))
+
+
+def test_pacing_is_per_host():
+    limiter = RateLimiter(rate=2.0)
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.wait(host) for host in ("a.example", "b.example", "c.example")))
+        return time.monotonic() - started
+    # One request per host needs no waiting, whatever the per-host interval
+    assert asyncio.run(run()) < 0.25
+
+
+def test_crawl_fetches_linked_step_pages(server, tmp_path):
+    server.routes["/UdyamRegistration.aspx"] = sequence((200, {}, (
+        b'<a href="/Udyam_Step2.aspx">next</a> <a href="/about.html">about</a>'
+        b' <a href="https://other.example/Udyam_Step3.aspx">elsewhere</a>'
+    )))
+    server.routes["/Udyam_Step2.aspx"] = sequence((200, {}, b"step 2"))
+    crawler = UdyamCrawler(f"{server.base_url}/UdyamRegistration.aspx", cache_dir=str(tmp_path), rate=0)
+
+    pages = crawler.crawl_sync()
+    assert sorted(pages) == [f"{server.base_url}/UdyamRegistration.aspx", f"{server.base_url}/Udyam_Step2.aspx"]
+    assert pages[f"{server.base_url}/Udyam_Step2.aspx"].content == b"step 2"
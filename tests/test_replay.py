@@ -0,0 +1,43 @@
+"""
+Offline replay builds each snapshot's schema the way the scraper does,
+including fields merged in from saved step pages.
+
+Run from the repository root:
+    pytest tests/test_replay.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay import parse_snapshot, replay_corpus  # noqa: E402
+from scraper import UdyamScraper  # noqa: E402
+
+MAIN_PAGE = b'<form><input id="txtadharno" name="adhar" maxlength="12"><button>Validate</button></form>'
+STEP_PAGE = b'<form><input id="txtPan" name="pan" maxlength="10"></form>'
+
+
+def test_snapshot_with_step_pages_matches_the_scraper(tmp_path):
+    snapshot = tmp_path / "2024-02-01"
+    snapshot.mkdir()
+    (snapshot / "main.aspx").write_bytes(MAIN_PAGE)
+    (snapshot / "Udyam_Step2.aspx").write_bytes(STEP_PAGE)
+
+    result = parse_snapshot(str(snapshot))
+    scraped = UdyamScraper(cache_dir=None, store_dir=None).build_schema(MAIN_PAGE, [STEP_PAGE])
+    assert result["schema"] == scraped
+    assert [field["id"] for field in result["schema"]["step2"]] == ["txtPan"]
+
+
+def test_corpus_diff_reports_the_merged_step_fields(tmp_path):
+    (tmp_path / "2024-01-01.html").write_bytes(MAIN_PAGE)
+    snapshot = tmp_path / "2024-02-01"
+    snapshot.mkdir()
+    (snapshot / "main.html").write_bytes(MAIN_PAGE)
+    (snapshot / "step2.html").write_bytes(STEP_PAGE)
+
+    first, second = replay_corpus(str(tmp_path), workers=1)
+    assert first["counts"]["step2"] == 0 and first["delta"] == {}
+    assert second["counts"]["step2"] == 1
+    assert second["delta"]["steps"]["step2"]["added"] == ["txtPan"]